@@ -0,0 +1,332 @@
+import os
+import json
+import math
+import time
+import shutil
+import asyncio
+import tempfile
+from collections import deque
+from typing import Deque, List, Optional, Tuple
+
+from app.metrics import Counter, Gauge, Histogram, register
+
+# Admission control for the heavy endpoints.
+#
+# Each lane (a group of routes) has a concurrency limit and a bounded FIFO
+# wait queue. On top of that every admitted request reserves an estimate of
+# the temp disk (uploads spooled by Starlette, frames, audio) and memory it
+# will use, against process-wide budgets. A request that cannot start waits
+# in its lane's queue; when the queue is full it gets an immediate 429, and
+# if it waits longer than the queue timeout, or the disk is nearly full, a
+# 503. Both carry Retry-After, estimated from the lane's recent service time.
+#
+# Admission runs as ASGI middleware, so a rejected upload is answered before
+# its body is read.
+#
+#   ADMISSION_LIMITS="video_import=2:8,url_import=2:8,smart_meal_plan=8:32"
+#
+# (lane=CONCURRENCY:QUEUE). GET /load and the vegcooking_admission_* gauges
+# report in-flight, queued and utilization for the autoscaler.
+
+ADMISSION_QUEUE_TIMEOUT_S = float(os.environ.get("ADMISSION_QUEUE_TIMEOUT_S", "30"))
+# Disk that must stay free in the temp dir after all reservations
+ADMISSION_TMP_MIN_FREE_MB = float(os.environ.get("ADMISSION_TMP_MIN_FREE_MB", "512"))
+# Memory the admitted requests of this process may reserve; 0 = 70% of the
+# container's cgroup limit when there is one
+ADMISSION_MEMORY_BUDGET_MB = float(os.environ.get("ADMISSION_MEMORY_BUDGET_MB", "0"))
+ADMISSION_RETRY_AFTER_MAX_S = 120
+
+MB = 1024 * 1024
+
+class Lane:
+    """Routes that share a concurrency limit and wait queue.
+
+    A request's reservation is `fixed + per_body_byte * Content-Length` for
+    temp disk and memory; requests without a Content-Length are costed as
+    `default_body` bytes.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        paths: Tuple[str, ...],
+        concurrency: int,
+        queue: int,
+        tmp: Tuple[float, float] = (0, 0.0),
+        memory: Tuple[float, float] = (0, 0.0),
+        default_body: int = 0,
+    ):
+        self.name = name
+        self.paths = paths
+        self.concurrency = concurrency
+        self.queue = queue
+        self.tmp = tmp
+        self.memory = memory
+        self.default_body = default_body
+        self.in_flight = 0
+        self.waiters: Deque[Tuple[asyncio.Future, int, int]] = deque()
+        # EWMA of how long admitted requests hold their slot, for Retry-After
+        self.service_s = 5.0
+
+    def cost(self, body_bytes: Optional[int]) -> Tuple[int, int]:
+        body = self.default_body if body_bytes is None else body_bytes
+        return (
+            int(self.tmp[0] + self.tmp[1] * body),
+            int(self.memory[0] + self.memory[1] * body),
+        )
+
+    def utilization(self) -> float:
+        return (self.in_flight + len(self.waiters)) / self.concurrency
+
+DEFAULT_LANES = [
+    # upload spooled by Starlette + the pipeline's copy + frames/audio;
+    # in memory: video.read(), the bytes handed to the executor, the draft
+    Lane(
+        "video_import", ("/video-import", "/video-import/stream"),
+        concurrency=2, queue=8, tmp=(64 * MB, 2.5), memory=(64 * MB, 2.0), default_body=100 * MB,
+    ),
+    # yt-dlp downloads are capped at 200 MB; most never download at all
+    Lane(
+        "url_import", ("/video-import-url", "/video-import-url/stream"),
+        concurrency=2, queue=8, tmp=(200 * MB, 0.0), memory=(128 * MB, 0.0),
+    ),
+    # LLM-bound; the limit keeps a burst from queueing behind OpenAI rate limits
+    Lane(
+        "smart_meal_plan", ("/smart-meal-plan",),
+        concurrency=8, queue=32, memory=(16 * MB, 0.0),
+    ),
+]
+
+def _apply_limits(lanes: List[Lane], spec: str) -> None:
+    by_name = {lane.name: lane for lane in lanes}
+    for item in filter(None, (s.strip() for s in spec.split(","))):
+        name, _, limits = item.partition("=")
+        concurrency, _, queue = limits.partition(":")
+        lane = by_name[name.strip()]
+        lane.concurrency = int(concurrency)
+        if queue:
+            lane.queue = int(queue)
+
+def _cgroup_memory_bytes() -> Optional[int]:
+    for path in ("/sys/fs/cgroup/memory.max", "/sys/fs/cgroup/memory/memory.limit_in_bytes"):
+        try:
+            value = open(path).read().strip()
+        except OSError:
+            continue
+        if value.isdigit() and int(value) < 1 << 60:
+            return int(value)
+    return None
+
+def _memory_budget() -> int:
+    if ADMISSION_MEMORY_BUDGET_MB > 0:
+        return int(ADMISSION_MEMORY_BUDGET_MB * MB)
+    limit = _cgroup_memory_bytes()
+    return int(limit * 0.7) if limit else 2048 * MB
+
+class AdmissionRejected(Exception):
+    def __init__(self, status_code: int, detail: str, retry_after_s: int):
+        super().__init__(status_code, detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after_s = retry_after_s
+
+class AdmissionController:
+    """Concurrency, queue and resource budgets for one API process.
+
+    Lives on the event loop thread: acquire/release are not thread-safe.
+    """
+
+    def __init__(
+        self,
+        lanes: List[Lane],
+        memory_budget: int,
+        tmp_dir: Optional[str] = None,
+        tmp_min_free: int = int(ADMISSION_TMP_MIN_FREE_MB * MB),
+        queue_timeout_s: float = ADMISSION_QUEUE_TIMEOUT_S,
+    ):
+        self.lanes = {lane.name: lane for lane in lanes}
+        self._by_path = {path: lane for lane in lanes for path in lane.paths}
+        self.memory_budget = memory_budget
+        self.tmp_dir = tmp_dir or tempfile.gettempdir()
+        self.tmp_min_free = tmp_min_free
+        self.queue_timeout_s = queue_timeout_s
+        self.reserved_tmp = 0
+        self.reserved_memory = 0
+
+    def lane_for(self, path: str) -> Optional[Lane]:
+        return self._by_path.get(path)
+
+    def _tmp_free(self) -> int:
+        return shutil.disk_usage(self.tmp_dir).free
+
+    def _fits(self, tmp: int, memory: int) -> bool:
+        # with nothing reserved, admit anyway: a request bigger than the
+        # budget must not wait forever
+        if self.reserved_tmp == 0 and self.reserved_memory == 0:
+            return True
+        return (
+            self.reserved_memory + memory <= self.memory_budget
+            and self._tmp_free() - self.reserved_tmp - tmp >= self.tmp_min_free
+        )
+
+    def _retry_after(self, lane: Lane) -> int:
+        ahead = lane.in_flight + len(lane.waiters)
+        estimate = math.ceil(ahead / lane.concurrency * lane.service_s)
+        return max(1, min(ADMISSION_RETRY_AFTER_MAX_S, estimate))
+
+    def _reject(self, lane: Lane, status_code: int, reason: str, detail: str) -> AdmissionRejected:
+        REJECTED.inc(lane=lane.name, status=status_code, reason=reason)
+        return AdmissionRejected(status_code, detail, self._retry_after(lane))
+
+    def _start(self, lane: Lane, tmp: int, memory: int) -> None:
+        lane.in_flight += 1
+        self.reserved_tmp += tmp
+        self.reserved_memory += memory
+
+    async def acquire(self, lane: Lane, body_bytes: Optional[int]) -> Tuple[int, int]:
+        """Wait for a slot and the resources; returns the reservation to release."""
+        tmp, memory = lane.cost(body_bytes)
+
+        # waiting does not help when the disk is short before any reservation
+        if tmp and self._tmp_free() - tmp < self.tmp_min_free:
+            raise self._reject(lane, 503, "disk", "Server is low on disk space, please retry shortly")
+
+        if not lane.waiters and lane.in_flight < lane.concurrency and self._fits(tmp, memory):
+            self._start(lane, tmp, memory)
+            QUEUE_WAIT_SECONDS.observe(0.0, lane=lane.name)
+            return tmp, memory
+
+        if len(lane.waiters) >= lane.queue:
+            raise self._reject(lane, 429, "queue_full", "Too many requests in progress, please retry shortly")
+
+        waiter = asyncio.get_running_loop().create_future()
+        entry = (waiter, tmp, memory)
+        lane.waiters.append(entry)
+        queued = time.monotonic()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.queue_timeout_s)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.done() and not waiter.cancelled():
+                # admitted just as we gave up: hand the slot on
+                self._finish(lane, tmp, memory)
+            else:
+                waiter.cancel()
+                lane.waiters.remove(entry)
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            raise self._reject(lane, 503, "queue_timeout", "Server is busy, please retry shortly")
+        QUEUE_WAIT_SECONDS.observe(time.monotonic() - queued, lane=lane.name)
+        return tmp, memory
+
+    def release(self, lane: Lane, tmp: int, memory: int, started: float) -> None:
+        lane.service_s = 0.8 * lane.service_s + 0.2 * (time.monotonic() - started)
+        self._finish(lane, tmp, memory)
+
+    def _finish(self, lane: Lane, tmp: int, memory: int) -> None:
+        lane.in_flight -= 1
+        self.reserved_tmp -= tmp
+        self.reserved_memory -= memory
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        """Start queued requests, oldest first in each lane, while they fit."""
+        for lane in self.lanes.values():
+            while lane.waiters and lane.in_flight < lane.concurrency:
+                waiter, tmp, memory = lane.waiters[0]
+                if not self._fits(tmp, memory):
+                    break
+                lane.waiters.popleft()
+                self._start(lane, tmp, memory)
+                waiter.set_result(None)
+
+    def load(self) -> dict:
+        lanes = {
+            name: {
+                "in_flight": lane.in_flight,
+                "queued": len(lane.waiters),
+                "concurrency": lane.concurrency,
+                "queue": lane.queue,
+                "utilization": round(lane.utilization(), 3),
+                "retry_after_s": self._retry_after(lane),
+            }
+            for name, lane in self.lanes.items()
+        }
+        return {
+            "utilization": max((lane["utilization"] for lane in lanes.values()), default=0.0),
+            "lanes": lanes,
+            "reserved_tmp_bytes": self.reserved_tmp,
+            "tmp_free_bytes": self._tmp_free(),
+            "reserved_memory_bytes": self.reserved_memory,
+            "memory_budget_bytes": self.memory_budget,
+        }
+
+QUEUE_WAIT_SECONDS = register(Histogram("vegcooking_admission_queue_wait_seconds", "Time admitted requests waited for a slot, by lane"))
+REJECTED = register(Counter("vegcooking_admission_rejected_total", "Requests turned away by admission control, by lane, status and reason"))
+
+_apply_limits(DEFAULT_LANES, os.environ.get("ADMISSION_LIMITS", ""))
+controller = AdmissionController(DEFAULT_LANES, memory_budget=_memory_budget())
+
+register(Gauge(
+    "vegcooking_admission_in_flight", "Admitted requests running, by lane",
+    lambda: [({"lane": name}, lane.in_flight) for name, lane in controller.lanes.items()],
+))
+register(Gauge(
+    "vegcooking_admission_queued", "Requests waiting for a slot, by lane",
+    lambda: [({"lane": name}, len(lane.waiters)) for name, lane in controller.lanes.items()],
+))
+register(Gauge(
+    "vegcooking_admission_utilization",
+    "(in flight + queued) / concurrency, by lane; above 1 means requests are queueing",
+    lambda: [({"lane": name}, lane.utilization()) for name, lane in controller.lanes.items()],
+))
+
+class AdmissionMiddleware:
+    """Admits POSTs to the lanes' routes through the controller; other
+    requests pass straight through."""
+
+    def __init__(self, app, admission: Optional[AdmissionController] = None):
+        self.app = app
+        self.admission = admission
+
+    async def __call__(self, scope, receive, send):
+        admission = self.admission or controller
+        lane = admission.lane_for(scope.get("path", "")) if scope["type"] == "http" else None
+        if lane is None or scope.get("method") != "POST":
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            tmp, memory = await admission.acquire(lane, _content_length(scope))
+        except AdmissionRejected as e:
+            await _send_rejection(send, e)
+            return
+
+        started = time.monotonic()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            admission.release(lane, tmp, memory, started)
+
+def _content_length(scope) -> Optional[int]:
+    for name, value in scope.get("headers", []):
+        if name == b"content-length":
+            try:
+                return int(value)
+            except ValueError:
+                return None
+    return None
+
+async def _send_rejection(send, e: AdmissionRejected) -> None:
+    body = json.dumps({"detail": e.detail}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": e.status_code,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", str(e.retry_after_s).encode()),
+            # the client should not keep streaming an upload we will not read
+            (b"connection", b"close"),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
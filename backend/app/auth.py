@@ -0,0 +1,59 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from fastapi import Header, HTTPException
+
+from app.clients import supabase
+
+# The caller's identity for endpoints that write with the service role.
+#
+#   def save_recipe(payload: ..., user_id: str = Depends(current_user_id)):
+#
+# The app sends its Supabase session token as `Authorization: Bearer <jwt>`;
+# Supabase Auth verifies it and tells us whose it is. Never take a user id
+# from the request body or query string for writes: owner ids are visible in
+# the feed and search results.
+#
+# Verified tokens are remembered for AUTH_CACHE_TTL_S so a burst of requests
+# from one session costs one Auth round trip.
+
+AUTH_CACHE_TTL_S = float(os.environ.get("AUTH_CACHE_TTL_S", "60"))
+AUTH_CACHE_MAX = 4096
+
+# token -> (expires_at, user id), least recently used first
+_verified: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+_verified_lock = threading.Lock()
+
+def _bearer_token(authorization: Optional[str]) -> str:
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not token.strip():
+        raise HTTPException(status_code=401, detail="Sign in first")
+    return token.strip()
+
+def current_user_id(authorization: Optional[str] = Header(None)) -> str:
+    """FastAPI dependency: the id of the signed-in user making the request."""
+    token = _bearer_token(authorization)
+    now = time.monotonic()
+    with _verified_lock:
+        hit = _verified.get(token)
+        if hit is not None and hit[0] > now:
+            _verified.move_to_end(token)
+            return hit[1]
+
+    try:
+        res = supabase.auth.get_user(token)
+        user = res.user if res else None
+    except Exception:
+        user = None
+    if user is None:
+        raise HTTPException(status_code=401, detail="Session expired, sign in again")
+
+    with _verified_lock:
+        _verified[token] = (now + AUTH_CACHE_TTL_S, str(user.id))
+        _verified.move_to_end(token)
+        while len(_verified) > AUTH_CACHE_MAX:
+            _verified.popitem(last=False)
+    return str(user.id)
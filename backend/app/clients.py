@@ -0,0 +1,143 @@
+import os
+import time
+import threading
+from typing import Any, Callable, Dict
+
+from app.metrics import record_span
+
+# Supabase and OpenAI are built on first use, not at import.
+# Importing `supabase`/`openai` and opening their HTTP pools costs a noticeable
+# chunk of every cold start, and endpoints like /health never need them.
+# The proxies below keep the old module-level names working (`supabase.table(...)`,
+# `openai_client.responses.create(...)`) while deferring all of that work.
+
+# seconds spent constructing each client, filled on first use
+CLIENT_INIT_PROFILE: Dict[str, float] = {}
+
+def _require_env(*names: str) -> list:
+    values = [os.environ.get(n) for n in names]
+    missing = [n for n, v in zip(names, values) if not v]
+    if missing:
+        raise RuntimeError(f"Missing {' or '.join(missing)} env var")
+    return values
+
+class _LazyClient:
+    """Proxy that builds the real client on first attribute access."""
+
+    def __init__(self, name: str, factory: Callable[[], Any]):
+        self._name = name
+        self._factory = factory
+        self._client = None
+        self._lock = threading.Lock()
+
+    def get(self) -> Any:
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    start = time.perf_counter()
+                    self._client = self._factory()
+                    CLIENT_INIT_PROFILE[self._name] = time.perf_counter() - start
+        return self._client
+
+    def set(self, client: Any) -> None:
+        """Install a ready-made client (benchmarks use in-process fakes)."""
+        with self._lock:
+            self._client = client
+
+    @property
+    def initialized(self) -> bool:
+        return self._client is not None
+
+    def __getattr__(self, attr: str) -> Any:
+        return getattr(self.get(), attr)
+
+def _supabase_span_name(path: str) -> str:
+    # /rest/v1/<table>, /rest/v1/rpc/<function>, /storage/v1/..., /auth/v1/...
+    parts = [p for p in path.split("/") if p]
+    if len(parts) >= 3 and parts[0] == "rest":
+        return "supabase." + ".".join(parts[2:4])
+    if parts and parts[0] in ("storage", "auth"):
+        return "supabase." + parts[0]
+    return "supabase"
+
+def _on_supabase_request(request) -> None:
+    request.extensions["vegcooking_start"] = time.perf_counter()
+
+def _on_supabase_response(response) -> None:
+    start = response.request.extensions.get("vegcooking_start")
+    if start is not None:
+        record_span(
+            _supabase_span_name(response.request.url.path),
+            time.perf_counter() - start,
+            {"method": response.request.method, "status": response.status_code},
+        )
+
+def _create_supabase():
+    from supabase import create_client
+    from postgrest.utils import SyncClient as PostgrestSession
+    from storage3.utils import SyncClient as StorageSession
+    from gotrue.http_clients import SyncClient as AuthSession
+    from app.transport import SUPABASE_READ_TIMEOUT_S, build_http_client, build_transport
+
+    url, key = _require_env("SUPABASE_URL", "SUPABASE_SERVICE_ROLE")
+    client = create_client(url, key)
+
+    # supabase-py does not take an http client, so swap the PostgREST, Storage
+    # and Auth sessions for ones on the shared pooled/retrying transport. All
+    # three talk to one host, so they share one connection pool.
+    transport = build_transport("supabase")
+    # time every query (table reads/writes, RPCs, storage and auth calls)
+    hooks = {"request": [_on_supabase_request], "response": [_on_supabase_response]}
+
+    def session(default, cls):
+        swapped = build_http_client(
+            "supabase",
+            SUPABASE_READ_TIMEOUT_S,
+            client_cls=cls,
+            transport=transport,
+            base_url=default.base_url,
+            headers=default.headers,
+            follow_redirects=True,
+            event_hooks=hooks,
+        )
+        default.close()
+        return swapped
+
+    postgrest = client.postgrest
+    postgrest.session = session(postgrest.session, PostgrestSession)
+
+    storage = client.storage
+    storage.session = storage._client = session(storage.session, StorageSession)
+
+    # get_user() runs on every authenticated request (app/auth.py)
+    auth = client.auth
+    auth._http_client = auth.admin._http_client = session(auth._http_client, AuthSession)
+    return client
+
+def _create_openai():
+    from openai import OpenAI
+    from app.transport import OPENAI_READ_TIMEOUT_S, build_http_client, build_timeout
+    from app.openai_scheduler import scheduler
+
+    (api_key,) = _require_env("OPENAI_API_KEY")
+    return OpenAI(
+        api_key=api_key,
+        http_client=build_http_client(
+            "openai",
+            OPENAI_READ_TIMEOUT_S,
+            # keep the scheduler's budget in line with x-ratelimit-* headers
+            event_hooks={"response": [lambda response: scheduler.observe_headers(response.headers)]},
+        ),
+        timeout=build_timeout(OPENAI_READ_TIMEOUT_S),
+        # 429/5xx retries belong to the scheduler (openai_scheduler.py), which
+        # backs off the whole model instead of one call
+        max_retries=0,
+    )
+
+supabase = _LazyClient("supabase", _create_supabase)
+openai_client = _LazyClient("openai", _create_openai)
+
+def warm_clients() -> None:
+    """Build both clients now (modal_app.py calls this before the memory snapshot)."""
+    supabase.get()
+    openai_client.get()
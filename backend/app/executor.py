@@ -0,0 +1,127 @@
+import os
+import asyncio
+import multiprocessing
+from abc import ABC, abstractmethod
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Optional
+
+from app.metrics import replay_spans
+from app.pipeline import PipelineError, run_stage_traced
+
+# Where heavy pipeline stages (ffmpeg, yt-dlp, transcription, LLM passes) run.
+#
+#   IMPORT_EXECUTOR=process  local process pool (default; dev and tests)
+#   IMPORT_EXECUTOR=inline   in a thread of the API process
+#   IMPORT_EXECUTOR=modal    the dedicated `run_media_stage` Modal function,
+#                            which has its own image, concurrency and scaling
+#
+# API endpoints only ever call `await get_executor().submit(stage, *args)`.
+
+IMPORT_EXECUTOR = os.environ.get("IMPORT_EXECUTOR", "process")
+IMPORT_PROCESS_WORKERS = int(os.environ.get("IMPORT_PROCESS_WORKERS", "2"))
+MODAL_APP_NAME = os.environ.get("MODAL_APP_NAME", "vegcooking-backend")
+MODAL_MEDIA_FUNCTION = "run_media_stage"
+
+class StageExecutor(ABC):
+    name = "base"
+
+    async def submit(self, stage: str, *args: Any) -> Any:
+        result, spans = await self._run(stage, *args)
+        # spans recorded in the worker feed this process's metrics and Server-Timing
+        replay_spans(spans)
+        return result
+
+    @abstractmethod
+    async def _run(self, stage: str, *args: Any) -> tuple:
+        """Run run_stage_traced(stage, *args) somewhere; returns (result, spans)."""
+
+    def shutdown(self) -> None:
+        pass
+
+class InlineExecutor(StageExecutor):
+    """Runs stages in a worker thread of the API process."""
+
+    name = "inline"
+
+    async def _run(self, stage: str, *args: Any) -> tuple:
+        return await asyncio.to_thread(run_stage_traced, stage, *args)
+
+class ProcessPoolStageExecutor(StageExecutor):
+    """Runs stages in a local process pool, off the event loop and the GIL."""
+
+    name = "process"
+
+    def __init__(self, max_workers: int = IMPORT_PROCESS_WORKERS):
+        self.max_workers = max_workers
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # spawn: never fork a process that holds open HTTP pools and threads
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._pool
+
+    async def _run(self, stage: str, *args: Any) -> tuple:
+        loop = asyncio.get_running_loop()
+        pool = self._get_pool()
+        try:
+            return await loop.run_in_executor(pool, run_stage_traced, stage, *args)
+        except BrokenProcessPool:
+            # a worker died (OOM kill, crash); a broken pool never recovers,
+            # so start a fresh one for the next import
+            if self._pool is pool:
+                self._pool = None
+                pool.shutdown(wait=False, cancel_futures=True)
+            raise PipelineError(status_code=503, detail="Import worker crashed, please retry the import")
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+class ModalStageExecutor(StageExecutor):
+    """Dispatches stages to the deployed Modal media worker."""
+
+    name = "modal"
+
+    def __init__(self, app_name: str = MODAL_APP_NAME, function_name: str = MODAL_MEDIA_FUNCTION):
+        self.app_name = app_name
+        self.function_name = function_name
+        self._fn = None
+
+    def _get_function(self):
+        if self._fn is None:
+            import modal
+
+            self._fn = modal.Function.from_name(self.app_name, self.function_name)
+        return self._fn
+
+    async def _run(self, stage: str, *args: Any) -> tuple:
+        return await self._get_function().remote.aio(stage, list(args))
+
+_EXECUTORS = {
+    "inline": InlineExecutor,
+    "process": ProcessPoolStageExecutor,
+    "modal": ModalStageExecutor,
+}
+
+_executor: Optional[StageExecutor] = None
+
+def get_executor() -> StageExecutor:
+    global _executor
+    if _executor is None:
+        if IMPORT_EXECUTOR not in _EXECUTORS:
+            raise RuntimeError(f"Unknown IMPORT_EXECUTOR: {IMPORT_EXECUTOR}")
+        _executor = _EXECUTORS[IMPORT_EXECUTOR]()
+    return _executor
+
+def set_executor(executor: StageExecutor) -> None:
+    """Swap the executor (benchmarks and tests)."""
+    global _executor
+    if _executor is not None and _executor is not executor:
+        _executor.shutdown()
+    _executor = executor
@@ -1,24 +1,36 @@
+import time
+_IMPORT_STARTED = time.perf_counter()
+
 import os
 import re
 import json
+import asyncio
 import decimal
-from fastapi import FastAPI, HTTPException
+from fastapi import Depends, FastAPI, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from starlette.concurrency import iterate_in_threadpool
 from pydantic import BaseModel
-from typing import Optional, List, Any, cast
-from supabase import create_client, Client
-import modal
+from typing import Optional, List, Any, Iterator
 import base64
-import json
-import tempfile
-import subprocess
-import socket
-import ipaddress
-from urllib.parse import urlparse
-from pathlib import Path
+import bisect
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 
 from fastapi import UploadFile, File
-from openai import OpenAI
+
+# Supabase/OpenAI clients are constructed lazily on first use (see clients.py)
+from app.clients import supabase, openai_client, CLIENT_INIT_PROFILE
+from app.pipeline import COVER_WIDTHS, PipelineError, norm_name, stream_final_recipe
+from app.admission import AdmissionMiddleware, controller as admission
+from app.auth import current_user_id
+from app.executor import get_executor
+from app.metrics import TimingMiddleware, log_event, record_openai_usage, render_metrics, span
+from app.openai_scheduler import estimate_tokens, scheduler as openai_scheduler
+from app.url_safety import CheckedUrl, url_checker
 
 # Custom JSON encoder to handle Decimal types
 class CustomJSONEncoder(json.JSONEncoder):
@@ -31,22 +43,12 @@ def json_serialize(obj):
     """Helper function to serialize objects with Decimal types"""
     return json.loads(json.dumps(obj, cls=CustomJSONEncoder))
 
-SUPABASE_URL = os.environ.get("SUPABASE_URL")
-SUPABASE_SERVICE_ROLE = os.environ.get("SUPABASE_SERVICE_ROLE")
-
-if not SUPABASE_URL or not SUPABASE_SERVICE_ROLE:
-    raise RuntimeError("Missing SUPABASE_URL or SUPABASE_SERVICE_ROLE env var")
-
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_SERVICE_ROLE)
-
-OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY")
-if not OPENAI_API_KEY:
-    raise RuntimeError("Missing OPENAI_API_KEY env var")
-
-openai_client = OpenAI(api_key=OPENAI_API_KEY)
-
 cookApp = FastAPI()
-DEBUG_IMPORT = False
+
+# Concurrency limits, temp-disk/memory budgets and bounded queues for the heavy
+# endpoints (see admission.py). Added first so it sits inside CORS and the
+# timing middleware: rejections still get CORS headers and are measured.
+cookApp.add_middleware(AdmissionMiddleware)
 
 # allow only your dev + prod origins
 ALLOWED_ORIGINS = [
@@ -62,403 +64,10 @@ cookApp.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Per-request latency histograms + Server-Timing header with stage spans
+cookApp.add_middleware(TimingMiddleware)
 
-def _setup_video_processing(video: UploadFile, temp_dir: str) -> tuple[Path, Path, List[str]]:
-    """Setup video processing: save upload, extract audio and frames."""
-    td_path = Path(temp_dir)
-    video_path = td_path / f"upload_{video.filename}"
-    audio_path = td_path / "audio.wav"
-    frames_dir = td_path / "frames"
-
-    contents = video.file.read()
-    video_path.write_bytes(contents)
-
-    extract_audio(str(video_path), str(audio_path)) 
-    frame_paths = extract_frames(str(video_path), str(frames_dir), fps=1.5, max_frames=18)
-    
-    return audio_path, frame_paths
-
-def _transcribe_audio(audio_path: Path) -> str:
-    """Transcribe audio using OpenAI."""
-    with open(audio_path, "rb") as f:
-        transcript_obj = openai_client.audio.transcriptions.create(
-            model="gpt-4o-mini-transcribe",
-            file=f,
-        )
-    return getattr(transcript_obj, "text", "") or ""
-
-def _get_raw_extraction_schema() -> dict:
-    """Get the JSON schema for raw recipe extraction."""
-    return {
-        "type": "object",
-        "additionalProperties": False,
-        "properties": {
-            "raw_ingredients": {
-                "type": "array",
-                "items": {
-                    "type": "object",
-                    "additionalProperties": False,
-                    "properties": {
-                        "name": { "type": "string" },
-                        "quantity_text": { "type": ["string", "null"] },
-                        "source": { "type": "string", "enum": ["spoken", "visual", "assumed"] }
-                    },
-                    "required": ["name", "quantity_text", "source"]
-                }
-            },
-            "raw_steps": {"type": "array", "items": {"type": "string"}},
-            "oven_temp": {"type": ["string", "null"]},
-            "bake_time": {"type": ["string", "null"]},
-            "pan_size": {"type": ["string", "null"]},
-            "servings_hint": {"type": ["string", "null"]},
-        },
-        "required": ["raw_ingredients", "raw_steps", "oven_temp", "bake_time", "pan_size", "servings_hint"],
-    }
-
-def _extract_raw_recipe_data(transcript_text: str, frame_paths: List[str]) -> dict:
-    """Extract raw recipe data from transcript and video frames."""
-    images = [{"type": "input_image", "image_url": to_data_url_jpg(p)} for p in frame_paths]
-    raw_schema = _get_raw_extraction_schema()
-    
-    raw_prompt = f"""
-You are extracting cooking info from a video.
-
-Goal: CAPTURE EVERYTHING mentioned or shown. Completeness > cleanliness.
-
-Rules:
-- Do NOT summarize.
-- Do NOT normalize ingredient names.
-- Include ALL ingredients even if minor (nuts, water, flour, toppings, add-ins).
-- Include ALL steps including prep, mixing, baking, cooling, serving.
-- If something is mentioned or shown, include it.
-- Output ONLY valid JSON.
-
-IMPORTANT INFERENCE RULES:
-
-- If a baked dessert batter is shown or described,
-  and flour is NOT mentioned verbally,
-  you MUST still include "flour" as an ingredient.
-
-- If chopped nuts are visible in ANY frame,
-  include them explicitly (e.g. "walnuts"),
-  even if not spoken.
-
-- If an ingredient is visually obvious but not spoken,
-  include it and set source = "visual".
-
-- If an ingredient is REQUIRED for the recipe to function
-  (e.g. flour in brownies, walnuts or chocolate shards on top, etc.),
-  include it and set source = "assumed".
-
-
-Transcript:
-{transcript_text}
-"""
-
-    raw_input_payload = [
-        {
-            "role": "user",
-            "content": [
-                {"type": "input_text", "text": raw_prompt},
-                *images,
-            ],
-        }
-    ]
-
-    raw_text_payload = {
-        "format": {
-            "type": "json_schema",
-            "name": "raw_extraction",
-            "schema": raw_schema,
-        }
-    }
-
-    raw_resp = openai_client.responses.create(
-        model="gpt-4o-mini",
-        input=cast(Any, raw_input_payload),
-        text=cast(Any, raw_text_payload),
-    )
-
-    try:
-        raw_data = json.loads(raw_resp.output_text)
-        if DEBUG_IMPORT:
-            print("========== RAW EXTRACTION ==========")
-            print("RAW INGREDIENTS:")
-            for i, ing in enumerate(raw_data.get("raw_ingredients", []), 1):
-                print(f"{i}. {ing}")
-
-            print("\nRAW STEPS:")
-            for i, step in enumerate(raw_data.get("raw_steps", []), 1):
-                print(f"{i}. {step}")
-
-            print("\nMETA:")
-            print("oven_temp:", raw_data.get("oven_temp"))
-            print("bake_time:", raw_data.get("bake_time"))
-            print("pan_size:", raw_data.get("pan_size"))
-            print("servings_hint:", raw_data.get("servings_hint"))
-            print("===================================")
-        return raw_data
-    except Exception:
-        raise HTTPException(status_code=500, detail=f"Pass 1 invalid JSON. Raw: {raw_resp.output_text[:400]}")
-
-def _audit_missing_ingredients(raw_data: dict) -> List[str]:
-    """Audit extracted data for missing implied ingredients."""
-    audit_prompt = f"""
-        You are auditing extracted cooking data for missing ingredients.
-
-        RAW INGREDIENTS:
-        {json.dumps(raw_data.get("raw_ingredients", []), indent=2)}
-
-        RAW STEPS:
-        {json.dumps(raw_data.get("raw_steps", []), indent=2)}
-
-        TASK:
-        - Identify any ingredients that are REQUIRED, IMPLIED, or VISUALLY OBVIOUS
-        but missing from RAW INGREDIENTS.
-        - Examples:
-        - Flour in brownies or cakes
-        - Walnuts or nuts if nut brownies
-        - Chocolate chunks if visible
-        - Baking pan grease
-        - Do NOT repeat existing ingredients.
-        - Do NOT invent quantities.
-
-        Return ONLY valid JSON in this exact shape:
-        {{
-        "missing_ingredients": [string]
-        }}
-        """
-
-    audit_resp = openai_client.responses.create(
-        model="gpt-4o-mini",
-        input=[
-            {
-                "role": "user",
-                "content": [{"type": "input_text", "text": audit_prompt}],
-            }
-        ],
-        text={
-            "format": {
-                "type": "json_schema",
-                "name": "audit_result",
-                "schema": {
-                    "type": "object",
-                    "additionalProperties": False,
-                    "properties": {
-                        "missing_ingredients": {
-                            "type": "array",
-                            "items": {"type": "string"}
-                        }
-                    },
-                    "required": ["missing_ingredients"]
-                }
-            }
-        }
-    )
-
-    audit_data = json.loads(audit_resp.output_text)
-    return audit_data.get("missing_ingredients", [])
-
-def _merge_missing_ingredients(raw_data: dict, missing_ingredients: List[str]) -> None:
-    """Merge missing ingredients into raw_data."""
-    existing_norms = {
-        norm_name(ing["name"])
-        for ing in raw_data.get("raw_ingredients", [])
-    }
-
-    for name in missing_ingredients:
-        if norm_name(name) in existing_norms:
-            continue
-
-        raw_data["raw_ingredients"].append({
-            "name": name,
-            "quantity_text": None,
-            "source": "assumed"
-        })
-
-    if DEBUG_IMPORT:
-        print("========== SANITY CHECK ==========")
-        print("Added inferred ingredients:", missing_ingredients)
-        print("=================================")
-
-def _get_final_recipe_schema() -> dict:
-    """Get the JSON schema for final recipe structuring."""
-    return {
-        "name": "recipe_draft",
-        "schema": {
-            "type": "object",
-            "additionalProperties": False,
-            "properties": {
-                "title": {"type": "string"},
-                "caption": {"type": ["string", "null"]},
-                "description": {"type": ["string", "null"]},
-                "servings": {"type": ["integer", "null"]},
-                "prep_time": {"type": ["string", "null"]},
-                "cook_time": {"type": ["string", "null"]},
-                "difficulty": {"type": ["string", "null"], "enum": ["Easy", "Medium", "Hard", None]},
-                "tags": {"type": "array", "items": {"type": "string"}},
-                "ingredients": {
-                    "type": "array",
-                    "items": {
-                        "type": "object",
-                        "additionalProperties": False,
-                        "properties": {
-                            "name": {"type": "string"},
-                            "ingredient_id": {"type": ["integer", "null"]},
-                            "quantity": {"type": ["number", "null"]},
-                            "unit": {"type": ["string", "null"]},
-                            "notes": {"type": ["string", "null"]},
-                        },
-                        "required": ["name", "ingredient_id", "quantity", "unit", "notes"],
-                    },
-                },
-                "steps": {
-                    "type": "array",
-                    "items": {
-                        "type": "object",
-                        "additionalProperties": False, 
-                        "properties": {
-                            "position": {"type": "integer"},
-                            "body": {"type": "string"},
-                        },
-                        "required": ["position", "body"],
-                    },
-                },
-            },
-            "required": ["title", "caption", "description", "servings", "prep_time", "cook_time", "difficulty", "tags", "ingredients", "steps"],
-        },
-        "strict": True,
-    }
-
-def _structure_final_recipe(raw_data: dict, transcript_text: str) -> dict:
-    """Structure the final recipe from raw extracted data."""
-    schema = _get_final_recipe_schema()
-    
-    prompt_text = f"""
-You are converting a cooking video into a clean recipe JSON.
-
-You MUST use the extracted lists below as source-of-truth.
-Do not omit items from them.
-
-RAW_INGREDIENTS (source-of-truth):
-{json.dumps(raw_data.get("raw_ingredients", []), ensure_ascii=False)}
-
-RAW_STEPS (source-of-truth):
-{json.dumps(raw_data.get("raw_steps", []), ensure_ascii=False)}
-
-Hints:
-- oven_temp: {raw_data.get("oven_temp")}
-- bake_time: {raw_data.get("bake_time")}
-- pan_size: {raw_data.get("pan_size")}
-- servings_hint: {raw_data.get("servings_hint")}
-
-Rules:
-- Return ONLY valid JSON that matches the schema. No extra keys, no markdown.
-- Every RAW_INGREDIENT must appear in ingredients[] (normalized).
-- Every ingredient must be used in at least one step.
-- Steps must cover full process start→finish (preheat, mix, add-ins, pan, bake, cool, serve).
-- ingredient_id must be null (server will fill it).
-- Diet tags:
-  - No animal products => Vegan (and NOT Vegetarian).
-  - Dairy present but no eggs => Vegetarian (and NOT Vegan).
-  - Never include both.
-- If baking is present, cook_time MUST be filled.
-
-
-ACCURACY + COMPLETENESS (MOST IMPORTANT)
-- Produce a COMPLETE recipe: do not omit ingredients or steps that appear in the transcript or on-screen text.
-- If any ingredient is mentioned in transcript OR visible on screen, it MUST appear in the ingredients list.
-- Every ingredient in the ingredients list MUST be used in at least one step.
-- Steps MUST cover the entire process from start to finish (prep → cook/bake → cool/finish).
-
-TITLE
-- Title must be specific and correct (ex: "Vegan Brownies").
-- Do NOT use generic titles like "Chocolate Cake" unless the recipe is explicitly cake.
-- If baked in a square/rectangular pan and sliced into squares/bars, prefer "brownies" or "bars" over "cake".
-
-DIET TAG LOGIC (HARD RULES)
-- If there are NO animal products (no eggs, dairy, meat, honey), include tag "Vegan".
-- If eggs are absent but dairy is present, include tag "Vegetarian" (and do NOT include Vegan).
-- Never include both "Vegan" and "Vegetarian" together.
-- Tags must come only from this set if relevant:
-  Vegan, Vegetarian, Gluten-Free, Dairy-Free, Healthy, Dessert, Comfort Food, Quick, Breakfast, Dinner, Spicy
-- Only include tags that are clearly supported by the recipe.
-
-SERVINGS + TIMES
-- If servings are stated, use them.
-- If not stated, infer servings using pan size or typical yield or ingredient quantity (ex: "9" for a 9-inch square pan).
-- If baking is present, cook_time MUST be included and must reflect the baking time.
-- prep_time should reflect mixing + prep steps (reasonable estimate if not stated).
-- Prefer concise time strings like "10 min" or "12-15 min" (not paragraphs).
-
-INGREDIENTS
-- Ingredients must be normalized to common names (ex: "cocoa powder", "all-purpose flour", "vegetable oil").
-- Include ALL ingredients with correct amounts when available.
-- If a quantity is known but unit is unclear, set unit to null.
-- If both quantity and unit are unknown, set both to null, but still include the ingredient name.
-- If an ingredient is "divided or chopped" (ex: chocolate shards), keep it as ONE ingredient and put "divided" in notes.
-
-STEPS
-- MAKE STEPS AS DETAILED AS POSSIBLE FOR USERS
-- Steps must be short, clear, and in correct order.
-- Include temperatures and baking times exactly if stated; otherwise infer from context only if strongly implied.
-- Baking recipes MUST include:
-  1) Preheat instruction
-  2) Mixing instructions in correct grouping (dry/wet if relevant)
-  3) Pan size / lining/greasing if mentioned or visible
-  4) Bake temperature + time
-  5) Cooling instruction
-  6) Final serve/slice step
-- Do not collapse the recipe into vague steps like "mix everything"; be specific about what gets added when.
-
-CONSISTENCY CHECK (SELF-VERIFY BEFORE FINAL OUTPUT)
-- Verify no important ingredients are missing (especially add-ins like nuts/chocolate).
-- Verify steps include baking + cooling if baked.
-- Verify tags obey the Vegan/Vegetarian rule.
-
-- If amounts are unknown, set quantity/unit to null.
-- Difficulty must be Easy/Medium/Hard.
-- Do NOT stop early in figuring out steps and writting all the steps in detail.
-- Return ONLY the JSON in the schema.
-Transcript (For extra context if needed):
-{transcript_text}
-"""
-
-    input_payload = [
-        {
-            "role": "user",
-            "content": [
-                {"type": "input_text", "text": prompt_text},
-            ],
-        }
-    ]
-
-    text_payload = {
-        "format": {
-            "type": "json_schema",
-            "name": "recipe_draft",      
-            "schema": schema["schema"],       
-        }
-    }
-
-    resp = openai_client.responses.create(
-        model="gpt-4o-mini",
-        input=cast(Any, input_payload),   
-        text=cast(Any, text_payload),     
-    )
-
-    try:
-        data = json.loads(resp.output_text)
-        if DEBUG_IMPORT:
-            print("========== FINAL INGREDIENTS ==========")
-            for i, ing in enumerate(data.get("ingredients", []), 1):
-                print(f"{i}. {ing.get('name')} | qty={ing.get('quantity')} | unit={ing.get('unit')}")
-            print("======================================")
-        return data
-    except Exception:
-        raise HTTPException(status_code=500, detail=f"Model did not return valid JSON. Raw: {resp.output_text[:400]}")
-
-def _resolve_ingredient_ids(data: dict, created_by: Optional[int] = None) -> None:
+def _resolve_ingredient_ids(data: dict, created_by: Optional[str] = None) -> None:
     """Resolve or create ingredient IDs for all ingredients."""
     ingredient_map = load_ingredient_map()
 
@@ -476,7 +85,6 @@ class RecipeIn(BaseModel):
     title: str
     caption: Optional[str] = None
     image_url: Optional[str] = None
-    user_id: str  # pass the authenticated user's id from frontend
 
 class RecipeOut(BaseModel):
     id: int
@@ -497,6 +105,15 @@ class DraftStep(BaseModel):
     position: int
     body: str
 
+class CoverVariant(BaseModel):
+    width: int
+    path: str  # recipe-media storage path (WebP)
+
+class DraftCover(BaseModel):
+    time_s: float  # where in the video the frame was taken
+    image_url: str  # largest variant; what the app saves as the recipe's image_url
+    variants: List[CoverVariant] = []
+
 class RecipeDraft(BaseModel):
     title: str
     caption: Optional[str] = None
@@ -508,6 +125,16 @@ class RecipeDraft(BaseModel):
     tags: List[str] = []
     ingredients: List[DraftIngredient] = []
     steps: List[DraftStep] = []
+    cover: Optional[DraftCover] = None
+
+class RecipeSaveIn(RecipeDraft):
+    recipe_id: Optional[int] = None  # None creates a new recipe
+    is_public: bool = False
+    image_url: Optional[str] = None
+    demo_url: Optional[str] = None
+
+class RecipeSaveOut(BaseModel):
+    id: int
 
 class VideoUrlIn(BaseModel):
     url: str
@@ -518,22 +145,72 @@ class VideoUrlIn(BaseModel):
 def health():
     return {"ok": True}
 
+@cookApp.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Prometheus text exposition of request/stage latency histograms and token counters."""
+    return render_metrics()
+
+@cookApp.get("/load")
+def load():
+    """Admission-control load: in-flight and queued requests per lane, and
+    reserved disk/memory. utilization > 1 means requests are queueing."""
+    return admission.load()
+
+@cookApp.get("/startup-profile")
+def startup_profile():
+    """Import and client-construction timings for this container (seconds)."""
+    return {
+        "import_s": IMPORT_PROFILE.get("app.main"),
+        "clients_s": dict(CLIENT_INIT_PROFILE),
+    }
+
 @cookApp.get("/recipes", response_model=List[RecipeOut])
 def list_recipes():
     # simple: read all
     res = supabase.table("recipes").select("*").order("created_at", desc=True).execute()
     return res.data or []
 
+class RecipeSearchHit(BaseModel):
+    id: int
+    title: str
+    caption: Optional[str] = None
+    image_url: Optional[str] = None
+    user_id: str
+    tags: List[str] = []
+    created_at: str
+    rank: float
+
+@cookApp.get("/recipes/search", response_model=List[RecipeSearchHit])
+def search_recipes(
+    q: str,
+    tags: Optional[List[str]] = Query(None),
+    limit: int = 20,
+    prefix: bool = False,
+):
+    """
+    Ranked title/caption search backed by the search_recipes() RPC
+    (tsvector + trigram indexes). Use prefix=true for typeahead.
+    """
+    q = q.strip()
+    if not q:
+        return []
+    res = supabase.rpc("search_recipes", {
+        "p_query": q,
+        "p_tag_filters": tags or None,
+        "p_limit": max(1, min(limit, 50)),
+        "p_prefix": prefix,
+    }).execute()
+    return [{**r, "tags": r.get("tags") or []} for r in (res.data or [])]
+
 @cookApp.post("/recipes", response_model=RecipeOut)
-def create_recipe(payload: RecipeIn):
-    # insert with service role, but RLS policies still apply when using anon keys.
-    # here we use service role to ensure server-side control,
-    # but we still require user_id from the client (from auth).
+def create_recipe(payload: RecipeIn, user_id: str = Depends(current_user_id)):
+    # insert with the service role (bypasses RLS), so the owner is the
+    # signed-in user from the session token, never an id from the request
     insert_data = {
         "title": payload.title,
         "caption": payload.caption,
         "image_url": payload.image_url,
-        "user_id": payload.user_id,
+        "user_id": user_id,
     }
     # call execute() directly (type stubs may not expose .select()/.single())
     res = supabase.table("recipes").insert(insert_data).execute()
@@ -543,64 +220,179 @@ def create_recipe(payload: RecipeIn):
     created = res.data[0] if isinstance(res.data, list) else res.data
     return created
 
+@cookApp.post("/recipes/save", response_model=RecipeSaveOut)
+def save_recipe(payload: RecipeSaveIn, user_id: str = Depends(current_user_id)):
+    """
+    Save a whole recipe (row, ingredients, steps, tags) in one round trip.
+    The save_recipe() Postgres function does the insert or owner-checked
+    update and replaces the ingredient and step lists in one transaction.
+    Fields the client did not send are left as they are on update.
+    The owner is the signed-in caller (Authorization header).
+    """
+    data = payload.model_dump(exclude_unset=True)
+    data.pop("cover", None)  # the chosen cover arrives as image_url
+    if _IMPORT_COVER_PATH.fullmatch(data.get("image_url") or ""):
+        data["image_url"] = _keep_import_cover(data["image_url"])
+    recipe_id = data.pop("recipe_id", None)
+    ingredients = data.pop("ingredients", None)
+    steps = data.pop("steps", None)
+
+    # imported drafts arrive resolved; only hand-typed names need a lookup
+    if ingredients:
+        unresolved = [ing for ing in ingredients if not ing.get("ingredient_id")]
+        if unresolved:
+            _resolve_ingredient_ids({"ingredients": unresolved}, created_by=user_id)
+
+    try:
+        res = supabase.rpc("save_recipe", {
+            "p_user_id": user_id,
+            "p_recipe_id": recipe_id,
+            "p_recipe": data,
+            "p_ingredients": ingredients,
+            "p_steps": steps,
+        }).execute()
+    except Exception as e:
+        if "P0002" in str(e):
+            raise HTTPException(status_code=404, detail="Recipe not found")
+        raise HTTPException(status_code=500, detail=f"Save failed: {str(e)}")
+
+    return RecipeSaveOut(id=res.data)
+
 @cookApp.delete("/recipes/{recipe_id}")
-def delete_recipe(recipe_id: int, user_id: str):
-    # only allow delete if belongs to provided user_id
-    # enforce in code + rely on policy for defense-in-depth
-    existing = supabase.table("recipes").select("*").eq("id", recipe_id).single().execute().data
-    if not existing:
+def delete_recipe(recipe_id: int, user_id: str = Depends(current_user_id)):
+    # one conditional delete: the owner check (against the signed-in caller)
+    # is part of the WHERE clause, so someone else's recipe is reported the
+    # same as a missing one
+    deleted = (
+        supabase.table("recipes")
+        .delete()
+        .eq("id", recipe_id)
+        .eq("user_id", user_id)
+        .execute()
+    ).data
+    if not deleted:
         raise HTTPException(status_code=404, detail="Recipe not found")
+    return {"ok": True}
 
-    if existing["user_id"] != user_id:
-        raise HTTPException(status_code=403, detail="Not your recipe")
+# ---------- Personalized feed sessions ----------
+# The feed is ranked once per session and cached here; later pages are served
+# from the cached order with an opaque (score, created_at, id) cursor, so a
+# scroll page costs O(page size) instead of re-scoring the whole recipe table.
+
+FEED_RANK_LIMIT = 500
+FEED_SESSION_TTL_S = 10 * 60
+FEED_SESSION_MAX = 1024
+
+class FeedPage(BaseModel):
+    items: List[dict]
+    next_cursor: Optional[str] = None
+
+class _FeedSession:
+    def __init__(self, ranked: List[dict]):
+        self.ranked = ranked
+        # ascending sort keys so bisect can seek to the row after a cursor
+        self.keys = [_feed_sort_key(r) for r in ranked]
+        self.expires_at = time.monotonic() + FEED_SESSION_TTL_S
+
+_feed_sessions: "OrderedDict[str, _FeedSession]" = OrderedDict()
+_feed_sessions_lock = threading.Lock()
+
+def _feed_epoch(created_at: Optional[str]) -> float:
+    if not created_at:
+        return 0.0
+    return datetime.fromisoformat(created_at.replace("Z", "+00:00")).timestamp()
+
+def _feed_sort_key(row: dict) -> tuple:
+    # ORDER BY personalization_score DESC, created_at DESC, id DESC
+    return (
+        -float(row.get("personalization_score") or 0.0),
+        -_feed_epoch(row.get("created_at")),
+        -int(row["id"]),
+    )
 
-    supabase.table("recipes").delete().eq("id", recipe_id).execute()
-    return {"ok": True}
+def _encode_feed_cursor(key: tuple) -> str:
+    raw = json.dumps([-key[0], -key[1], -key[2]]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
 
-def run_ffmpeg(cmd: List[str]) -> None:
-    # ffmpeg is noisy; we just want it to fail loudly if needed
-    res = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-    if res.returncode != 0:
-        raise RuntimeError(f"ffmpeg failed: {res.stderr[-800:]}")
-
-def extract_audio(video_path: str, out_wav_path: str) -> None:
-    # mono 16k wav is perfect for transcription
-    run_ffmpeg([
-        "ffmpeg", "-y",
-        "-i", video_path,
-        "-vn",
-        "-ac", "1",
-        "-ar", "16000",
-        out_wav_path
-    ])
-
-def extract_frames(video_path: str, frames_dir: str, fps: float = 1.0, max_frames: int = 12) -> List[str]:
+def _decode_feed_cursor(cursor: str) -> tuple:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        score, epoch, recipe_id = json.loads(base64.urlsafe_b64decode(padded))
+        return (-float(score), -float(epoch), -int(recipe_id))
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid feed cursor")
+
+def _rank_personalized_feed(user_id: str) -> _FeedSession:
+    """Score the candidate recipes once and cache the ordered list."""
+    res = supabase.rpc("get_personalized_feed_ranking", {
+        "p_user_id": user_id,
+        "p_limit": FEED_RANK_LIMIT,
+    }).execute()
+    session = _FeedSession(res.data or [])
+    with _feed_sessions_lock:
+        _feed_sessions[user_id] = session
+        _feed_sessions.move_to_end(user_id)
+        while len(_feed_sessions) > FEED_SESSION_MAX:
+            _feed_sessions.popitem(last=False)
+    return session
+
+def _get_feed_session(user_id: str) -> Optional[_FeedSession]:
+    with _feed_sessions_lock:
+        session = _feed_sessions.get(user_id)
+        if session is None:
+            return None
+        if session.expires_at < time.monotonic():
+            del _feed_sessions[user_id]
+            return None
+        _feed_sessions.move_to_end(user_id)
+        return session
+
+@cookApp.get("/feed/personalized", response_model=FeedPage)
+def personalized_feed(
+    limit: int = 12,
+    cursor: Optional[str] = None,
+    user_id: str = Depends(current_user_id),
+):
     """
-    Extract ~1 frame per second, then keep only the first max_frames frames.
+    Personalized feed of the signed-in user, with cursor pagination.
+    The first page (no cursor) re-ranks; later pages reuse the cached ranking.
+    If the cache was evicted (or another container serves the request) we
+    re-rank and seek past the cursor, so pages never repeat.
     """
-    Path(frames_dir).mkdir(parents=True, exist_ok=True)
-    out_pattern = str(Path(frames_dir) / "frame_%03d.jpg")
-
-    run_ffmpeg([
-        "ffmpeg", "-y",
-        "-i", video_path,
-        "-vf", f"fps={fps}",
-        out_pattern
-    ])
-
-    frames = sorted(Path(frames_dir).glob("frame_*.jpg"))
-    frames = frames[:max_frames]
-    return [str(p) for p in frames]
-
-def to_data_url_jpg(path: str) -> str:
-    b = Path(path).read_bytes()
-    b64 = base64.b64encode(b).decode("utf-8")
-    return f"data:image/jpeg;base64,{b64}"
-
-def norm_name(s: str) -> str:
-    s = (s or "").strip().lower()
-    s = re.sub(r"\s+", " ", s)
-    return s
+    limit = max(1, min(limit, 50))
+
+    start = 0
+    if cursor:
+        after = _decode_feed_cursor(cursor)
+        session = _get_feed_session(user_id) or _rank_personalized_feed(user_id)
+        start = bisect.bisect_right(session.keys, after)
+    else:
+        session = _rank_personalized_feed(user_id)
+
+    page = session.ranked[start:start + limit]
+    if not page:
+        return FeedPage(items=[], next_cursor=None)
+
+    # Hydrate only the rows on this page
+    page_ids = [int(r["id"]) for r in page]
+    rows = (
+        supabase.table("public_recipes_with_stats")
+        .select("*")
+        .in_("id", page_ids)
+        .execute()
+    ).data or []
+    by_id = {int(r["id"]): r for r in rows}
+
+    items = []
+    for ranked in page:
+        row = by_id.get(int(ranked["id"]))
+        if row is None:
+            continue  # deleted since ranking
+        items.append({**row, "personalization_score": ranked.get("personalization_score")})
+
+    end = start + len(page)
+    next_cursor = _encode_feed_cursor(session.keys[end - 1]) if end < len(session.ranked) else None
+    return FeedPage(items=json_serialize(items), next_cursor=next_cursor)
 
 def load_ingredient_map() -> dict:
     # Pull only what we need for matching
@@ -634,72 +426,90 @@ def resolve_or_create_ingredient(ingredient_map: dict, name: str, created_by: Op
     ingredient_map[key] = created[0]
     return int(created[0]["id"])
 
-def _is_public_http_url(url: str) -> bool:
+async def _check_url(url: str) -> CheckedUrl:
+    """Refuse links that are not public http(s) (all A/AAAA records checked, cached)."""
+    checked = await url_checker.check(url)
+    if checked is None:
+        raise HTTPException(status_code=400, detail="URL must be a public http(s) link")
+    return checked
+
+async def _submit_stage(stage: str, *args: Any) -> Any:
+    """Run a heavy pipeline stage on the configured executor."""
     try:
-        u = urlparse(url)
-        if u.scheme not in ("http", "https"):
-            return False
-        if not u.netloc:
-            return False
+        return await get_executor().submit(stage, *args)
+    except PipelineError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
 
-        host = u.hostname
-        if not host:
-            return False
+@cookApp.post("/download-video-test")
+async def download_video_test(request: dict):
+    url = request.get("url")
+    if not url:
+        raise HTTPException(status_code=400, detail="URL is required")
+    checked = await _check_url(url)
+    return await _submit_stage("download_test", url, checked.addresses)
 
-        # Resolve hostname -> IP and block private/internal ranges
-        ip_str = socket.gethostbyname(host)
-        ip = ipaddress.ip_address(ip_str)
-        if ip.is_private or ip.is_loopback or ip.is_link_local or ip.is_reserved or ip.is_multicast:
-            return False
+class GrocerySyncRequest(BaseModel):
+    list_id: int
+    week_start: str  # YYYY-MM-DD
+    week_end: str    # YYYY-MM-DD
 
-        return True
-    except Exception:
-        return False
+class GrocerySyncResponse(BaseModel):
+    list_id: int
+    items: List[dict]
+    ingredients: List[dict]
 
-def download_video_from_url(url: str, temp_dir: str) -> Path:
+@cookApp.post("/grocery/sync", response_model=GrocerySyncResponse)
+def grocery_sync(request: GrocerySyncRequest, user_id: str = Depends(current_user_id)):
     """
-    Downloads a low-res MP4 into temp_dir and returns the path.
-    Uses yt-dlp and keeps file only inside temp_dir (auto-deleted by TemporaryDirectory).
+    Rebuild the signed-in user's shopping list from their meal plans for the
+    week. Aggregation and the insert/update/delete diff run inside the
+    sync_shopping_list() Postgres function as one transaction, so the client
+    makes a single round trip and gets the new list back.
     """
-    
-    outtmpl = Path(temp_dir) / "video.mp4"
-
-    import yt_dlp
-
-    # Configure options
-    ydl_opts = {
-        'js_runtimes': {
-            'deno': {
-                'path': '/root/.deno/bin/deno'
-            }
-        },
-        'format': 'bv*[ext=mp4][height<=360]+ba[ext=m4a]/b[ext=mp4][height<=360]/b',
-        'merge_output_format': 'mp4',
-        'max_filesize': 200 * 1024 * 1024,  # 200MB in bytes
-        'outtmpl': str(outtmpl),
-        'noplaylist': True,
-    }
+    # the list must be the caller's own (the RPC checks again in its transaction)
+    owned = (
+        supabase.table("shopping_lists")
+        .select("id")
+        .eq("id", request.list_id)
+        .eq("user_id", user_id)
+        .execute()
+    ).data
+    if not owned:
+        raise HTTPException(status_code=404, detail="Shopping list not found")
 
-    # Download
-    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-        ydl.download([url])
+    try:
+        res = supabase.rpc("sync_shopping_list", {
+            "p_user_id": user_id,
+            "p_list_id": request.list_id,
+            "p_start": request.week_start,
+            "p_end": request.week_end,
+        }).execute()
+    except Exception as e:
+        if "P0002" in str(e):
+            raise HTTPException(status_code=404, detail="Shopping list not found")
+        raise HTTPException(status_code=500, detail=f"Grocery sync failed: {str(e)}")
+
+    items = res.data or []
+
+    # Same ingredient rows the import pipeline resolves against
+    ingredient_ids = sorted({it["ingredient_id"] for it in items if it.get("ingredient_id")})
+    ingredients = []
+    if ingredient_ids:
+        ingredients = (
+            supabase.table("ingredients")
+            .select("id,name,norm_name,emoji")
+            .in_("id", ingredient_ids)
+            .execute()
+        ).data or []
 
-    return outtmpl
+    return GrocerySyncResponse(
+        list_id=request.list_id,
+        items=json_serialize(items),
+        ingredients=json_serialize(ingredients),
+    )
 
-@cookApp.post("/download-video-test")
-def download_video_test(request: dict):
-    url = request.get("url")
-    if not url:
-        raise HTTPException(status_code=400, detail="URL is required")
-    # Run deno --version 
-    res = subprocess.run("bash -c 'source /root/.bashrc && deno --version'", shell=True, text=True)
-    print("attempt 2:", res.stdout)
-    if res.returncode != 0:
-        print("Error:", res.stderr)
-    with tempfile.TemporaryDirectory() as td:
-        path = download_video_from_url(url, td)
-        print("Downloaded video to:", path)
-        return {"path": str(path)}
+# Meal plans fall back to a simple plan rather than queue behind imports for long
+MEAL_PLAN_QUEUE_TIMEOUT_S = 15
 
 class SmartMealPlanRequest(BaseModel):
     user_id: str
@@ -727,17 +537,14 @@ async def smart_meal_plan(request: SmartMealPlanRequest):
     - Meal type differentiation (breakfast, lunch, dinner)
     """
     try:
-        print(f"Starting smart meal plan for user: {request.user_id}")
-        
         # Fetch user's recipe interaction history
         user_history = await _get_user_recipe_history(request.user_id)
         
         # Get user's available recipe IDs
         user_recipe_ids = user_history.get("available_recipe_ids", [])
-        print(f"User has access to {len(user_recipe_ids)} recipes")
         
         if not user_recipe_ids:
-            print("No recipes available for this user")
+            log_event("smart_meal_plan.empty", user_id=request.user_id)
             return SmartMealPlanResponse(
                 suggestions=[],
                 shared_ingredients=[],
@@ -752,7 +559,6 @@ async def smart_meal_plan(request: SmartMealPlanRequest):
             f"{plan.get('plan_date')}-{plan.get('meal')}" 
             for plan in request.existing_plans
         }
-        print(f"Existing meal slots to avoid: {len(existing_meal_slots)}")
         
         # Generate smart meal plan using AI
         meal_plan = await _generate_smart_meal_plan(
@@ -762,18 +568,22 @@ async def smart_meal_plan(request: SmartMealPlanRequest):
             existing_slots=existing_meal_slots
         )
         
-        print(f"Generated {len(meal_plan.suggestions)} meal suggestions")
+        log_event(
+            "smart_meal_plan.done",
+            user_id=request.user_id,
+            available_recipes=len(user_recipe_ids),
+            existing_slots=len(existing_meal_slots),
+            suggestions=len(meal_plan.suggestions),
+        )
         return meal_plan
         
     except Exception as e:
-        print(f"Error in smart_meal_plan: {e}")
+        log_event("smart_meal_plan.error", sample_rate=1.0, user_id=request.user_id, error=str(e))
         raise HTTPException(status_code=500, detail=f"Meal planning failed: {str(e)}")
 
 async def _get_user_recipe_history(user_id: str) -> dict:
     """Get user's recipe interactions, likes, and preferences"""
     try:
-        print(f"Fetching recipes for user_id: {user_id}")
-        
         # Get user's created recipes
         created_res = (
             supabase
@@ -782,7 +592,6 @@ async def _get_user_recipe_history(user_id: str) -> dict:
             .eq("user_id", user_id)
             .execute()
         )
-        print(f"Created recipes: {len(created_res.data or [])}")
         
         # Get user's saved/added recipes from public recipes
         added_res = (
@@ -792,7 +601,6 @@ async def _get_user_recipe_history(user_id: str) -> dict:
             .eq("user_id", user_id)
             .execute()
         )
-        print(f"User added recipes: {len(added_res.data or [])}")
         
         # Get user's meal plan history to analyze preferences
         plans_res = (supabase.table("meal_plans")
@@ -802,7 +610,6 @@ async def _get_user_recipe_history(user_id: str) -> dict:
             .order("created_at", desc=True)
             .limit(100)
             .execute())
-        print(f"Meal plans: {len(plans_res.data or [])}")
         
         # Get recipe details for added recipes
         added_recipe_ids = [item["recipe_id"] for item in (added_res.data or [])]
@@ -838,11 +645,10 @@ async def _get_user_recipe_history(user_id: str) -> dict:
             "available_recipe_ids": json_serialize([r["id"] for r in all_user_recipes])
         }
         
-        print(f"User history result: {result}")
         return result
         
     except Exception as e:
-        print(f"Error fetching user history: {e}")
+        log_event("user_history.error", sample_rate=1.0, user_id=user_id, error=str(e))
         return {
             "created_recipes": [], 
             "added_recipes": [],
@@ -857,19 +663,14 @@ async def _get_recipes_with_ingredients(user_recipe_ids: List[int] = None) -> Li
     try:
         # Only get recipes that belong to this user
         if not user_recipe_ids:
-            print("No user recipe IDs provided")
             return []
             
-        print(f"Fetching ingredients for recipe IDs: {user_recipe_ids}")
-        
         # Get recipes with ingredients for user's recipes only
         recipes_res = (supabase.table("public_recipes_with_stats")
             .select("id,title,tags,difficulty,prep_time,cook_time")
             .in_("id", user_recipe_ids)
             .execute())
         
-        print(f"Found {len(recipes_res.data or [])} recipes")
-        
         # Get ingredients for each recipe
         recipes_with_ingredients = []
         for recipe in (recipes_res.data or []):
@@ -905,11 +706,10 @@ async def _get_recipes_with_ingredients(user_recipe_ids: List[int] = None) -> Li
             }
             recipes_with_ingredients.append(json_serialize(recipe_data))
         
-        print(f"Returning {len(recipes_with_ingredients)} recipes with ingredients")
         return recipes_with_ingredients
         
     except Exception as e:
-        print(f"Error fetching recipes with ingredients: {e}")
+        log_event("recipes_with_ingredients.error", sample_rate=1.0, error=str(e))
         return []
 
 async def _generate_smart_meal_plan(user_history: dict, available_recipes: List[dict], week_start: str, existing_slots: set) -> SmartMealPlanResponse:
@@ -946,15 +746,27 @@ async def _generate_smart_meal_plan(user_history: dict, available_recipes: List[
     """
     
     try:
-        # Use OpenAI to generate the meal plan
-        response = openai_client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": "You are a meal planning expert. Return only valid JSON."},
-                {"role": "user", "content": context_prompt}
-            ],
-            response_format={"type": "json_object"}
-        )
+        messages = [
+            {"role": "system", "content": "You are a meal planning expert. Return only valid JSON."},
+            {"role": "user", "content": context_prompt}
+        ]
+
+        # Use OpenAI to generate the meal plan. The scheduler may queue the call
+        # behind the rate limit, so wait in a thread, and not for long: there is
+        # a fallback plan below.
+        with span("llm_meal_plan", model="gpt-4o-mini") as attrs:
+            response = await asyncio.to_thread(
+                openai_scheduler.call,
+                "gpt-4o-mini",
+                lambda: openai_client.chat.completions.create(
+                    model="gpt-4o-mini",
+                    messages=messages,
+                    response_format={"type": "json_object"}
+                ),
+                tokens=estimate_tokens(messages),
+                queue_timeout_s=MEAL_PLAN_QUEUE_TIMEOUT_S,
+            )
+            record_openai_usage(attrs, response)
         
         result = json.loads(response.choices[0].message.content)
         
@@ -973,7 +785,7 @@ async def _generate_smart_meal_plan(user_history: dict, available_recipes: List[
         )
         
     except Exception as e:
-        print(f"AI meal planning error: {e}")
+        log_event("smart_meal_plan.ai_error", sample_rate=1.0, error=str(e))
         # Fallback to simple meal plan
         return _generate_fallback_meal_plan(available_recipes, week_start, existing_slots)
 
@@ -1014,6 +826,109 @@ def _generate_fallback_meal_plan(available_recipes: List[dict], week_start: str,
         efficiency_score=0.3
     )
 
+# ---------- Suggested covers ----------
+# Imports return the best video frame as WebP thumbnails (see pick_cover()).
+# They are uploaded here, under imports/, so the draft only carries storage
+# paths and the app can save one of them as image_url without uploading a
+# photo itself. Variants share a prefix: cover_w{width}.webp.
+#
+# imports/ is scratch space. Saving a recipe moves its cover to covers/, and
+# sweep_import_covers() (scheduled in modal_app.py) deletes imports/ folders
+# older than IMPORT_COVER_TTL_S, i.e. the suggestions of discarded drafts.
+
+COVER_BUCKET = "recipe-media"
+COVER_CACHE_CONTROL = str(365 * 24 * 3600)  # paths are unique per import
+IMPORT_COVER_TTL_S = float(os.environ.get("IMPORT_COVER_TTL_S", str(24 * 3600)))
+_IMPORT_COVER_PATH = re.compile(r"imports/([0-9a-f]{32})/cover_w\d+\.webp")
+_STORAGE_PAGE = 1000
+
+def _upload_cover_variant(path: str, data: bytes) -> None:
+    supabase.storage.from_(COVER_BUCKET).upload(
+        path, data, {"content-type": "image/webp", "cache-control": COVER_CACHE_CONTROL},
+    )
+
+def _keep_import_cover(image_url: str) -> Optional[str]:
+    """Move a suggested cover that is being saved out of imports/ and return
+    its new image_url (None if it is gone, e.g. swept from an old draft)."""
+    folder = image_url.split("/")[1]
+    bucket = supabase.storage.from_(COVER_BUCKET)
+
+    def move(width: int) -> bool:
+        try:
+            bucket.move(f"imports/{folder}/cover_w{width}.webp", f"covers/{folder}/cover_w{width}.webp")
+            return True
+        except Exception:
+            return False
+
+    with ThreadPoolExecutor(max_workers=len(COVER_WIDTHS)) as pool:
+        moved = list(pool.map(move, COVER_WIDTHS))
+    # a retried save finds them already moved
+    if not all(moved) and not bucket.list(f"covers/{folder}"):
+        log_event("cover_keep.error", sample_rate=1.0, path=image_url)
+        return None
+    return f"covers/{image_url[len('imports/'):]}"
+
+def _storage_list(bucket: Any, path: str) -> List[dict]:
+    entries: List[dict] = []
+    while True:
+        page = bucket.list(path, {"limit": _STORAGE_PAGE, "offset": len(entries)})
+        entries += page
+        if len(page) < _STORAGE_PAGE:
+            return entries
+
+def sweep_import_covers() -> int:
+    """Delete the imports/ cover folders of drafts that were never saved
+    (older than IMPORT_COVER_TTL_S). Returns the number of files removed."""
+    bucket = supabase.storage.from_(COVER_BUCKET)
+    cutoff = time.time() - IMPORT_COVER_TTL_S
+
+    stale: List[str] = []
+    for folder in _storage_list(bucket, "imports"):
+        files = _storage_list(bucket, f"imports/{folder['name']}")
+        created = [
+            datetime.fromisoformat(f["created_at"].replace("Z", "+00:00")).timestamp()
+            for f in files if f.get("created_at")
+        ]
+        if created and max(created) < cutoff:
+            stale += [f"imports/{folder['name']}/{f['name']}" for f in files]
+
+    # recipes saved before covers were moved on save still point into imports/
+    kept = set()
+    for i in range(0, len(stale), 100):
+        rows = supabase.table("recipes").select("image_url").in_("image_url", stale[i:i + 100]).execute().data or []
+        kept |= {r["image_url"].rsplit("/", 1)[0] for r in rows}
+    stale = [p for p in stale if p.rsplit("/", 1)[0] not in kept]
+
+    for i in range(0, len(stale), _STORAGE_PAGE):
+        bucket.remove(stale[i:i + _STORAGE_PAGE])
+    log_event("cover_sweep", sample_rate=1.0, removed=len(stale), kept_folders=len(kept))
+    return len(stale)
+
+async def _store_cover(cover: Optional[dict]) -> Optional[dict]:
+    """Upload the cover variants in parallel and return the DraftCover body.
+
+    The cover is only a suggestion: a failed upload drops it instead of
+    failing the import.
+    """
+    if not cover:
+        return None
+    prefix = f"imports/{uuid.uuid4().hex}"
+    paths = {width: f"{prefix}/cover_w{width}.webp" for width in sorted(cover["thumbnails"])}
+    try:
+        with span("cover_upload"):
+            await asyncio.gather(*(
+                asyncio.to_thread(_upload_cover_variant, paths[width], data)
+                for width, data in cover["thumbnails"].items()
+            ))
+    except Exception as e:
+        log_event("cover_upload.error", sample_rate=1.0, error=str(e))
+        return None
+    return {
+        "time_s": cover["time_s"],
+        "image_url": paths[max(paths)],
+        "variants": [{"width": width, "path": path} for width, path in paths.items()],
+    }
+
 @cookApp.post("/video-import", response_model=RecipeDraft)
 async def video_import(video: UploadFile = File(...)):
     """
@@ -1022,26 +937,117 @@ async def video_import(video: UploadFile = File(...)):
     if not video.filename:
         raise HTTPException(status_code=400, detail="Missing filename")
 
-    with tempfile.TemporaryDirectory() as td:
-        # Setup video processing and extract audio/frames
-        audio_path, frame_paths = _setup_video_processing(video, td)
-        
-        # Transcribe audio
-        transcript_text = _transcribe_audio(audio_path)
-        
-        # Extract raw recipe data
-        raw_data = _extract_raw_recipe_data(transcript_text, frame_paths)
-        
-        # Audit for missing ingredients
-        missing_ingredients = _audit_missing_ingredients(raw_data)
-        _merge_missing_ingredients(raw_data, missing_ingredients)
-        
-        # Structure final recipe
-        data = _structure_final_recipe(raw_data, transcript_text)
-        
-        # Resolve ingredient IDs
-        _resolve_ingredient_ids(data, created_by=None)
-        
-        # Return response
-        from fastapi.responses import JSONResponse
-        return JSONResponse(content=data)
+    video_bytes = await video.read()
+
+    # ffmpeg, transcription and the extraction passes run on the executor
+    data = await _submit_stage("video_import", video_bytes, video.filename)
+    cover = asyncio.create_task(_store_cover(data.pop("cover", None)))
+
+    # Resolve ingredient IDs
+    _resolve_ingredient_ids(data, created_by=None)
+    data["cover"] = await cover
+
+    # Return response
+    from fastapi.responses import JSONResponse
+    return JSONResponse(content=data)
+
+@cookApp.post("/video-import-url", response_model=RecipeDraft)
+async def video_import_url(request: VideoUrlIn):
+    """
+    Takes a TikTok/YouTube/Instagram link and returns a structured RecipeDraft JSON.
+    Captions and the description are used first; the video is only downloaded if needed.
+    """
+    url = request.url.strip()
+    checked = await _check_url(url)
+
+    data = await _submit_stage("url_import", url, checked.addresses)
+    cover = asyncio.create_task(_store_cover(data.pop("cover", None)))
+
+    _resolve_ingredient_ids(data, created_by=None)
+    data["cover"] = await cover
+
+    from fastapi.responses import JSONResponse
+    return JSONResponse(content=data)
+
+# ---------- Streaming imports ----------
+#
+# /video-import/stream and /video-import-url/stream run the same pipeline but
+# stream the final pass as NDJSON, one event per line, so the app can fill in
+# the draft while the model is still writing it:
+#
+#   {"event": "status", "stage": "extracting" | "structuring"}
+#   {"event": "field", "name": "title", "value": "Vegan Brownies"}
+#   {"event": "ingredient", "index": 0, "value": {..., "ingredient_id": 12}}
+#   {"event": "step", "index": 0, "value": {"position": 1, "body": "..."}}
+#   {"event": "done", "draft": {...}}     same body as the non-streaming endpoints,
+#                                         including the uploaded cover
+#   {"event": "error", "status": 503, "detail": "..."}
+#
+# Fields arrive in schema order (title ... tags, then ingredients, then steps).
+
+def _ndjson(event: dict) -> bytes:
+    return (json.dumps(event, cls=CustomJSONEncoder) + "\n").encode()
+
+def _structure_events(extracted: dict) -> Iterator[dict]:
+    """Stream the final pass, resolving ingredient ids as ingredients arrive."""
+    ingredient_map = load_ingredient_map()
+    resolved = {}
+
+    for event in stream_final_recipe(extracted["raw_data"], extracted["transcript"]):
+        kind = event[0]
+        if kind == "field":
+            yield {"event": "field", "name": event[1], "value": event[2]}
+        elif kind == "ingredient":
+            index, ing = event[1], event[2]
+            name = (ing.get("name") or "").strip()
+            if name:
+                ing["ingredient_id"] = resolved[index] = resolve_or_create_ingredient(ingredient_map, name)
+            yield {"event": "ingredient", "index": index, "value": ing}
+        elif kind == "step":
+            yield {"event": "step", "index": event[1], "value": event[2]}
+        else:
+            draft = event[1]
+            for index, ing in enumerate(draft.get("ingredients", [])):
+                ing["ingredient_id"] = resolved.get(index)
+            yield {"event": "done", "draft": draft}
+
+async def _stream_import(stage: str, *args: Any):
+    yield _ndjson({"event": "status", "stage": "extracting"})
+    try:
+        extracted = await get_executor().submit(stage, *args)
+        # thumbnails upload while the final pass streams
+        cover = asyncio.create_task(_store_cover(extracted.pop("cover", None)))
+        yield _ndjson({"event": "status", "stage": "structuring"})
+        async for event in iterate_in_threadpool(_structure_events(extracted)):
+            if event["event"] == "done":
+                event["draft"]["cover"] = await cover
+            yield _ndjson(event)
+    except PipelineError as e:
+        yield _ndjson({"event": "error", "status": e.status_code, "detail": e.detail})
+    except Exception as e:
+        log_event("import_stream.error", sample_rate=1.0, stage=stage, error=str(e))
+        yield _ndjson({"event": "error", "status": 500, "detail": f"Import failed: {str(e)}"})
+
+@cookApp.post("/video-import/stream")
+async def video_import_stream(video: UploadFile = File(...)):
+    """
+    /video-import, streamed as NDJSON events while the final pass is written.
+    """
+    if not video.filename:
+        raise HTTPException(status_code=400, detail="Missing filename")
+
+    video_bytes = await video.read()
+    return StreamingResponse(_stream_import("video_extract", video_bytes, video.filename), media_type="application/x-ndjson")
+
+@cookApp.post("/video-import-url/stream")
+async def video_import_url_stream(request: VideoUrlIn):
+    """
+    /video-import-url, streamed as NDJSON events while the final pass is written.
+    """
+    url = request.url.strip()
+    checked = await _check_url(url)
+
+    return StreamingResponse(_stream_import("url_extract", url, checked.addresses), media_type="application/x-ndjson")
+
+# Import-time profile for this module; exposed via /startup-profile
+IMPORT_PROFILE = {"app.main": time.perf_counter() - _IMPORT_STARTED}
@@ -0,0 +1,248 @@
+import os
+import json
+import time
+import random
+import bisect
+import logging
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# In-process instrumentation: timing spans, Prometheus-style histograms/counters,
+# Server-Timing headers and structured, sampled logs.
+#
+#   with span("ffmpeg", step="frames"):
+#       ...
+#
+# Every span is observed in the `vegcooking_stage_duration_seconds` histogram
+# and, during an HTTP request, reported back in its Server-Timing header.
+
+LOG_SAMPLE_RATE = float(os.environ.get("LOG_SAMPLE_RATE", "0.1"))
+# LOG_LEVEL=DEBUG also emits the debug events (e.g. every import's extracted recipe)
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()
+
+logger = logging.getLogger("vegcooking")
+if not logger.handlers:
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(_handler)
+    logger.setLevel(LOG_LEVEL)
+    logger.propagate = False
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+def _label_str(labels: Tuple[Tuple[str, str], ...], extra: str = "") -> str:
+    parts = [f'{k}="{v}"' for k, v in labels]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = buckets
+        self._series: Dict[Tuple[Tuple[str, str], ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = tuple(sorted((k, str(v)) for k, v in labels.items()))
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # per-bucket counts (+Inf last), sum, count
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][bisect.bisect_left(self.buckets, value)] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, (counts, total, count) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, n in zip(self.buckets, counts):
+                    cumulative += n
+                    le = f'le="{bound}"'
+                    lines.append(f"{self.name}_bucket{_label_str(key, le)} {cumulative}")
+                le = 'le="+Inf"'
+                lines.append(f"{self.name}_bucket{_label_str(key, le)} {count}")
+                lines.append(f"{self.name}_sum{_label_str(key)} {total}")
+                lines.append(f"{self.name}_count{_label_str(key)} {count}")
+        return lines
+
+class Counter:
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help = help_text
+        self._series: Dict[Tuple[Tuple[str, str], ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, value: float = 1.0, **labels: Any) -> None:
+        key = tuple(sorted((k, str(v)) for k, v in labels.items()))
+        with self._lock:
+            self._series[key] = self._series.get(key, 0.0) + value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._series.items()):
+                lines.append(f"{self.name}{_label_str(key)} {value}")
+        return lines
+
+class Gauge:
+    """Value read at scrape time from a callback."""
+
+    def __init__(self, name: str, help_text: str, read):
+        self.name = name
+        self.help = help_text
+        self.read = read
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge"]
+        for labels, value in self.read():
+            key = tuple(sorted((k, str(v)) for k, v in labels.items()))
+            lines.append(f"{self.name}{_label_str(key)} {value}")
+        return lines
+
+HTTP_SECONDS = Histogram("vegcooking_http_request_duration_seconds", "HTTP request latency by route")
+STAGE_SECONDS = Histogram("vegcooking_stage_duration_seconds", "Latency of instrumented stages (ffmpeg, transcription, LLM passes, Supabase queries)")
+OPENAI_TOKENS = Counter("vegcooking_openai_tokens_total", "OpenAI tokens by model, pass and kind")
+OPENAI_CACHED_RATIO = Histogram(
+    "vegcooking_openai_cached_token_ratio",
+    "Share of each call's input tokens served from the provider prompt cache, by pass",
+    buckets=(0.0, 0.1, 0.25, 0.5, 0.75, 0.9, 1.0),
+)
+
+_METRICS: List[Any] = [HTTP_SECONDS, STAGE_SECONDS, OPENAI_TOKENS, OPENAI_CACHED_RATIO]
+
+def register(metric: Any) -> Any:
+    _METRICS.append(metric)
+    return metric
+
+def render_metrics() -> str:
+    lines: List[str] = []
+    for metric in _METRICS:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+# ---------- Spans ----------
+
+# Spans of the current HTTP request, for Server-Timing
+_request_spans: ContextVar[Optional[List[tuple]]] = ContextVar("request_spans", default=None)
+# Set while a pipeline stage runs out of process: spans are only collected and
+# replayed by the parent, so nothing is observed twice (or lost in a worker)
+_deferred_spans: ContextVar[Optional[List[tuple]]] = ContextVar("deferred_spans", default=None)
+
+def record_span(name: str, duration: float, attrs: Optional[Dict[str, Any]] = None) -> None:
+    attrs = attrs or {}
+    deferred = _deferred_spans.get()
+    if deferred is not None:
+        deferred.append((name, duration, attrs))
+        return
+
+    STAGE_SECONDS.observe(duration, stage=name)
+    for kind in ("input_tokens", "output_tokens", "cached_tokens"):
+        if attrs.get(kind):
+            OPENAI_TOKENS.inc(attrs[kind], model=attrs.get("model", ""), stage=name, kind=kind)
+    if attrs.get("input_tokens"):
+        OPENAI_CACHED_RATIO.observe(attrs.get("cached_tokens", 0) / attrs["input_tokens"], model=attrs.get("model", ""), stage=name)
+
+    spans = _request_spans.get()
+    if spans is not None:
+        spans.append((name, duration, attrs))
+
+@contextmanager
+def span(name: str, **attrs: Any) -> Iterator[Dict[str, Any]]:
+    """Time a block. Callers may add attributes (e.g. token counts) to the yielded dict."""
+    start = time.perf_counter()
+    try:
+        yield attrs
+    finally:
+        record_span(name, time.perf_counter() - start, attrs)
+
+@contextmanager
+def deferred_spans() -> Iterator[List[tuple]]:
+    collected: List[tuple] = []
+    token = _deferred_spans.set(collected)
+    try:
+        yield collected
+    finally:
+        _deferred_spans.reset(token)
+
+def replay_spans(spans: List[tuple]) -> None:
+    for name, duration, attrs in spans:
+        record_span(name, duration, attrs)
+
+def record_openai_usage(attrs: Dict[str, Any], resp: Any) -> None:
+    """Copy token usage from a Responses or Chat Completions result into span attrs."""
+    usage = getattr(resp, "usage", None)
+    if usage is None:
+        return
+    attrs["input_tokens"] = getattr(usage, "input_tokens", None) or getattr(usage, "prompt_tokens", 0) or 0
+    attrs["output_tokens"] = getattr(usage, "output_tokens", None) or getattr(usage, "completion_tokens", 0) or 0
+    details = getattr(usage, "input_tokens_details", None) or getattr(usage, "prompt_tokens_details", None)
+    attrs["cached_tokens"] = getattr(details, "cached_tokens", 0) or 0
+
+def server_timing_header(spans: List[tuple], total: float) -> str:
+    # Server-Timing: name;dur=<ms>, ... (repeated stages get a numeric suffix)
+    seen: Dict[str, int] = {}
+    parts = []
+    for name, duration, _ in spans:
+        metric = "".join(c if c.isalnum() or c in "_-" else "_" for c in name)
+        seen[metric] = seen.get(metric, 0) + 1
+        if seen[metric] > 1:
+            metric = f"{metric}_{seen[metric]}"
+        parts.append(f"{metric};dur={duration * 1000:.1f}")
+    parts.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(parts)
+
+# ---------- Structured logs ----------
+
+def log_event(event: str, sample_rate: Optional[float] = None, level: int = logging.INFO, **fields: Any) -> None:
+    """Emit one JSON log line, keeping only a sample of routine events."""
+    if not logger.isEnabledFor(level):
+        return
+    rate = LOG_SAMPLE_RATE if sample_rate is None else sample_rate
+    if rate < 1.0 and random.random() >= rate:
+        return
+    logger.log(level, json.dumps({"event": event, "ts": time.time(), **fields}, default=str))
+
+# ---------- ASGI middleware ----------
+
+class TimingMiddleware:
+    """Records request latency and adds a Server-Timing header with the request's spans."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        spans: List[tuple] = []
+        token = _request_spans.set(spans)
+        start = time.perf_counter()
+        status = {"code": 500}
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                headers = list(message.get("headers", []))
+                header = server_timing_header(spans, time.perf_counter() - start)
+                headers.append((b"server-timing", header.encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _request_spans.reset(token)
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "unmatched"
+            HTTP_SECONDS.observe(
+                time.perf_counter() - start,
+                route=path, method=scope.get("method", ""), status=status["code"],
+            )
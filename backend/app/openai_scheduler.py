@@ -0,0 +1,328 @@
+import os
+import time
+import heapq
+import itertools
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from app.metrics import Counter, Gauge, Histogram, register
+from app.transport import backoff_delay
+
+# Process-wide scheduler for OpenAI calls.
+#
+#   resp = scheduler.call("gpt-4o-mini", lambda: openai_client.responses.create(...), tokens=est)
+#
+# Each model has a requests-per-minute and a tokens-per-minute budget, kept as
+# continuously refilling buckets. Calls wait in a per-model queue until both
+# budgets allow them, highest priority first (interactive requests before
+# batch work, FIFO within a priority).
+#
+# A 429 pauses the whole model for the server's retry-after and empties its
+# budget, so queued calls back off together instead of each retrying on its
+# own; the throttled call keeps its place in the queue. Token reservations are
+# settled against the usage the API reports, and x-ratelimit-remaining-*
+# response headers clamp the local budget.
+#
+#   OPENAI_RATE_LIMITS="gpt-4o-mini=500:200000,gpt-4o-mini-transcribe=500:50000"
+#
+# (model=RPM:TPM; other models use OPENAI_DEFAULT_RPM / OPENAI_DEFAULT_TPM).
+#
+# Budgets are per process, and every process that calls OpenAI (API
+# containers, import workers) starts from the full limits: a lone import must
+# be able to run at full speed. The processes on one key are kept together by
+# the server's view of the budget: x-ratelimit-remaining-* clamps every
+# process's buckets after each response, and a 429 pauses the model for its
+# retry-after. OPENAI_BUDGET_SHARE (default 1) scales the limits for a
+# deployment that shares its key with others. A call bigger than the burst
+# overdraws its bucket by at most one burst, so the next call never waits
+# longer than two bursts for budget. Priorities apply within a process:
+# user requests (imports, meal plans) run at the INTERACTIVE default, and
+# background or bulk jobs opt into BATCH with openai_priority().
+
+INTERACTIVE = 0
+BATCH = 1
+PRIORITY_NAMES = {INTERACTIVE: "interactive", BATCH: "batch"}
+
+OPENAI_DEFAULT_RPM = float(os.environ.get("OPENAI_DEFAULT_RPM", "500"))
+OPENAI_DEFAULT_TPM = float(os.environ.get("OPENAI_DEFAULT_TPM", "200000"))
+OPENAI_BUDGET_SHARE = float(os.environ.get("OPENAI_BUDGET_SHARE", "1"))
+# How much of a minute's budget may be spent at once; providers enforce
+# limits over windows much shorter than a minute
+OPENAI_BURST_S = float(os.environ.get("OPENAI_BURST_S", "10"))
+OPENAI_MAX_RETRIES = int(os.environ.get("OPENAI_MAX_RETRIES", "4"))
+OPENAI_QUEUE_TIMEOUT_S = float(os.environ.get("OPENAI_QUEUE_TIMEOUT_S", "120"))
+# Rough rate-limit cost of one input image; settled against real usage afterwards
+OPENAI_IMAGE_TOKEN_ESTIMATE = int(os.environ.get("OPENAI_IMAGE_TOKEN_ESTIMATE", "1000"))
+OPENAI_OUTPUT_TOKEN_ESTIMATE = int(os.environ.get("OPENAI_OUTPUT_TOKEN_ESTIMATE", "1500"))
+
+def _parse_limits(spec: str) -> Dict[str, Tuple[float, float]]:
+    limits = {}
+    for item in filter(None, (s.strip() for s in spec.split(","))):
+        model, _, budget = item.partition("=")
+        rpm, _, tpm = budget.partition(":")
+        limits[model.strip()] = (float(rpm), float(tpm))
+    return limits
+
+OPENAI_RATE_LIMITS = _parse_limits(os.environ.get("OPENAI_RATE_LIMITS", ""))
+
+QUEUE_WAIT_SECONDS = register(Histogram("vegcooking_openai_queue_wait_seconds", "Time OpenAI calls waited for rate-limit budget"))
+THROTTLED = register(Counter("vegcooking_openai_retries_total", "OpenAI calls retried by the scheduler, by model and reason"))
+
+_priority: ContextVar[int] = ContextVar("openai_priority", default=INTERACTIVE)
+# Model of the call running in this thread, for the response-header hook
+_current_model: ContextVar[Optional[str]] = ContextVar("openai_current_model", default=None)
+
+@contextmanager
+def openai_priority(priority: int) -> Iterator[None]:
+    """Run OpenAI calls made inside the block at `priority` (e.g. BATCH for backfills)."""
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+class OpenAIQueueTimeout(Exception):
+    """A call waited longer than its queue timeout for rate-limit budget."""
+
+def estimate_tokens(messages: Any, output_tokens: int = OPENAI_OUTPUT_TOKEN_ESTIMATE) -> int:
+    """Rate-limit cost of a Responses `input` or Chat `messages` list (~4 chars per token)."""
+    chars = 0
+    images = 0
+    for message in messages or []:
+        content = message.get("content")
+        if isinstance(content, str):
+            chars += len(content)
+            continue
+        for part in content or []:
+            if part.get("type") in ("input_image", "image_url"):
+                images += 1
+            else:
+                chars += len(part.get("text") or "")
+    return chars // 4 + images * OPENAI_IMAGE_TOKEN_ESTIMATE + output_tokens
+
+def usage_tokens(result: Any) -> Optional[int]:
+    usage = getattr(result, "usage", None)
+    if usage is None:
+        return None
+    total = getattr(usage, "total_tokens", None)
+    if total is not None:
+        return total
+    used_in = getattr(usage, "input_tokens", None) or getattr(usage, "prompt_tokens", 0) or 0
+    used_out = getattr(usage, "output_tokens", None) or getattr(usage, "completion_tokens", 0) or 0
+    return used_in + used_out
+
+def _retry_after(exc: Exception) -> Optional[float]:
+    headers = getattr(getattr(exc, "response", None), "headers", None) or {}
+    for header, scale in (("retry-after-ms", 0.001), ("retry-after", 1.0)):
+        try:
+            return min(60.0, float(headers[header]) * scale)
+        except (KeyError, TypeError, ValueError):
+            continue
+    return None
+
+def _retryable(exc: Exception) -> bool:
+    status = getattr(exc, "status_code", None)
+    if status is not None:
+        return status in (408, 409, 429) or status >= 500
+    from openai import APIConnectionError
+
+    return isinstance(exc, APIConnectionError)
+
+class _Bucket:
+    def __init__(self, per_minute: float, burst_s: float):
+        self.rate = per_minute / 60.0
+        self.capacity = max(1.0, self.rate * burst_s)
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_for(self, amount: float) -> float:
+        # a call bigger than the burst waits for a full bucket and overdraws it
+        amount = min(amount, self.capacity)
+        return 0.0 if self.level >= amount else (amount - self.level) / self.rate
+
+    def spend(self, amount: float) -> None:
+        # negative amounts give budget back; the debt never exceeds one burst
+        self.level = min(self.capacity, max(-self.capacity, self.level - amount))
+
+class _ModelState:
+    def __init__(self, rpm: float, tpm: float, burst_s: float):
+        self.requests = _Bucket(rpm, burst_s)
+        self.tokens = _Bucket(tpm, burst_s)
+        self.queue: List[Tuple[int, int]] = []  # heap of (priority, seq)
+        self.paused_until = 0.0
+        self.in_flight = 0
+
+class OpenAIScheduler:
+    def __init__(
+        self,
+        limits: Optional[Dict[str, Tuple[float, float]]] = None,
+        default_limit: Tuple[float, float] = (OPENAI_DEFAULT_RPM, OPENAI_DEFAULT_TPM),
+        burst_s: float = OPENAI_BURST_S,
+        max_retries: int = OPENAI_MAX_RETRIES,
+        queue_timeout_s: float = OPENAI_QUEUE_TIMEOUT_S,
+        share: float = OPENAI_BUDGET_SHARE,
+    ):
+        self.limits = OPENAI_RATE_LIMITS if limits is None else limits
+        self.default_limit = default_limit
+        self.share = share
+        self.burst_s = burst_s
+        self.max_retries = max_retries
+        self.queue_timeout_s = queue_timeout_s
+        self._cond = threading.Condition()
+        self._models: Dict[str, _ModelState] = {}
+        self._seq = itertools.count()
+
+    def _state(self, model: str) -> _ModelState:
+        state = self._models.get(model)
+        if state is None:
+            rpm, tpm = self.limits.get(model, self.default_limit)
+            state = self._models[model] = _ModelState(rpm * self.share, tpm * self.share, self.burst_s)
+        return state
+
+    def call(
+        self,
+        model: str,
+        fn: Callable[[], Any],
+        tokens: int = 0,
+        priority: Optional[int] = None,
+        queue_timeout_s: Optional[float] = None,
+    ) -> Any:
+        """Run `fn` (one OpenAI request for `model`) once the model's budget allows it."""
+        priority = _priority.get() if priority is None else priority
+        timeout = self.queue_timeout_s if queue_timeout_s is None else queue_timeout_s
+        deadline = time.monotonic() + timeout
+        # the sequence number is kept across retries, so a throttled call
+        # goes back to the head of its priority class
+        seq = next(self._seq)
+        attempt = 0
+        while True:
+            queued = time.perf_counter()
+            self._acquire(model, tokens, (priority, seq), deadline)
+            QUEUE_WAIT_SECONDS.observe(time.perf_counter() - queued, model=model, priority=PRIORITY_NAMES.get(priority, priority))
+
+            token = _current_model.set(model)
+            try:
+                result = fn()
+            except Exception as e:
+                throttled = getattr(e, "status_code", None) == 429
+                # a rejected request used no tokens
+                self._settle(model, tokens, 0 if throttled else tokens)
+                if attempt >= self.max_retries or not _retryable(e):
+                    raise
+                if throttled:
+                    THROTTLED.inc(model=model, reason="rate_limited")
+                    delay = _retry_after(e)
+                    self._pause(model, (delay if delay is not None else backoff_delay(attempt, base=1.0, cap=30.0)) + backoff_delay(0))
+                else:
+                    THROTTLED.inc(model=model, reason="error")
+                    time.sleep(backoff_delay(attempt, base=0.5, cap=20.0))
+                attempt += 1
+                continue
+            finally:
+                _current_model.reset(token)
+
+            used = usage_tokens(result)
+            self._settle(model, tokens, tokens if used is None else used)
+            return result
+
+    def _acquire(self, model: str, tokens: int, entry: Tuple[int, int], deadline: float) -> None:
+        with self._cond:
+            state = self._state(model)
+            heapq.heappush(state.queue, entry)
+            try:
+                while True:
+                    now = time.monotonic()
+                    wait: Optional[float] = None  # until the queue moves
+                    if state.queue[0] == entry:
+                        state.requests.refill(now)
+                        state.tokens.refill(now)
+                        wait = max(
+                            state.paused_until - now,
+                            state.requests.wait_for(1),
+                            state.tokens.wait_for(tokens),
+                        )
+                        if wait <= 0:
+                            heapq.heappop(state.queue)
+                            state.requests.spend(1)
+                            state.tokens.spend(tokens)
+                            state.in_flight += 1
+                            self._cond.notify_all()
+                            return
+                    remaining = deadline - now
+                    if remaining <= 0:
+                        raise OpenAIQueueTimeout(f"{model}: no rate-limit budget within the queue timeout")
+                    self._cond.wait(remaining if wait is None else min(wait, remaining))
+            except BaseException:
+                if entry in state.queue:
+                    state.queue.remove(entry)
+                    heapq.heapify(state.queue)
+                    self._cond.notify_all()
+                raise
+
+    def _settle(self, model: str, reserved: int, used: int) -> None:
+        with self._cond:
+            state = self._models[model]
+            state.in_flight -= 1
+            state.tokens.spend(used - reserved)
+            self._cond.notify_all()
+
+    def _pause(self, model: str, delay: float) -> None:
+        with self._cond:
+            state = self._models[model]
+            state.paused_until = max(state.paused_until, time.monotonic() + delay)
+            # our view of the budget was wrong; restart from empty
+            state.requests.level = min(state.requests.level, 0.0)
+            state.tokens.level = min(state.tokens.level, 0.0)
+            self._cond.notify_all()
+
+    def observe_headers(self, headers: Any) -> None:
+        """Clamp the current model's budget to the x-ratelimit-remaining-* headers."""
+        model = _current_model.get()
+        if model is None:
+            return
+        with self._cond:
+            state = self._models.get(model)
+            if state is None:
+                return
+            now = time.monotonic()
+            for bucket, header in ((state.requests, "x-ratelimit-remaining-requests"), (state.tokens, "x-ratelimit-remaining-tokens")):
+                try:
+                    remaining = float(headers[header])
+                except (KeyError, TypeError, ValueError):
+                    continue
+                bucket.refill(now)
+                bucket.level = min(bucket.level, remaining)
+
+    def queue_depth(self) -> Dict[str, Dict[str, int]]:
+        """Queued and in-flight calls per model."""
+        with self._cond:
+            depth = {}
+            for model, state in self._models.items():
+                counts = {name: 0 for name in PRIORITY_NAMES.values()}
+                for priority, _ in state.queue:
+                    name = PRIORITY_NAMES.get(priority, str(priority))
+                    counts[name] = counts.get(name, 0) + 1
+                depth[model] = {**counts, "in_flight": state.in_flight}
+            return depth
+
+scheduler = OpenAIScheduler()
+
+def _queue_depth_gauge() -> List[Tuple[dict, int]]:
+    return [
+        ({"model": model, "priority": name}, n)
+        for model, counts in scheduler.queue_depth().items()
+        for name, n in counts.items()
+        if name != "in_flight"
+    ]
+
+def _in_flight_gauge() -> List[Tuple[dict, int]]:
+    return [({"model": model}, counts["in_flight"]) for model, counts in scheduler.queue_depth().items()]
+
+register(Gauge("vegcooking_openai_queue_depth", "OpenAI calls waiting for rate-limit budget", _queue_depth_gauge))
+register(Gauge("vegcooking_openai_in_flight", "OpenAI calls in flight", _in_flight_gauge))
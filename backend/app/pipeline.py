@@ -0,0 +1,979 @@
+import re
+import json
+import logging
+import math
+import base64
+import tempfile
+import subprocess
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple, cast
+from urllib.parse import urlparse
+
+from app.clients import openai_client
+from app.metrics import span, deferred_spans, log_event, record_openai_usage
+from app.openai_scheduler import OpenAIQueueTimeout, estimate_tokens, scheduler
+from app.url_safety import pinned_dns
+
+# Heavy import stages: ffmpeg, yt-dlp, transcription and the LLM extraction passes.
+# Nothing here depends on FastAPI so the same code runs in the API container,
+# in a local process pool or in the dedicated Modal media worker (see executor.py).
+
+class PipelineError(Exception):
+    """A stage failure that should surface as an HTTP error.
+
+    Unlike HTTPException this survives pickling, so it can cross process
+    and Modal function boundaries.
+    """
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(status_code, detail)
+        self.status_code = status_code
+        self.detail = detail
+
+def _setup_video_processing(video_bytes: bytes, filename: str, temp_dir: str) -> tuple[Path, List[str]]:
+    """Setup video processing: save upload, extract audio and frames."""
+    td_path = Path(temp_dir)
+    video_path = td_path / f"upload_{Path(filename).name}"
+    audio_path = td_path / "audio.ogg"
+    frames_dir = td_path / "frames"
+
+    video_path.write_bytes(video_bytes)
+
+    extract_audio(str(video_path), str(audio_path)) 
+    frame_paths = extract_frames(str(video_path), str(frames_dir), fps=1.5, max_frames=18)
+    
+    return audio_path, frame_paths
+
+def _schedule_openai(model: str, fn: Callable[[], Any], tokens: int = 0) -> Any:
+    """Run one OpenAI request through the rate-limit scheduler.
+
+    Running out of budget or retries is a 503 the client can retry, not a 500.
+    """
+    try:
+        return scheduler.call(model, fn, tokens=tokens)
+    except OpenAIQueueTimeout:
+        raise PipelineError(status_code=503, detail="OpenAI is busy, please retry the import shortly")
+    except Exception as e:
+        if getattr(e, "status_code", None) == 429:
+            raise PipelineError(status_code=503, detail="OpenAI rate limit reached, please retry the import shortly")
+        raise
+
+def _transcribe_audio(audio_path: Path) -> str:
+    """Transcribe audio using OpenAI."""
+    def transcribe() -> Any:
+        # reopened per attempt so a retry uploads the whole file again
+        with open(audio_path, "rb") as f:
+            return openai_client.audio.transcriptions.create(
+                model="gpt-4o-mini-transcribe",
+                file=f,
+            )
+
+    # audio tokens are not known up front; the reported usage is charged afterwards
+    with span("transcribe", model="gpt-4o-mini-transcribe", bytes=audio_path.stat().st_size):
+        transcript_obj = _schedule_openai("gpt-4o-mini-transcribe", transcribe)
+    return getattr(transcript_obj, "text", "") or ""
+
+def _create_response(pass_name: str, **kwargs: Any) -> Any:
+    """responses.create through the scheduler, in a timing span that records token usage."""
+    model = kwargs.get("model", "")
+    with span(f"llm_{pass_name}", model=model) as attrs:
+        resp = _schedule_openai(
+            model,
+            lambda: openai_client.responses.create(**kwargs),
+            tokens=estimate_tokens(kwargs.get("input")),
+        )
+        record_openai_usage(attrs, resp)
+    return resp
+
+# ---------- Prompts, schemas and payload templates ----------
+#
+# Everything static is built once at import. Each pass sends its instructions
+# as a fixed developer message ahead of the per-video content (transcript,
+# frames, extracted lists), so consecutive imports share a long identical
+# prefix and hit the provider's prompt cache. Keep dynamic values out of the
+# *_INSTRUCTIONS strings.
+
+RAW_EXTRACTION_SCHEMA = {
+    "type": "object",
+    "additionalProperties": False,
+    "properties": {
+        "raw_ingredients": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "additionalProperties": False,
+                "properties": {
+                    "name": { "type": "string" },
+                    "quantity_text": { "type": ["string", "null"] },
+                    "source": { "type": "string", "enum": ["spoken", "visual", "assumed"] }
+                },
+                "required": ["name", "quantity_text", "source"]
+            }
+        },
+        "raw_steps": {"type": "array", "items": {"type": "string"}},
+        "oven_temp": {"type": ["string", "null"]},
+        "bake_time": {"type": ["string", "null"]},
+        "pan_size": {"type": ["string", "null"]},
+        "servings_hint": {"type": ["string", "null"]},
+    },
+    "required": ["raw_ingredients", "raw_steps", "oven_temp", "bake_time", "pan_size", "servings_hint"],
+}
+
+AUDIT_SCHEMA = {
+    "type": "object",
+    "additionalProperties": False,
+    "properties": {
+        "missing_ingredients": {
+            "type": "array",
+            "items": {"type": "string"}
+        }
+    },
+    "required": ["missing_ingredients"]
+}
+
+FINAL_RECIPE_SCHEMA = {
+    "type": "object",
+    "additionalProperties": False,
+    "properties": {
+        "title": {"type": "string"},
+        "caption": {"type": ["string", "null"]},
+        "description": {"type": ["string", "null"]},
+        "servings": {"type": ["integer", "null"]},
+        "prep_time": {"type": ["string", "null"]},
+        "cook_time": {"type": ["string", "null"]},
+        "difficulty": {"type": ["string", "null"], "enum": ["Easy", "Medium", "Hard", None]},
+        "tags": {"type": "array", "items": {"type": "string"}},
+        "ingredients": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "additionalProperties": False,
+                "properties": {
+                    "name": {"type": "string"},
+                    "ingredient_id": {"type": ["integer", "null"]},
+                    "quantity": {"type": ["number", "null"]},
+                    "unit": {"type": ["string", "null"]},
+                    "notes": {"type": ["string", "null"]},
+                },
+                "required": ["name", "ingredient_id", "quantity", "unit", "notes"],
+            },
+        },
+        "steps": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "additionalProperties": False,
+                "properties": {
+                    "position": {"type": "integer"},
+                    "body": {"type": "string"},
+                },
+                "required": ["position", "body"],
+            },
+        },
+    },
+    "required": ["title", "caption", "description", "servings", "prep_time", "cook_time", "difficulty", "tags", "ingredients", "steps"],
+}
+
+RAW_EXTRACTION_INSTRUCTIONS = """
+You are extracting cooking info from a video.
+
+Goal: CAPTURE EVERYTHING mentioned or shown. Completeness > cleanliness.
+
+Rules:
+- Do NOT summarize.
+- Do NOT normalize ingredient names.
+- Include ALL ingredients even if minor (nuts, water, flour, toppings, add-ins).
+- Include ALL steps including prep, mixing, baking, cooling, serving.
+- If something is mentioned or shown, include it.
+- Output ONLY valid JSON.
+
+IMPORTANT INFERENCE RULES:
+
+- If a baked dessert batter is shown or described,
+  and flour is NOT mentioned verbally,
+  you MUST still include "flour" as an ingredient.
+
+- If chopped nuts are visible in ANY frame,
+  include them explicitly (e.g. "walnuts"),
+  even if not spoken.
+
+- If an ingredient is visually obvious but not spoken,
+  include it and set source = "visual".
+
+- If an ingredient is REQUIRED for the recipe to function
+  (e.g. flour in brownies, walnuts or chocolate shards on top, etc.),
+  include it and set source = "assumed".
+
+The transcript and the video frames follow in the next message.
+"""
+
+AUDIT_INSTRUCTIONS = """
+You are auditing extracted cooking data for missing ingredients.
+RAW INGREDIENTS and RAW STEPS follow in the next message.
+
+TASK:
+- Identify any ingredients that are REQUIRED, IMPLIED, or VISUALLY OBVIOUS
+but missing from RAW INGREDIENTS.
+- Examples:
+- Flour in brownies or cakes
+- Walnuts or nuts if nut brownies
+- Chocolate chunks if visible
+- Baking pan grease
+- Do NOT repeat existing ingredients.
+- Do NOT invent quantities.
+
+Return ONLY valid JSON in this exact shape:
+{
+"missing_ingredients": [string]
+}
+"""
+
+STRUCTURE_INSTRUCTIONS = """
+You are converting a cooking video into a clean recipe JSON.
+
+You MUST use the extracted lists RAW_INGREDIENTS and RAW_STEPS (in the next
+message) as source-of-truth.
+Do not omit items from them.
+
+Rules:
+- Return ONLY valid JSON that matches the schema. No extra keys, no markdown.
+- Every RAW_INGREDIENT must appear in ingredients[] (normalized).
+- Every ingredient must be used in at least one step.
+- Steps must cover full process start→finish (preheat, mix, add-ins, pan, bake, cool, serve).
+- ingredient_id must be null (server will fill it).
+- Diet tags:
+  - No animal products => Vegan (and NOT Vegetarian).
+  - Dairy present but no eggs => Vegetarian (and NOT Vegan).
+  - Never include both.
+- If baking is present, cook_time MUST be filled.
+
+
+ACCURACY + COMPLETENESS (MOST IMPORTANT)
+- Produce a COMPLETE recipe: do not omit ingredients or steps that appear in the transcript or on-screen text.
+- If any ingredient is mentioned in transcript OR visible on screen, it MUST appear in the ingredients list.
+- Every ingredient in the ingredients list MUST be used in at least one step.
+- Steps MUST cover the entire process from start to finish (prep → cook/bake → cool/finish).
+
+TITLE
+- Title must be specific and correct (ex: "Vegan Brownies").
+- Do NOT use generic titles like "Chocolate Cake" unless the recipe is explicitly cake.
+- If baked in a square/rectangular pan and sliced into squares/bars, prefer "brownies" or "bars" over "cake".
+
+DIET TAG LOGIC (HARD RULES)
+- If there are NO animal products (no eggs, dairy, meat, honey), include tag "Vegan".
+- If eggs are absent but dairy is present, include tag "Vegetarian" (and do NOT include Vegan).
+- Never include both "Vegan" and "Vegetarian" together.
+- Tags must come only from this set if relevant:
+  Vegan, Vegetarian, Gluten-Free, Dairy-Free, Healthy, Dessert, Comfort Food, Quick, Breakfast, Dinner, Spicy
+- Only include tags that are clearly supported by the recipe.
+
+SERVINGS + TIMES
+- If servings are stated, use them.
+- If not stated, infer servings using pan size or typical yield or ingredient quantity (ex: "9" for a 9-inch square pan).
+- If baking is present, cook_time MUST be included and must reflect the baking time.
+- prep_time should reflect mixing + prep steps (reasonable estimate if not stated).
+- Prefer concise time strings like "10 min" or "12-15 min" (not paragraphs).
+
+INGREDIENTS
+- Ingredients must be normalized to common names (ex: "cocoa powder", "all-purpose flour", "vegetable oil").
+- Include ALL ingredients with correct amounts when available.
+- If a quantity is known but unit is unclear, set unit to null.
+- If both quantity and unit are unknown, set both to null, but still include the ingredient name.
+- If an ingredient is "divided or chopped" (ex: chocolate shards), keep it as ONE ingredient and put "divided" in notes.
+
+STEPS
+- MAKE STEPS AS DETAILED AS POSSIBLE FOR USERS
+- Steps must be short, clear, and in correct order.
+- Include temperatures and baking times exactly if stated; otherwise infer from context only if strongly implied.
+- Baking recipes MUST include:
+  1) Preheat instruction
+  2) Mixing instructions in correct grouping (dry/wet if relevant)
+  3) Pan size / lining/greasing if mentioned or visible
+  4) Bake temperature + time
+  5) Cooling instruction
+  6) Final serve/slice step
+- Do not collapse the recipe into vague steps like "mix everything"; be specific about what gets added when.
+
+CONSISTENCY CHECK (SELF-VERIFY BEFORE FINAL OUTPUT)
+- Verify no important ingredients are missing (especially add-ins like nuts/chocolate).
+- Verify steps include baking + cooling if baked.
+- Verify tags obey the Vegan/Vegetarian rule.
+
+- If amounts are unknown, set quantity/unit to null.
+- Difficulty must be Easy/Medium/Hard.
+- Do NOT stop early in figuring out steps and writting all the steps in detail.
+- Return ONLY the JSON in the schema.
+"""
+
+def _json_format(name: str, schema: dict) -> dict:
+    return {"format": {"type": "json_schema", "name": name, "schema": schema}}
+
+def _instructions(text: str) -> dict:
+    return {"role": "developer", "content": [{"type": "input_text", "text": text}]}
+
+def _pass_template(name: str, instructions: str, schema_name: str, schema: dict) -> dict:
+    """The static part of a pass's responses.create call."""
+    return {
+        "model": "gpt-4o-mini",
+        "prefix": [_instructions(instructions)],
+        "text": _json_format(schema_name, schema),
+        # route passes of the same kind to the same cache shard
+        "extra_body": {"prompt_cache_key": f"vegcooking-{name}"},
+    }
+
+PASS_TEMPLATES: Dict[str, dict] = {
+    "raw_extraction": _pass_template("raw_extraction", RAW_EXTRACTION_INSTRUCTIONS, "raw_extraction", RAW_EXTRACTION_SCHEMA),
+    "audit": _pass_template("audit", AUDIT_INSTRUCTIONS, "audit_result", AUDIT_SCHEMA),
+    "structure": _pass_template("structure", STRUCTURE_INSTRUCTIONS, "recipe_draft", FINAL_RECIPE_SCHEMA),
+}
+
+def _pass_kwargs(pass_name: str, content: List[dict]) -> dict:
+    """responses.create arguments for one pass: its static template followed by this video's content."""
+    template = PASS_TEMPLATES[pass_name]
+    return {
+        "model": template["model"],
+        "input": cast(Any, [*template["prefix"], {"role": "user", "content": content}]),
+        "text": cast(Any, template["text"]),
+        "extra_body": template["extra_body"],
+    }
+
+def _run_pass(pass_name: str, content: List[dict]) -> Any:
+    return _create_response(pass_name, **_pass_kwargs(pass_name, content))
+
+# ---------- Extraction passes ----------
+
+def _extract_raw_recipe_data(transcript_text: str, frame_paths: List[str]) -> dict:
+    """Extract raw recipe data from transcript and video frames."""
+    images = [{"type": "input_image", "image_url": to_data_url_jpg(p)} for p in frame_paths]
+
+    raw_resp = _run_pass("raw_extraction", [
+        {"type": "input_text", "text": f"Transcript:\n{transcript_text}"},
+        *images,
+    ])
+
+    try:
+        raw_data = json.loads(raw_resp.output_text)
+        log_event(
+            "import.raw_extraction", sample_rate=1.0, level=logging.DEBUG,
+            raw_ingredients=raw_data.get("raw_ingredients", []),
+            raw_steps=raw_data.get("raw_steps", []),
+            **{k: raw_data.get(k) for k in ("oven_temp", "bake_time", "pan_size", "servings_hint")},
+        )
+        return raw_data
+    except Exception:
+        raise PipelineError(status_code=500, detail=f"Pass 1 invalid JSON. Raw: {raw_resp.output_text[:400]}")
+
+def _audit_missing_ingredients(raw_data: dict) -> List[str]:
+    """Audit extracted data for missing implied ingredients."""
+    audit_resp = _run_pass("audit", [{
+        "type": "input_text",
+        "text": (
+            f"RAW INGREDIENTS:\n{json.dumps(raw_data.get('raw_ingredients', []), indent=2)}\n\n"
+            f"RAW STEPS:\n{json.dumps(raw_data.get('raw_steps', []), indent=2)}"
+        ),
+    }])
+
+    audit_data = json.loads(audit_resp.output_text)
+    return audit_data.get("missing_ingredients", [])
+
+def _merge_missing_ingredients(raw_data: dict, missing_ingredients: List[str]) -> None:
+    """Merge missing ingredients into raw_data."""
+    existing_norms = {
+        norm_name(ing["name"])
+        for ing in raw_data.get("raw_ingredients", [])
+    }
+
+    for name in missing_ingredients:
+        if norm_name(name) in existing_norms:
+            continue
+
+        raw_data["raw_ingredients"].append({
+            "name": name,
+            "quantity_text": None,
+            "source": "assumed"
+        })
+
+    log_event("import.audit", sample_rate=1.0, level=logging.DEBUG, missing_ingredients=missing_ingredients)
+
+def _structure_content(raw_data: dict, transcript_text: str) -> List[dict]:
+    return [{
+        "type": "input_text",
+        "text": f"""RAW_INGREDIENTS (source-of-truth):
+{json.dumps(raw_data.get("raw_ingredients", []), ensure_ascii=False)}
+
+RAW_STEPS (source-of-truth):
+{json.dumps(raw_data.get("raw_steps", []), ensure_ascii=False)}
+
+Hints:
+- oven_temp: {raw_data.get("oven_temp")}
+- bake_time: {raw_data.get("bake_time")}
+- pan_size: {raw_data.get("pan_size")}
+- servings_hint: {raw_data.get("servings_hint")}
+
+Transcript (For extra context if needed):
+{transcript_text}
+""",
+    }]
+
+def _structure_final_recipe(raw_data: dict, transcript_text: str) -> dict:
+    """Structure the final recipe from raw extracted data."""
+    resp = _run_pass("structure", _structure_content(raw_data, transcript_text))
+
+    try:
+        data = json.loads(resp.output_text)
+        log_event("import.structure", sample_rate=1.0, level=logging.DEBUG, ingredients=data.get("ingredients", []))
+        return data
+    except Exception:
+        raise PipelineError(status_code=500, detail=f"Model did not return valid JSON. Raw: {resp.output_text[:400]}")
+
+# ---------- Streaming the final pass ----------
+
+class DraftStreamParser:
+    """Incremental parser for the recipe_draft JSON as the model writes it.
+
+    feed() returns what completed in the new text, in order:
+      ("field", name, value)        a top-level field (title, tags, ...)
+      ("ingredient", index, value)  one element of ingredients[]
+      ("step", index, value)        one element of steps[]
+    """
+
+    ITEM_EVENTS = {"ingredients": "ingredient", "steps": "step"}
+
+    def __init__(self):
+        self.buf = ""
+        self.pos = 0
+        self.depth = 0
+        self.in_string = False
+        self.escape = False
+        self.string_start = 0
+        self.key: Optional[str] = None
+        self.expect_key = False
+        self.value_start: Optional[int] = None
+        self.item_start: Optional[int] = None
+        self.items = 0
+
+    def feed(self, chunk: str) -> List[tuple]:
+        events: List[tuple] = []
+        self.buf += chunk
+        while self.pos < len(self.buf):
+            i, c = self.pos, self.buf[self.pos]
+            self.pos += 1
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif c == "\\":
+                    self.escape = True
+                elif c == '"':
+                    self.in_string = False
+                    if self.depth == 1 and self.expect_key:
+                        self.key = json.loads(self.buf[self.string_start:i + 1])
+                continue
+
+            if c == '"':
+                self.in_string = True
+                self.string_start = i
+            elif c == ":" and self.depth == 1:
+                self.expect_key = False
+                self.value_start = i + 1
+                self.items = 0
+            elif c in "{[":
+                self.depth += 1
+                if self.depth == 1:
+                    self.expect_key = True
+                elif self.depth == 3 and self.key in self.ITEM_EVENTS:
+                    self.item_start = i
+            elif c in "}]":
+                if self.depth == 3 and self.item_start is not None:
+                    events.append((self.ITEM_EVENTS[self.key], self.items, json.loads(self.buf[self.item_start:i + 1])))
+                    self.items += 1
+                    self.item_start = None
+                elif self.depth == 1:
+                    self._end_value(i, events)
+                self.depth -= 1
+            elif c == "," and self.depth == 1:
+                self._end_value(i, events)
+                self.expect_key = True
+        return events
+
+    def _end_value(self, end: int, events: List[tuple]) -> None:
+        if self.value_start is None:
+            return
+        if self.key not in self.ITEM_EVENTS:
+            events.append(("field", self.key, json.loads(self.buf[self.value_start:end])))
+        self.value_start = None
+
+def stream_final_recipe(raw_data: dict, transcript_text: str) -> Iterator[tuple]:
+    """_structure_final_recipe over a streamed response.
+
+    Yields DraftStreamParser events as the model writes them, then
+    ("done", draft) with the complete draft.
+    """
+    kwargs = _pass_kwargs("structure", _structure_content(raw_data, transcript_text))
+    parser = DraftStreamParser()
+    chunks: List[str] = []
+    with span("llm_structure", model=kwargs["model"], stream=True) as attrs:
+        stream = _schedule_openai(
+            kwargs["model"],
+            lambda: openai_client.responses.create(stream=True, **kwargs),
+            tokens=estimate_tokens(kwargs["input"]),
+        )
+        for event in stream:
+            if event.type == "response.output_text.delta":
+                chunks.append(event.delta)
+                yield from parser.feed(event.delta)
+            elif event.type == "response.completed":
+                record_openai_usage(attrs, event.response)
+
+    output_text = "".join(chunks)
+    try:
+        data = json.loads(output_text)
+    except Exception:
+        raise PipelineError(status_code=500, detail=f"Model did not return valid JSON. Raw: {output_text[:400]}")
+    yield ("done", data)
+
+def run_ffmpeg(cmd: List[str], step: str = "ffmpeg") -> str:
+    # ffmpeg is noisy; we just want it to fail loudly if needed (stderr is
+    # returned for the callers that parse filter output)
+    with span(step):
+        res = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    if res.returncode != 0:
+        raise RuntimeError(f"ffmpeg failed: {res.stderr[-800:]}")
+    return res.stderr
+
+# Transcription audio: mono 16 kHz Opus at a speech bitrate (~0.18 MB/min
+# against ~1.9 MB/min for 16-bit WAV), with leading, trailing and long
+# internal silences cut out. Each silence keeps a little padding so words
+# are not clipped. The transcript is plain text without timestamps, so the
+# cut needs no mapping back: frame and cover times come from the video itself.
+AUDIO_BITRATE = "24k"
+AUDIO_SILENCE_DB = -40
+AUDIO_SILENCE_MIN_S = 1.0
+AUDIO_SILENCE_PAD_S = 0.25
+
+def detect_speech_segments(media_path: str) -> List[Tuple[float, float]]:
+    """Source-time (start, end) intervals left after cutting silences longer
+    than AUDIO_SILENCE_MIN_S."""
+    stderr = run_ffmpeg([
+        "ffmpeg", "-hide_banner", "-nostats",
+        "-i", media_path,
+        "-vn",
+        "-af", f"silencedetect=noise={AUDIO_SILENCE_DB}dB:d={AUDIO_SILENCE_MIN_S}",
+        "-f", "null", "-",
+    ], step="ffmpeg_silence")
+
+    m = re.search(r"Duration: (\d+):(\d+):(\d+(?:\.\d+)?)", stderr)
+    duration = int(m.group(1)) * 3600 + int(m.group(2)) * 60 + float(m.group(3)) if m else None
+    starts = [float(x) for x in re.findall(r"silence_start: (-?\d+(?:\.\d+)?)", stderr)]
+    ends = [float(x) for x in re.findall(r"silence_end: (-?\d+(?:\.\d+)?)", stderr)]
+
+    segments: List[Tuple[float, float]] = []
+    cursor = 0.0
+    for i, start in enumerate(starts):
+        if start > cursor:
+            segments.append((cursor, start + AUDIO_SILENCE_PAD_S))
+        if i >= len(ends) or (duration is not None and ends[i] >= duration - 0.05):
+            return segments  # silent until the end
+        cursor = max(cursor, ends[i] - AUDIO_SILENCE_PAD_S)
+    if duration is None or duration > cursor:
+        segments.append((cursor, duration if duration is not None else float("inf")))
+    return segments
+
+def extract_audio(video_path: str, out_path: str) -> List[Tuple[float, float]]:
+    """Write silence-trimmed mono 16 kHz Opus/OGG to out_path.
+
+    Returns the kept source intervals.
+    """
+    # nothing but silence: keep it whole rather than write an empty file
+    segments = detect_speech_segments(video_path) or [(0.0, float("inf"))]
+    keep = "+".join(
+        f"gte(t,{start:.3f})" if end == float("inf") else f"between(t,{start:.3f},{end:.3f})"
+        for start, end in segments
+    )
+
+    run_ffmpeg([
+        "ffmpeg", "-y",
+        "-i", video_path,
+        "-vn",
+        "-ac", "1",
+        "-ar", "16000",
+        "-af", f"aselect='{keep}',asetpts=N/SR/TB",
+        "-c:a", "libopus",
+        "-b:a", AUDIO_BITRATE,
+        # the encoder's fastest settings; the higher-effort modes cost several
+        # times the CPU for no difference the transcription model notices
+        "-application", "audio",
+        "-compression_level", "0",
+        out_path
+    ], step="ffmpeg_audio")
+    return segments
+
+# Suggested cover: every sampled frame is also scored (sharpness from
+# blurdetect, brightness from signalstats, on a small copy) and kept as a
+# high-quality candidate in the same ffmpeg pass. The best one is encoded to
+# WebP at a few widths so feeds and grids never download a full-size photo.
+COVER_WIDTHS = (240, 480, 960)
+COVER_WEBP_QUALITY = 80
+COVER_SCORE_WIDTH = 480
+COVER_TARGET_LUMA = 128.0
+
+def extract_frames(video_path: str, frames_dir: str, fps: float = 1.0, max_frames: int = 12) -> List[str]:
+    """
+    Extract ~1 frame per second, the first max_frames frames only.
+
+    The same pass writes cover_NNN.jpg candidates and the per-frame scores
+    that pick_cover() reads from frames_dir. Cover scoring is best effort: if
+    that pass fails, the frames are extracted on their own and the import
+    goes ahead without a suggested cover.
+    """
+    Path(frames_dir).mkdir(parents=True, exist_ok=True)
+    frames = Path(frames_dir)
+    max_cover = max(COVER_WIDTHS)
+
+    try:
+        run_ffmpeg([
+            "ffmpeg", "-y",
+            "-i", video_path,
+            "-filter_complex",
+            f"fps={fps},split=3[llm][score][cover];"
+            f"[score]scale={COVER_SCORE_WIDTH}:-2,signalstats,blurdetect,"
+            f"metadata=mode=print:file={frames / 'scores.txt'},nullsink;"
+            f"[cover]scale='min(iw,{max_cover})':-2[candidate]",
+            # stop decoding once max_frames are out instead of sampling the whole video
+            "-map", "[llm]", "-frames:v", str(max_frames), str(frames / "frame_%03d.jpg"),
+            "-map", "[candidate]", "-frames:v", str(max_frames), "-q:v", "2", str(frames / "cover_%03d.jpg"),
+        ], step="ffmpeg_frames")
+    except RuntimeError as e:
+        log_event("cover_scoring.error", sample_rate=1.0, error=str(e))
+        # partial output from the failed pass must not reach pick_cover()
+        for leftover in [*frames.glob("*.jpg"), frames / "scores.txt"]:
+            leftover.unlink(missing_ok=True)
+        run_ffmpeg([
+            "ffmpeg", "-y",
+            "-i", video_path,
+            "-vf", f"fps={fps}",
+            "-frames:v", str(max_frames),
+            str(frames / "frame_%03d.jpg"),
+        ], step="ffmpeg_frames")
+
+    return [str(p) for p in sorted(frames.glob("frame_*.jpg"))[:max_frames]]
+
+def _frame_scores(frames_dir: str) -> List[dict]:
+    """Parse the metadata=print output: one dict per frame, in order."""
+    scores: List[dict] = []
+    path = Path(frames_dir) / "scores.txt"
+    if not path.exists():
+        return scores
+    for line in path.read_text().splitlines():
+        if line.startswith("frame:"):
+            time_s = float(line.rsplit("pts_time:", 1)[1])
+            scores.append({"time_s": time_s, "blur": 0.0, "luma": COVER_TARGET_LUMA})
+        elif scores and line.startswith("lavfi.blur="):
+            # a flat frame has no edges to measure and reports nan
+            blur = float(line.split("=", 1)[1])
+            scores[-1]["blur"] = blur if math.isfinite(blur) else math.inf
+        elif scores and line.startswith("lavfi.signalstats.YAVG="):
+            scores[-1]["luma"] = float(line.split("=", 1)[1])
+    return scores
+
+def _cover_score(frame: dict) -> float:
+    # sharp and well exposed; a black or blown-out frame scores zero
+    exposure = max(0.0, 1.0 - abs(frame["luma"] - COVER_TARGET_LUMA) / COVER_TARGET_LUMA)
+    return exposure / (1.0 + frame["blur"])
+
+def pick_cover(frames_dir: str) -> Optional[dict]:
+    """Choose the best candidate written by extract_frames() and encode it as
+    WebP at COVER_WIDTHS (never upscaled).
+
+    Returns {"time_s", "thumbnails": {width: webp bytes}}, or None if there
+    is no usable frame.
+    """
+    frames = Path(frames_dir)
+    candidates = sorted(frames.glob("cover_*.jpg"))
+    scores = _frame_scores(frames_dir)[:len(candidates)]
+    if not scores:
+        return None
+    best = max(range(len(scores)), key=lambda i: _cover_score(scores[i]))
+
+    split = "".join(f"[s{w}]" for w in COVER_WIDTHS)
+    graph = f"split={len(COVER_WIDTHS)}{split};" + ";".join(
+        f"[s{w}]scale='min(iw,{w})':-2[w{w}]" for w in COVER_WIDTHS
+    )
+    outputs: List[str] = []
+    for w in COVER_WIDTHS:
+        outputs += ["-map", f"[w{w}]", "-quality", str(COVER_WEBP_QUALITY), str(frames / f"thumb_w{w}.webp")]
+    try:
+        run_ffmpeg(["ffmpeg", "-y", "-i", str(candidates[best]), "-filter_complex", graph, *outputs], step="ffmpeg_cover")
+    except RuntimeError:
+        return None  # a missing cover should never fail the import
+
+    return {
+        "time_s": scores[best]["time_s"],
+        "thumbnails": {w: (frames / f"thumb_w{w}.webp").read_bytes() for w in COVER_WIDTHS},
+    }
+
+def to_data_url_jpg(path: str) -> str:
+    b = Path(path).read_bytes()
+    b64 = base64.b64encode(b).decode("utf-8")
+    return f"data:image/jpeg;base64,{b64}"
+
+def norm_name(s: str) -> str:
+    s = (s or "").strip().lower()
+    s = re.sub(r"\s+", " ", s)
+    return s
+
+def _ydl_opts(**extra: Any) -> dict:
+    return {
+        'js_runtimes': {
+            'deno': {
+                'path': '/root/.deno/bin/deno'
+            }
+        },
+        'noplaylist': True,
+        # keep every request on the calling thread, inside pinned_dns()
+        # (ffmpeg would resolve HLS hosts itself, fragment workers run elsewhere)
+        'hls_prefer_native': True,
+        'concurrent_fragment_downloads': 1,
+        **extra,
+    }
+
+def _url_dns(url: str, addresses: Optional[Sequence[str]]):
+    """pinned_dns() for fetching url: its host resolves to the addresses the
+    API checked; without them every host is only checked for public addresses."""
+    host = urlparse(url).hostname
+    return pinned_dns({host: addresses} if host and addresses else {})
+
+def download_video_from_url(url: str, temp_dir: str, addresses: Optional[Sequence[str]] = None) -> Path:
+    """
+    Downloads a low-res MP4 into temp_dir and returns the path.
+    Uses yt-dlp and keeps file only inside temp_dir (auto-deleted by TemporaryDirectory).
+    """
+    
+    outtmpl = Path(temp_dir) / "video.mp4"
+
+    import yt_dlp
+
+    # Configure options
+    ydl_opts = _ydl_opts(**{
+        'format': 'bv*[ext=mp4][height<=360]+ba[ext=m4a]/b[ext=mp4][height<=360]/b',
+        'merge_output_format': 'mp4',
+        'max_filesize': 200 * 1024 * 1024,  # 200MB in bytes
+        'outtmpl': str(outtmpl),
+    })
+
+    # Download
+    with span("url_download"), _url_dns(url, addresses), yt_dlp.YoutubeDL(ydl_opts) as ydl:
+        ydl.download([url])
+
+    return outtmpl
+
+# ---------- URL imports ----------
+#
+# Most TikTok/YouTube/Instagram recipe videos come with captions and a
+# description that already list the ingredients and steps. URL imports read
+# those first (metadata only, no media) and download the video only when the
+# text is too thin or the text-only extraction comes back incomplete. Audio is
+# only transcribed when the platform has no captions.
+
+URL_TEXT_MIN_WORDS = 40
+URL_TEXT_MAX_CHARS = 12000
+URL_MIN_INGREDIENTS = 3
+URL_MIN_STEPS = 2
+CAPTION_LANGS = ("en", "en-US", "en-GB", "en-orig", "eng-US")
+
+def _pick_caption_track(info: dict) -> Optional[dict]:
+    """Best WebVTT caption track: uploaded before automatic, English before the video's own language."""
+    for tracks in (info.get("subtitles") or {}, info.get("automatic_captions") or {}):
+        langs = [l for l in CAPTION_LANGS if l in tracks]
+        langs += [l for l in tracks if l.startswith("en") and l not in langs]
+        if info.get("language") in tracks:
+            langs.append(info["language"])
+        for lang in langs:
+            for track in tracks[lang]:
+                if track.get("ext") == "vtt" and track.get("url"):
+                    return track
+    return None
+
+def _vtt_to_text(vtt: str) -> str:
+    lines: List[str] = []
+    for line in vtt.splitlines():
+        line = re.sub(r"<[^>]+>", "", line).strip()
+        if not line or line == "WEBVTT" or "-->" in line or line.isdigit():
+            continue
+        if line.startswith(("Kind:", "Language:", "NOTE")):
+            continue
+        # rolling automatic captions repeat each line in the next cue
+        if line in lines[-2:]:
+            continue
+        lines.append(line)
+    return " ".join(lines)
+
+def fetch_url_text(url: str, addresses: Optional[Sequence[str]] = None) -> dict:
+    """Title, description and captions of a video page, without downloading media."""
+    import yt_dlp
+
+    with span("url_metadata") as attrs, _url_dns(url, addresses), yt_dlp.YoutubeDL(_ydl_opts(skip_download=True, quiet=True)) as ydl:
+        try:
+            info = ydl.extract_info(url, download=False)
+        except yt_dlp.utils.DownloadError as e:
+            raise PipelineError(status_code=400, detail=f"Could not load video link: {e}")
+
+        captions = ""
+        track = _pick_caption_track(info)
+        if track:
+            try:
+                captions = _vtt_to_text(ydl.urlopen(track["url"]).read().decode("utf-8", "replace"))
+            except Exception:
+                captions = ""  # the description may still be enough
+        attrs["captions"] = bool(captions)
+
+    return {
+        "title": info.get("title") or "",
+        "description": info.get("description") or "",
+        "captions": captions,
+    }
+
+def _url_text(meta: dict) -> str:
+    parts = [f"Title: {meta['title']}"]
+    if meta["description"]:
+        parts.append(f"Description:\n{meta['description']}")
+    if meta["captions"]:
+        parts.append(f"Captions:\n{meta['captions']}")
+    return "\n\n".join(parts)[:URL_TEXT_MAX_CHARS]
+
+def _extraction_complete(raw_data: dict) -> bool:
+    return (
+        len(raw_data.get("raw_ingredients", [])) >= URL_MIN_INGREDIENTS
+        and len(raw_data.get("raw_steps", [])) >= URL_MIN_STEPS
+    )
+
+def _extract_from_url_media(
+    url: str, meta: dict, text: str, addresses: Optional[Sequence[str]]
+) -> Tuple[dict, str, Optional[dict]]:
+    """Fallback: download the video, add frames (and a transcript if there
+    are no captions) and run the raw extraction again. Also returns the
+    suggested cover."""
+    with tempfile.TemporaryDirectory() as td:
+        video_path = download_video_from_url(url, td, addresses)
+        frames_dir = str(Path(td) / "frames")
+        frame_paths = extract_frames(str(video_path), frames_dir, fps=1.5, max_frames=18)
+        cover = pick_cover(frames_dir)
+        if not meta["captions"]:
+            audio_path = Path(td) / "audio.ogg"
+            extract_audio(str(video_path), str(audio_path))
+            text = f"{text}\n\nTranscript:\n{_transcribe_audio(audio_path)}"
+        return _extract_raw_recipe_data(text, frame_paths), text, cover
+
+def run_url_extraction(url: str, addresses: Optional[Sequence[str]] = None) -> dict:
+    """Every stage of a URL import (captions and description first) up to the
+    final structuring pass. Imports that never download the video have no
+    suggested cover. addresses are the host's checked IPs (see url_safety)."""
+    meta = fetch_url_text(url, addresses)
+    text = _url_text(meta)
+
+    raw_data, cover = None, None
+    if len(text.split()) >= URL_TEXT_MIN_WORDS:
+        raw_data = _extract_raw_recipe_data(text, [])
+        if not _extraction_complete(raw_data):
+            raw_data = None
+    if raw_data is None:
+        raw_data, text, cover = _extract_from_url_media(url, meta, text, addresses)
+
+    missing_ingredients = _audit_missing_ingredients(raw_data)
+    _merge_missing_ingredients(raw_data, missing_ingredients)
+    return {"raw_data": raw_data, "transcript": text, "cover": cover}
+
+def run_url_import(url: str, addresses: Optional[Sequence[str]] = None) -> dict:
+    """Run a URL import and return the recipe draft.
+
+    Ingredient ids are left null and the cover thumbnails are raw bytes; the
+    API resolves the ids and uploads the thumbnails.
+    """
+    extracted = run_url_extraction(url, addresses)
+    draft = _structure_final_recipe(extracted["raw_data"], extracted["transcript"])
+    draft["cover"] = extracted["cover"]
+    return draft
+
+def run_video_extraction(video_bytes: bytes, filename: str) -> dict:
+    """Every heavy stage of /video-import up to the final structuring pass.
+
+    Returns the merged raw extraction and the transcript, which the streaming
+    endpoints hand to stream_final_recipe(), and the suggested cover.
+    """
+    with tempfile.TemporaryDirectory() as td:
+        # Setup video processing and extract audio/frames
+        audio_path, frame_paths = _setup_video_processing(video_bytes, filename, td)
+        cover = pick_cover(str(Path(td) / "frames"))
+
+        # Transcribe audio
+        transcript_text = _transcribe_audio(audio_path)
+
+        # Extract raw recipe data
+        raw_data = _extract_raw_recipe_data(transcript_text, frame_paths)
+
+        # Audit for missing ingredients
+        missing_ingredients = _audit_missing_ingredients(raw_data)
+        _merge_missing_ingredients(raw_data, missing_ingredients)
+
+    return {"raw_data": raw_data, "transcript": transcript_text, "cover": cover}
+
+def run_video_import(video_bytes: bytes, filename: str) -> dict:
+    """Run every heavy stage of /video-import and return the recipe draft.
+
+    Ingredient ids are left null and the cover thumbnails are raw bytes; the
+    API resolves the ids and uploads the thumbnails.
+    """
+    extracted = run_video_extraction(video_bytes, filename)
+
+    # Structure final recipe
+    draft = _structure_final_recipe(extracted["raw_data"], extracted["transcript"])
+    draft["cover"] = extracted["cover"]
+    return draft
+
+def run_download_test(url: str, addresses: Optional[Sequence[str]] = None) -> dict:
+    """Download a URL with yt-dlp and report the result (debug endpoint)."""
+    # yt-dlp needs a JS runtime (deno) for some sites; record which one it sees
+    res = subprocess.run(
+        "bash -c 'source /root/.bashrc && deno --version'",
+        shell=True, capture_output=True, text=True,
+    )
+    log_event(
+        "download_test.deno", sample_rate=1.0,
+        returncode=res.returncode, version=res.stdout.strip(), error=res.stderr.strip() or None,
+    )
+    with tempfile.TemporaryDirectory() as td:
+        path = download_video_from_url(url, td, addresses)
+        log_event("download_test.done", sample_rate=1.0, url=url, path=str(path))
+        return {"path": str(path)}
+
+# Stages an executor may dispatch, by name
+STAGES: Dict[str, Callable[..., Any]] = {
+    "video_import": run_video_import,
+    "video_extract": run_video_extraction,
+    "url_import": run_url_import,
+    "url_extract": run_url_extraction,
+    "download_test": run_download_test,
+}
+
+def run_stage(stage: str, *args: Any) -> Any:
+    if stage not in STAGES:
+        raise ValueError(f"Unknown pipeline stage: {stage}")
+    return STAGES[stage](*args)
+
+def run_stage_traced(stage: str, *args: Any) -> tuple:
+    """run_stage for executors: also returns the timing spans it recorded,
+    so the API process can report them even when the stage ran elsewhere."""
+    with deferred_spans() as spans:
+        try:
+            result = run_stage(stage, *args)
+        except PipelineError:
+            raise
+        except Exception as e:
+            # Library exceptions do not always survive pickling (openai's
+            # APIStatusError takes keyword-only arguments), and one that cannot
+            # be unpickled breaks the whole process pool. Send a plain one back.
+            log_event("stage.error", sample_rate=1.0, stage=stage, error=repr(e))
+            status = getattr(e, "status_code", None)
+            if isinstance(status, int):
+                raise PipelineError(status_code=502, detail=f"Upstream request failed ({status}), please retry the import") from None
+            raise RuntimeError(f"{stage} failed: {type(e).__name__}: {e}") from None
+    return result, spans
@@ -0,0 +1,133 @@
+import os
+import time
+import random
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+from app.metrics import Counter, Gauge, register
+
+# Shared HTTP transport for the Supabase (PostgREST, Storage, Auth) and OpenAI clients:
+# pooled keep-alive connections sized for concurrent imports, HTTP/2 when the
+# `h2` package is installed, explicit connect/read timeouts so no call hangs
+# forever, and jittered retries for idempotent reads.
+#
+# Everything is tunable per deployment through HTTP_* env vars.
+
+HTTP_MAX_CONNECTIONS = int(os.environ.get("HTTP_MAX_CONNECTIONS", "64"))
+HTTP_MAX_KEEPALIVE = int(os.environ.get("HTTP_MAX_KEEPALIVE", "64"))
+HTTP_KEEPALIVE_EXPIRY_S = float(os.environ.get("HTTP_KEEPALIVE_EXPIRY_S", "30"))
+HTTP_CONNECT_TIMEOUT_S = float(os.environ.get("HTTP_CONNECT_TIMEOUT_S", "5"))
+HTTP_POOL_TIMEOUT_S = float(os.environ.get("HTTP_POOL_TIMEOUT_S", "10"))
+HTTP_READ_RETRIES = int(os.environ.get("HTTP_READ_RETRIES", "3"))
+HTTP_RETRY_BACKOFF_S = float(os.environ.get("HTTP_RETRY_BACKOFF_S", "0.2"))
+
+# Per-client read timeouts: PostgREST queries are short, LLM passes are not
+SUPABASE_READ_TIMEOUT_S = float(os.environ.get("SUPABASE_READ_TIMEOUT_S", "30"))
+OPENAI_READ_TIMEOUT_S = float(os.environ.get("OPENAI_READ_TIMEOUT_S", "180"))
+
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+RETRY_STATUSES = frozenset({502, 503, 504})
+
+def _h2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+HTTP2_ENABLED = os.environ.get("HTTP_HTTP2", "1") == "1" and _h2_available()
+
+HTTP_RETRIES = register(Counter("vegcooking_http_retries_total", "Retried idempotent requests by client"))
+
+def backoff_delay(attempt: int, base: float = HTTP_RETRY_BACKOFF_S, cap: float = 5.0) -> float:
+    """Full-jitter exponential backoff: uniform(0, min(cap, base * 2**attempt))."""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+class RetryTransport(httpx.BaseTransport):
+    """Retries idempotent requests on connection errors, timeouts and 502/503/504."""
+
+    def __init__(self, wrapped: httpx.HTTPTransport, name: str, retries: int = HTTP_READ_RETRIES):
+        self.wrapped = wrapped
+        self.name = name
+        self.retries = retries
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        if request.method not in IDEMPOTENT_METHODS:
+            return self.wrapped.handle_request(request)
+
+        attempt = 0
+        while True:
+            try:
+                response = self.wrapped.handle_request(request)
+            except httpx.TransportError as e:
+                if attempt >= self.retries or isinstance(e, httpx.PoolTimeout):
+                    raise
+            else:
+                if response.status_code not in RETRY_STATUSES or attempt >= self.retries:
+                    return response
+                response.close()
+            HTTP_RETRIES.inc(client=self.name)
+            time.sleep(backoff_delay(attempt))
+            attempt += 1
+
+    def close(self) -> None:
+        self.wrapped.close()
+
+# name -> transport, for pool stats
+_transports: Dict[str, httpx.HTTPTransport] = {}
+
+def build_transport(name: str, retries: int = HTTP_READ_RETRIES) -> httpx.BaseTransport:
+    inner = httpx.HTTPTransport(
+        http2=HTTP2_ENABLED,
+        limits=httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY_S,
+        ),
+    )
+    _transports[name] = inner
+    return RetryTransport(inner, name, retries=retries)
+
+def build_timeout(read_s: float) -> httpx.Timeout:
+    return httpx.Timeout(
+        connect=HTTP_CONNECT_TIMEOUT_S,
+        read=read_s,
+        write=read_s,
+        pool=HTTP_POOL_TIMEOUT_S,
+    )
+
+def build_http_client(
+    name: str,
+    read_timeout_s: float,
+    client_cls=httpx.Client,
+    transport: Optional[httpx.BaseTransport] = None,
+    **kwargs,
+) -> httpx.Client:
+    """An httpx client on the shared transport; clients for one host can pass
+    the same `transport` to share its connection pool."""
+    return client_cls(
+        transport=transport or build_transport(name),
+        timeout=build_timeout(read_timeout_s),
+        **kwargs,
+    )
+
+def pool_stats() -> Dict[str, Dict[str, int]]:
+    """Connection counts per client pool (total, idle, HTTP/2)."""
+    stats = {}
+    for name, transport in _transports.items():
+        connections = list(getattr(transport._pool, "connections", []))
+        stats[name] = {
+            "connections": len(connections),
+            "idle": sum(1 for c in connections if c.is_idle()),
+            "http2": sum(1 for c in connections if "HTTP/2" in repr(c)),
+        }
+    return stats
+
+def _pool_gauge(key: str):
+    def read() -> List[Tuple[dict, Optional[int]]]:
+        return [({"client": name}, s[key]) for name, s in pool_stats().items()]
+    return read
+
+register(Gauge("vegcooking_http_pool_connections", "Open pooled connections by client", _pool_gauge("connections")))
+register(Gauge("vegcooking_http_pool_idle_connections", "Idle keep-alive connections by client", _pool_gauge("idle")))
@@ -0,0 +1,190 @@
+import os
+import time
+import socket
+import asyncio
+import ipaddress
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+from urllib.parse import urlparse
+
+from app.metrics import Counter, Histogram, register
+
+# Safety checks for user-supplied links (URL imports).
+#
+#   checked = await url_checker.check(url)      # None unless public http(s)
+#   ...
+#   with pinned_dns({checked.host: checked.addresses}):
+#       yt-dlp fetches url
+#
+# check() resolves every A and AAAA record of the host without blocking the
+# event loop and accepts the link only if all of them are public addresses.
+# Answers are cached per host for URL_CHECK_TTL_S (failed or rejected hosts
+# for URL_CHECK_NEGATIVE_TTL_S), and concurrent checks of one host share a
+# single lookup.
+#
+# The fetch then runs inside pinned_dns(): the checked host resolves to the
+# addresses that were validated, without a second lookup, so an answer that
+# changes between check and fetch (DNS rebinding) cannot point the download at
+# an internal service. Every other host the fetch reaches (CDNs, API hosts,
+# redirects) is resolved normally but refused unless all of its addresses are
+# public. The guard applies to the thread that entered pinned_dns(); yt-dlp is
+# kept on that thread (native HLS/DASH, one fragment at a time).
+#
+# The resolver is any async callable host -> [address]; tests and benchmarks
+# swap in a fake with url_checker.resolver = ... .
+
+URL_CHECK_TTL_S = float(os.environ.get("URL_CHECK_TTL_S", "300"))
+URL_CHECK_NEGATIVE_TTL_S = float(os.environ.get("URL_CHECK_NEGATIVE_TTL_S", "30"))
+URL_CHECK_TIMEOUT_S = float(os.environ.get("URL_CHECK_TIMEOUT_S", "5"))
+URL_CHECK_CACHE_SIZE = int(os.environ.get("URL_CHECK_CACHE_SIZE", "4096"))
+
+Resolver = Callable[[str], Awaitable[Sequence[str]]]
+
+CHECKS = register(Counter("vegcooking_url_checks_total", "URL safety checks, by result (cached, resolved, rejected)"))
+RESOLVE_SECONDS = register(Histogram("vegcooking_url_resolve_seconds", "DNS lookups made by URL safety checks"))
+
+def is_public_address(address: str) -> bool:
+    """True for globally routable unicast addresses (IPv4-mapped IPv6 is judged as IPv4)."""
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    if isinstance(ip, ipaddress.IPv6Address) and ip.ipv4_mapped:
+        ip = ip.ipv4_mapped
+    return ip.is_global and not ip.is_multicast
+
+async def system_resolver(host: str) -> List[str]:
+    """All A and AAAA records of host, via the loop's getaddrinfo (a worker thread)."""
+    infos = await asyncio.get_running_loop().getaddrinfo(host, None, type=socket.SOCK_STREAM)
+    return sorted({info[4][0] for info in infos})
+
+def _host_key(host: str) -> str:
+    return host.lower().rstrip(".")
+
+class CheckedUrl(NamedTuple):
+    url: str
+    host: str
+    addresses: Tuple[str, ...]
+
+class UrlChecker:
+    def __init__(
+        self,
+        resolver: Resolver = system_resolver,
+        ttl_s: float = URL_CHECK_TTL_S,
+        negative_ttl_s: float = URL_CHECK_NEGATIVE_TTL_S,
+        timeout_s: float = URL_CHECK_TIMEOUT_S,
+        max_entries: int = URL_CHECK_CACHE_SIZE,
+    ):
+        self.resolver = resolver
+        self.ttl_s = ttl_s
+        self.negative_ttl_s = negative_ttl_s
+        self.timeout_s = timeout_s
+        self.max_entries = max_entries
+        # host -> (expires_at, public addresses or None), least recently used first
+        self._cache: "OrderedDict[str, Tuple[float, Optional[Tuple[str, ...]]]]" = OrderedDict()
+        self._pending: Dict[str, "asyncio.Task[Optional[Tuple[str, ...]]]"] = {}
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+    async def check(self, url: str) -> Optional[CheckedUrl]:
+        """The URL with its validated addresses, or None if it is not a public http(s) link."""
+        try:
+            u = urlparse(url)
+            host = u.hostname
+            u.port  # raises on a malformed port
+        except ValueError:
+            return None
+        if u.scheme not in ("http", "https") or not host:
+            return None
+
+        host = _host_key(host)
+        addresses = await self.resolve_public(host)
+        return CheckedUrl(url, host, addresses) if addresses else None
+
+    async def resolve_public(self, host: str) -> Optional[Tuple[str, ...]]:
+        """Every address of host if all of them are public, else None."""
+        hit = self._cache.get(host)
+        if hit is not None and hit[0] > time.monotonic():
+            self._cache.move_to_end(host)
+            CHECKS.inc(result="cached")
+            return hit[1]
+
+        task = self._pending.get(host)
+        if task is None:
+            task = self._pending[host] = asyncio.ensure_future(self._lookup(host))
+            task.add_done_callback(lambda _: self._pending.pop(host, None))
+        # a caller that goes away must not cancel the lookup others wait on
+        return await asyncio.shield(task)
+
+    async def _lookup(self, host: str) -> Optional[Tuple[str, ...]]:
+        try:
+            ipaddress.ip_address(host)
+            addresses: Sequence[str] = [host]
+        except ValueError:
+            started = time.perf_counter()
+            try:
+                addresses = await asyncio.wait_for(self.resolver(host), self.timeout_s)
+            except (OSError, UnicodeError, asyncio.TimeoutError):
+                addresses = []
+            RESOLVE_SECONDS.observe(time.perf_counter() - started)
+
+        public = tuple(addresses) if addresses and all(is_public_address(a) for a in addresses) else None
+        CHECKS.inc(result="resolved" if public else "rejected")
+
+        self._cache[host] = (time.monotonic() + (self.ttl_s if public else self.negative_ttl_s), public)
+        self._cache.move_to_end(host)
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+        return public
+
+url_checker = UrlChecker()
+
+# ---------- Pinned resolution for fetches ----------
+
+_real_getaddrinfo = socket.getaddrinfo
+_pins = threading.local()
+_install_lock = threading.Lock()
+
+def _guarded_getaddrinfo(host: Any, port: Any, *args: Any, **kwargs: Any) -> List[tuple]:
+    pins: Optional[Dict[str, Tuple[str, ...]]] = getattr(_pins, "hosts", None)
+    if pins is None:
+        return _real_getaddrinfo(host, port, *args, **kwargs)
+
+    name = host.decode("idna") if isinstance(host, bytes) else (host or "")
+    pinned = pins.get(_host_key(name))
+    if pinned is not None:
+        # literal addresses: getaddrinfo only builds the tuples (and filters by family)
+        results: List[tuple] = []
+        for address in pinned:
+            try:
+                results.extend(_real_getaddrinfo(address, port, *args, **kwargs))
+            except socket.gaierror:
+                continue
+        if not results:
+            raise socket.gaierror(socket.EAI_NONAME, f"No checked address of {name} fits this connection")
+        return results
+
+    results = _real_getaddrinfo(host, port, *args, **kwargs)
+    if not all(is_public_address(info[4][0]) for info in results):
+        raise socket.gaierror(socket.EAI_NONAME, f"{name} resolves to a non-public address")
+    return results
+
+def _install() -> None:
+    with _install_lock:
+        if socket.getaddrinfo is not _guarded_getaddrinfo:
+            socket.getaddrinfo = _guarded_getaddrinfo
+
+@contextmanager
+def pinned_dns(pins: Dict[str, Sequence[str]]) -> Iterator[None]:
+    """Within this block (and this thread) the given hosts resolve to their
+    checked addresses and any other host only to public ones."""
+    _install()
+    previous = getattr(_pins, "hosts", None)
+    _pins.hosts = {**(previous or {}), **{_host_key(h): tuple(a) for h, a in pins.items()}}
+    try:
+        yield
+    finally:
+        _pins.hosts = previous
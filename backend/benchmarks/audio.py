@@ -0,0 +1,82 @@
+"""
+Transcription audio: legacy 16 kHz WAV vs silence-trimmed Opus.
+
+    cd backend
+    python benchmarks/audio.py --minutes 1 5 10
+
+Generates synthetic narration (tone + noise "speech" for 7s of every 10s, with
+3s of silence before and 5s after) and runs both the old WAV extraction and
+extract_audio() on it. Reports the upload size, the seconds of audio the
+transcription model has to process and the ffmpeg time. Needs ffmpeg on PATH.
+"""
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.pipeline import extract_audio  # noqa: E402
+
+def synthetic_narration(path: Path, seconds: int) -> None:
+    speech = "(0.3*sin(2*PI*220*t)*(0.6+0.4*sin(2*PI*3*t))+0.05*(random(0)-0.5))"
+    talking = f"gte(t,3)*lt(t,{seconds - 5})*lt(mod(t-3,10),7)"
+    subprocess.run([
+        "ffmpeg", "-y", "-loglevel", "error",
+        "-f", "lavfi", "-i", f"aevalsrc=exprs='{speech}*{talking}':s=44100:d={seconds}",
+        "-c:a", "aac", "-b:a", "128k",
+        str(path),
+    ], check=True)
+
+def legacy_wav(src: Path, out: Path) -> None:
+    subprocess.run(
+        ["ffmpeg", "-y", "-loglevel", "error", "-i", str(src), "-vn", "-ac", "1", "-ar", "16000", str(out)],
+        check=True,
+    )
+
+def audio_seconds(path: Path) -> float:
+    res = subprocess.run(["ffmpeg", "-i", str(path), "-f", "null", "-"], capture_output=True, text=True)
+    # last progress line: time=HH:MM:SS.xx
+    h, m, s = res.stderr.rsplit("time=", 1)[1].split()[0].split(":")
+    return int(h) * 3600 + int(m) * 60 + float(s)
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--minutes", type=float, nargs="+", default=[1, 5, 10])
+    args = parser.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as td:
+        for minutes in args.minutes:
+            src = Path(td) / f"narration_{minutes}.m4a"
+            synthetic_narration(src, int(minutes * 60))
+
+            wav = Path(td) / "audio.wav"
+            start = time.perf_counter()
+            legacy_wav(src, wav)
+            wav_s = time.perf_counter() - start
+
+            ogg = Path(td) / "audio.ogg"
+            start = time.perf_counter()
+            segments = extract_audio(str(src), str(ogg))
+            ogg_s = time.perf_counter() - start
+
+            results[f"{minutes:g}min"] = {
+                "wav": {"bytes": wav.stat().st_size, "audio_s": audio_seconds(wav), "ffmpeg_s": wav_s},
+                "opus_trimmed": {
+                    "bytes": ogg.stat().st_size,
+                    "audio_s": audio_seconds(ogg),
+                    "ffmpeg_s": ogg_s,
+                    "segments": len(segments),
+                },
+                "size_ratio": wav.stat().st_size / ogg.stat().st_size,
+            }
+            print(f"{minutes:g}min: {json.dumps(results[f'{minutes:g}min'])}", file=sys.stderr)
+
+    print(json.dumps({"benchmark": "audio", "results": results}, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Cold-start benchmark: time from a fresh interpreter to the first /health response.
+
+    cd backend
+    python benchmarks/cold_start.py --runs 10
+    python benchmarks/cold_start.py --importtime > importtime.txt   # per-module import profile
+
+Each run starts a new Python process, imports app.main and serves one /health
+request through the ASGI app. Prints a JSON summary.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+CHILD = r"""
+import json, time
+t0 = time.perf_counter()
+from app.main import cookApp
+t1 = time.perf_counter()
+from fastapi.testclient import TestClient
+client = TestClient(cookApp)
+t2 = time.perf_counter()
+assert client.get("/health").status_code == 200
+t3 = time.perf_counter()
+print(json.dumps({"import_s": t1 - t0, "first_health_s": t3 - t2, "total_s": t3 - t0}))
+"""
+
+def _child_env() -> dict:
+    env = dict(os.environ)
+    # Clients are lazy, so placeholders are enough to serve /health
+    env.setdefault("SUPABASE_URL", "http://127.0.0.1:54321")
+    env.setdefault("SUPABASE_SERVICE_ROLE", "eyJhbGciOiJIUzI1NiJ9.eyJyb2xlIjoiYmVuY2gifQ.YmVuY2g")
+    env.setdefault("OPENAI_API_KEY", "bench")
+    env["PYTHONPATH"] = str(BACKEND_DIR)
+    return env
+
+def run_once() -> dict:
+    out = subprocess.run(
+        [sys.executable, "-c", CHILD],
+        cwd=BACKEND_DIR, env=_child_env(), capture_output=True, text=True, check=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--importtime", action="store_true", help="dump python -X importtime for app.main")
+    args = parser.parse_args()
+
+    if args.importtime:
+        res = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", "import app.main"],
+            cwd=BACKEND_DIR, env=_child_env(), capture_output=True, text=True,
+        )
+        sys.stdout.write(res.stderr)
+        return
+
+    runs = [run_once() for _ in range(args.runs)]
+    summary = {
+        "benchmark": "cold_start",
+        "runs": args.runs,
+        **{
+            key: {
+                "median": statistics.median(r[key] for r in runs),
+                "min": min(r[key] for r in runs),
+                "max": max(r[key] for r in runs),
+            }
+            for key in ("import_s", "first_health_s", "total_s")
+        },
+    }
+    print(json.dumps(summary, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,441 @@
+"""
+In-process stand-ins for OpenAI, Supabase/PostgREST and DNS used by the benchmarks.
+
+The fakes sleep for a configurable latency per call so round-trip counts show
+up in the numbers the same way they do against the real services.
+"""
+import asyncio
+import copy
+import json
+import os
+import re
+import socket
+import time
+import zlib
+import itertools
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+# ---------- OpenAI ----------
+
+def _usage(input_tokens: int, output_tokens: int, cached_tokens: int = 0) -> SimpleNamespace:
+    return SimpleNamespace(
+        input_tokens=input_tokens,
+        output_tokens=output_tokens,
+        input_tokens_details=SimpleNamespace(cached_tokens=min(cached_tokens, input_tokens)),
+    )
+
+def _estimate_tokens(payload: Any) -> int:
+    # ~4 chars per token; images count as a fixed block like the real API
+    # (not as the characters of their base64 data URLs)
+    text = json.dumps(payload, default=str)
+    images = text.count("input_image")
+    text = re.sub(r"data:image/[a-z]+;base64,[A-Za-z0-9+/=]+", "", text)
+    return len(text) // 4 + images * 255
+
+FAKE_RAW_EXTRACTION = {
+    "raw_ingredients": [
+        {"name": "cocoa powder", "quantity_text": "1/2 cup", "source": "spoken"},
+        {"name": "all-purpose flour", "quantity_text": "1 cup", "source": "assumed"},
+        {"name": "sugar", "quantity_text": "1 cup", "source": "spoken"},
+        {"name": "vegetable oil", "quantity_text": "1/2 cup", "source": "spoken"},
+        {"name": "walnuts", "quantity_text": None, "source": "visual"},
+    ],
+    "raw_steps": [
+        "Preheat the oven to 350F.",
+        "Whisk the dry ingredients.",
+        "Stir in the oil and fold in the walnuts.",
+        "Bake for 25 minutes, cool and slice.",
+    ],
+    "oven_temp": "350F",
+    "bake_time": "25 min",
+    "pan_size": "8x8",
+    "servings_hint": None,
+}
+
+FAKE_AUDIT = {"missing_ingredients": ["baking powder", "salt"]}
+
+FAKE_RECIPE_DRAFT = {
+    "title": "Vegan Walnut Brownies",
+    "caption": "Fudgy one-bowl brownies",
+    "description": None,
+    "servings": 9,
+    "prep_time": "10 min",
+    "cook_time": "25 min",
+    "difficulty": "Easy",
+    "tags": ["Vegan", "Dessert"],
+    "ingredients": [
+        {"name": name, "ingredient_id": None, "quantity": 1.0, "unit": "cup", "notes": None}
+        for name in ["cocoa powder", "all-purpose flour", "sugar", "vegetable oil", "walnuts", "baking powder", "salt"]
+    ],
+    "steps": [{"position": i + 1, "body": body} for i, body in enumerate(FAKE_RAW_EXTRACTION["raw_steps"])],
+}
+
+class PromptCache:
+    """Provider-style prefix cache: a prompt of 1024+ tokens reuses the longest
+    prefix it shares with a recent prompt, in 128-token steps."""
+
+    def __init__(self, size: int = 32):
+        self.size = size
+        self.seen: List[str] = []
+
+    def cached_tokens(self, prompt: str) -> int:
+        shared = max((len(os.path.commonprefix([prev, prompt])) for prev in self.seen), default=0)
+        self.seen = (self.seen + [prompt])[-self.size:]
+        tokens = shared // 4
+        return 0 if tokens < 1024 else tokens // 128 * 128
+
+_RESPONSES_BY_FORMAT = {
+    "raw_extraction": FAKE_RAW_EXTRACTION,
+    "audit_result": FAKE_AUDIT,
+    "recipe_draft": FAKE_RECIPE_DRAFT,
+}
+
+class _FakeResponses:
+    def __init__(self, owner: "FakeOpenAI"):
+        self._owner = owner
+
+    def create(self, **kwargs: Any) -> Any:
+        self._owner.calls.append(("responses", kwargs.get("text", {}).get("format", {}).get("name")))
+        time.sleep(self._owner.latency_s)
+        fmt = kwargs.get("text", {}).get("format", {}).get("name")
+        body = _RESPONSES_BY_FORMAT.get(fmt, {})
+        if fmt == "raw_extraction":
+            # different videos give different quantities, so later passes see different lists
+            body = copy.deepcopy(body)
+            body["raw_ingredients"][0]["quantity_text"] = f"{zlib.crc32(json.dumps(kwargs.get('input')).encode()) % 8 + 1}/4 cup"
+        output_text = json.dumps(body)
+        # the response format is part of the cached prefix, ahead of the input
+        prompt = json.dumps([kwargs.get("text"), kwargs.get("input")], default=str)
+        usage = _usage(
+            _estimate_tokens(kwargs.get("input")),
+            len(output_text) // 4,
+            self._owner.prompt_cache.cached_tokens(prompt),
+        )
+        if kwargs.get("stream"):
+            return self._stream(output_text, usage)
+        time.sleep(self._owner.generation_s(output_text))
+        return SimpleNamespace(output_text=output_text, usage=usage)
+
+    def _stream(self, output_text: str, usage: SimpleNamespace) -> Iterator[SimpleNamespace]:
+        # ~4 tokens per delta event, paced at the owner's output rate
+        for i in range(0, len(output_text), 16):
+            delta = output_text[i:i + 16]
+            time.sleep(self._owner.generation_s(delta))
+            yield SimpleNamespace(type="response.output_text.delta", delta=delta)
+        yield SimpleNamespace(type="response.completed", response=SimpleNamespace(usage=usage))
+
+class _FakeTranscriptions:
+    def __init__(self, owner: "FakeOpenAI"):
+        self._owner = owner
+
+    def create(self, model: str, file: Any, **kwargs: Any) -> SimpleNamespace:
+        size = len(file.read())
+        self._owner.calls.append(("transcriptions", size))
+        # upload cost scales with the audio size
+        time.sleep(self._owner.latency_s + size / self._owner.upload_bytes_per_s)
+        return SimpleNamespace(text="Today we're making fudgy vegan brownies with walnuts and cocoa.")
+
+class _FakeChatCompletions:
+    def __init__(self, owner: "FakeOpenAI"):
+        self._owner = owner
+        self.recipe_ids: List[int] = []
+
+    def create(self, **kwargs: Any) -> SimpleNamespace:
+        self._owner.calls.append(("chat", None))
+        time.sleep(self._owner.latency_s)
+        ids = self.recipe_ids or [1]
+        suggestions = [
+            {"date": f"2026-01-0{1 + d}", "meal": meal, "recipe_id": ids[(d * 3 + m) % len(ids)], "reason": "bench"}
+            for d in range(7)
+            for m, meal in enumerate(["breakfast", "lunch", "dinner"])
+        ]
+        content = json.dumps({"suggestions": suggestions, "shared_ingredients": ["sugar"], "efficiency_score": 0.7})
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+            usage=SimpleNamespace(
+                prompt_tokens=_estimate_tokens(kwargs.get("messages")),
+                completion_tokens=len(content) // 4,
+                prompt_tokens_details=SimpleNamespace(cached_tokens=0),
+            ),
+        )
+
+class FakeOpenAI:
+    """Responses (optionally streamed), transcription and chat completions with
+    fixed per-call latency and, if set, a per-token output rate."""
+
+    def __init__(self, latency_s: float = 0.0, upload_bytes_per_s: float = 5_000_000, tokens_per_s: float = 0.0):
+        self.latency_s = latency_s
+        self.upload_bytes_per_s = upload_bytes_per_s
+        self.tokens_per_s = tokens_per_s
+        self.calls: List[tuple] = []
+        self.prompt_cache = PromptCache()
+        self.responses = _FakeResponses(self)
+        self.audio = SimpleNamespace(transcriptions=_FakeTranscriptions(self))
+        self.chat = SimpleNamespace(completions=_FakeChatCompletions(self))
+
+    def generation_s(self, text: str) -> float:
+        return len(text) / 4 / self.tokens_per_s if self.tokens_per_s else 0.0
+
+# ---------- Supabase / PostgREST ----------
+
+class _Query:
+    def __init__(self, db: "FakeSupabase", table: str):
+        self._db = db
+        self._table = table
+        self._op = "select"
+        self._columns: Optional[List[str]] = None
+        self._filters: List[Callable[[dict], bool]] = []
+        # first eq/in_ filter is answered from a hash index, like a real DB would
+        self._indexed: Optional[tuple] = None
+        self._order: List[tuple] = []
+        self._limit: Optional[int] = None
+        self._single = False
+        self._payload: Any = None
+
+    # query building
+    def select(self, columns: str = "*", **kwargs: Any) -> "_Query":
+        if self._op == "select":
+            cols = [c.strip() for c in columns.split(",") if c.strip()]
+            # embedded resources (`ingredient:ingredients(...)`) are not modelled
+            cols = [c for c in cols if "(" not in c]
+            self._columns = None if cols == ["*"] else cols
+        return self
+
+    def insert(self, payload: Any, **kwargs: Any) -> "_Query":
+        self._op, self._payload = "insert", payload
+        return self
+
+    def update(self, patch: dict, **kwargs: Any) -> "_Query":
+        self._op, self._payload = "update", patch
+        return self
+
+    def delete(self, **kwargs: Any) -> "_Query":
+        self._op = "delete"
+        return self
+
+    def eq(self, col: str, value: Any) -> "_Query":
+        if self._indexed is None:
+            self._indexed = (col, [value])
+        self._filters.append(lambda r: r.get(col) == value)
+        return self
+
+    def in_(self, col: str, values: List[Any]) -> "_Query":
+        allowed = set(values)
+        if self._indexed is None:
+            self._indexed = (col, list(allowed))
+        self._filters.append(lambda r: r.get(col) in allowed)
+        return self
+
+    def gte(self, col: str, value: Any) -> "_Query":
+        self._filters.append(lambda r: r.get(col) is not None and r.get(col) >= value)
+        return self
+
+    def lte(self, col: str, value: Any) -> "_Query":
+        self._filters.append(lambda r: r.get(col) is not None and r.get(col) <= value)
+        return self
+
+    def not_(self, col: str, op: str, value: Any) -> "_Query":
+        if op == "is" and value is None:
+            self._filters.append(lambda r: r.get(col) is not None)
+        else:
+            raise NotImplementedError(f"not_.{op}")
+        return self
+
+    def order(self, col: str, desc: bool = False, **kwargs: Any) -> "_Query":
+        self._order.append((col, desc))
+        return self
+
+    def limit(self, n: int) -> "_Query":
+        self._limit = n
+        return self
+
+    def single(self) -> "_Query":
+        self._single = True
+        return self
+
+    def maybe_single(self) -> "_Query":
+        return self.single()
+
+    # execution
+    def _matching(self) -> List[dict]:
+        if self._indexed is not None:
+            col, values = self._indexed
+            index = self._db.index(self._table, col)
+            candidates = [r for v in values for r in index.get(v, [])]
+        else:
+            candidates = self._db.tables.setdefault(self._table, [])
+        return [r for r in candidates if all(f(r) for f in self._filters)]
+
+    def execute(self) -> SimpleNamespace:
+        self._db.queries += 1
+        time.sleep(self._db.latency_s)
+        rows = self._db.tables.setdefault(self._table, [])
+
+        if self._op != "select":
+            self._db.invalidate(self._table)
+
+        if self._op == "insert":
+            items = self._payload if isinstance(self._payload, list) else [self._payload]
+            created = []
+            for item in items:
+                row = {"id": next(self._db.ids), "created_at": "2026-01-01T00:00:00+00:00", **item}
+                if self._table == "ingredients":
+                    row.setdefault("norm_name", " ".join(row["name"].strip().lower().split()))
+                rows.append(row)
+                created.append(copy.deepcopy(row))
+            return SimpleNamespace(data=created)
+
+        matching = self._matching()
+        if self._op == "update":
+            for r in matching:
+                r.update(self._payload)
+            return SimpleNamespace(data=copy.deepcopy(matching))
+        if self._op == "delete":
+            ids = {id(r) for r in matching}
+            self._db.tables[self._table] = [r for r in rows if id(r) not in ids]
+            return SimpleNamespace(data=copy.deepcopy(matching))
+
+        for col, desc in reversed(self._order):
+            matching.sort(key=lambda r: (r.get(col) is None, r.get(col)), reverse=desc)
+        if self._limit is not None:
+            matching = matching[: self._limit]
+        if self._columns is not None:
+            matching = [{c: r.get(c) for c in self._columns} for r in matching]
+        else:
+            matching = [dict(r) for r in matching]
+        if self._single:
+            return SimpleNamespace(data=matching[0] if matching else None)
+        return SimpleNamespace(data=matching)
+
+class _RpcCall:
+    def __init__(self, db: "FakeSupabase", fn: Callable[[dict], Any], params: dict):
+        self._db, self._fn, self._params = db, fn, params
+
+    def execute(self) -> SimpleNamespace:
+        self._db.queries += 1
+        time.sleep(self._db.latency_s)
+        return SimpleNamespace(data=self._fn(self._params))
+
+class _FakeBucket:
+    def __init__(self, db: "FakeSupabase", name: str):
+        self._db, self._name = db, name
+
+    def upload(self, path: str, file: bytes, file_options: Optional[dict] = None) -> SimpleNamespace:
+        self._db.queries += 1
+        time.sleep(self._db.latency_s)
+        self._db.objects[f"{self._name}/{path}"] = bytes(file)
+        self._db.object_times[f"{self._name}/{path}"] = time.time()
+        return SimpleNamespace(path=path)
+
+    def move(self, from_path: str, to_path: str) -> dict:
+        self._db.queries += 1
+        time.sleep(self._db.latency_s)
+        src, dst = f"{self._name}/{from_path}", f"{self._name}/{to_path}"
+        if src not in self._db.objects:
+            raise RuntimeError(f"Object not found: {from_path}")
+        self._db.objects[dst] = self._db.objects.pop(src)
+        self._db.object_times[dst] = self._db.object_times.pop(src)
+        return {"message": "Successfully moved"}
+
+    def list(self, path: str = "", options: Optional[dict] = None) -> List[dict]:
+        """One level of the folder tree, like Storage: files carry created_at, folders do not."""
+        self._db.queries += 1
+        time.sleep(self._db.latency_s)
+        prefix = f"{self._name}/{path.strip('/')}/" if path.strip("/") else f"{self._name}/"
+        entries: Dict[str, dict] = {}
+        for key in sorted(self._db.objects):
+            if not key.startswith(prefix):
+                continue
+            name, _, rest = key[len(prefix):].partition("/")
+            if rest:
+                entries.setdefault(name, {"name": name, "id": None})
+            else:
+                created = datetime.fromtimestamp(self._db.object_times[key], timezone.utc).isoformat()
+                entries[name] = {"name": name, "id": key, "created_at": created}
+        options = options or {}
+        offset = options.get("offset", 0)
+        return list(entries.values())[offset:offset + options.get("limit", 100)]
+
+    def remove(self, paths: List[str]) -> List[dict]:
+        self._db.queries += 1
+        time.sleep(self._db.latency_s)
+        removed = []
+        for path in paths:
+            key = f"{self._name}/{path}"
+            if self._db.objects.pop(key, None) is not None:
+                self._db.object_times.pop(key, None)
+                removed.append({"name": path})
+        return removed
+
+class _FakeStorage:
+    def __init__(self, db: "FakeSupabase"):
+        self._db = db
+
+    def from_(self, bucket: str) -> _FakeBucket:
+        return _FakeBucket(self._db, bucket)
+
+class FakeSupabase:
+    """Enough of the supabase-py query builder for the backend's call sites."""
+
+    def __init__(self, latency_s: float = 0.0):
+        self.latency_s = latency_s
+        self.tables: Dict[str, List[dict]] = {}
+        self.rpcs: Dict[str, Callable[[dict], Any]] = {}
+        self.objects: Dict[str, bytes] = {}  # storage, by "bucket/path"
+        self.object_times: Dict[str, float] = {}  # upload time, for list()
+        self.storage = _FakeStorage(self)
+        self.ids = itertools.count(10_000_000)
+        self.queries = 0
+        self._indexes: Dict[tuple, tuple] = {}
+
+    def index(self, table: str, col: str) -> Dict[Any, List[dict]]:
+        rows = self.tables.setdefault(table, [])
+        cached = self._indexes.get((table, col))
+        # tables may also be replaced wholesale by the seeding helpers
+        if cached is None or cached[0] is not rows or cached[1] != len(rows):
+            index: Dict[Any, List[dict]] = {}
+            for r in rows:
+                index.setdefault(r.get(col), []).append(r)
+            cached = self._indexes[(table, col)] = (rows, len(rows), index)
+        return cached[2]
+
+    def invalidate(self, table: str) -> None:
+        for key in [k for k in self._indexes if k[0] == table]:
+            del self._indexes[key]
+
+    def table(self, name: str) -> _Query:
+        # the stats view reads the same rows as recipes here
+        if name == "public_recipes_with_stats":
+            name = "recipes"
+        return _Query(self, name)
+
+    def rpc(self, name: str, params: Optional[dict] = None) -> _RpcCall:
+        if name not in self.rpcs:
+            raise NotImplementedError(f"rpc {name}")
+        return _RpcCall(self, self.rpcs[name], params or {})
+
+# ---------- DNS ----------
+
+class FakeResolver:
+    """Async resolver for url_safety.UrlChecker: answers from records, host ->
+    [address] or a list of answers returned in turn (the last one repeats), so
+    a host can change its answer between lookups like a rebinding attack."""
+
+    def __init__(self, records: Dict[str, Any], latency_s: float = 0.0):
+        self.records = records
+        self.latency_s = latency_s
+        self.lookups = 0
+        self._answered: Dict[str, int] = {}
+
+    async def __call__(self, host: str) -> List[str]:
+        self.lookups += 1
+        await asyncio.sleep(self.latency_s)
+        answers = self.records.get(host)
+        if not answers:
+            raise socket.gaierror(socket.EAI_NONAME, f"Unknown host {host}")
+        if isinstance(answers[0], str):
+            return list(answers)
+        n = self._answered[host] = self._answered.get(host, 0) + 1
+        return list(answers[min(n, len(answers)) - 1])
@@ -0,0 +1,131 @@
+"""
+OpenAI calls under a provider rate limit, with and without the scheduler.
+
+    cd backend
+    python benchmarks/openai_scheduler.py --calls 300 --threads 40 --rps 20
+
+A fake endpoint admits --rps requests per second (token bucket, one second of
+burst) and answers the rest with 429 + retry-after-ms, like the real API.
+
+  * unscheduled  every thread calls directly and retries 429s after
+                 retry-after, up to 2 times (the SDK's old default)
+  * scheduled    calls go through OpenAIScheduler with the same budget;
+                 a quarter of them are interactive, the rest batch
+
+Reports completed and failed calls, 429s seen, throughput and, for the
+scheduled run, queue wait by priority.
+"""
+import argparse
+import json
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from types import SimpleNamespace
+
+import httpx
+import openai
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.openai_scheduler import BATCH, INTERACTIVE, OpenAIScheduler  # noqa: E402
+
+MODEL = "bench-model"
+
+class RateLimitedEndpoint:
+    def __init__(self, rps: float, latency_s: float):
+        self.rps = rps
+        self.latency_s = latency_s
+        self.level = rps
+        self.updated = time.monotonic()
+        self.throttled = 0
+        self._lock = threading.Lock()
+
+    def create(self) -> SimpleNamespace:
+        with self._lock:
+            now = time.monotonic()
+            self.level = min(self.rps, self.level + (now - self.updated) * self.rps)
+            self.updated = now
+            if self.level < 1:
+                self.throttled += 1
+                wait_ms = (1 - self.level) / self.rps * 1000
+                response = httpx.Response(
+                    429,
+                    headers={"retry-after-ms": f"{wait_ms:.0f}"},
+                    request=httpx.Request("POST", "https://api.openai.com/v1/responses"),
+                )
+                raise openai.RateLimitError("Rate limit reached", response=response, body=None)
+            self.level -= 1
+        time.sleep(self.latency_s)
+        return SimpleNamespace(usage=SimpleNamespace(total_tokens=100))
+
+def _unscheduled(endpoint: RateLimitedEndpoint, retries: int = 2) -> None:
+    for attempt in range(retries + 1):
+        try:
+            endpoint.create()
+            return
+        except openai.RateLimitError as e:
+            if attempt == retries:
+                raise
+            time.sleep(float(e.response.headers["retry-after-ms"]) / 1000)
+
+def _run(calls: int, threads: int, fn) -> dict:
+    failed = 0
+    lock = threading.Lock()
+
+    def one(i: int) -> None:
+        nonlocal failed
+        try:
+            fn(i)
+        except Exception:
+            with lock:
+                failed += 1
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(one, range(calls)))
+    elapsed = time.perf_counter() - start
+    return {"completed": calls - failed, "failed": failed, "elapsed_s": elapsed, "completed_per_s": (calls - failed) / elapsed}
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=300)
+    parser.add_argument("--threads", type=int, default=40)
+    parser.add_argument("--rps", type=float, default=20.0)
+    parser.add_argument("--latency-ms", type=float, default=200.0)
+    args = parser.parse_args()
+    latency_s = args.latency_ms / 1000
+
+    endpoint = RateLimitedEndpoint(args.rps, latency_s)
+    unscheduled = _run(args.calls, args.threads, lambda i: _unscheduled(endpoint))
+    unscheduled["throttled_429"] = endpoint.throttled
+
+    endpoint = RateLimitedEndpoint(args.rps, latency_s)
+    scheduler = OpenAIScheduler(limits={MODEL: (args.rps * 60, 1e9)}, burst_s=1.0, queue_timeout_s=600)
+    waits = {INTERACTIVE: [], BATCH: []}
+
+    def scheduled(i: int) -> None:
+        priority = INTERACTIVE if i % 4 == 0 else BATCH
+        queued = time.perf_counter()
+        scheduler.call(MODEL, endpoint.create, tokens=100, priority=priority)
+        waits[priority].append(time.perf_counter() - queued - latency_s)
+
+    scheduled_result = _run(args.calls, args.threads, scheduled)
+    scheduled_result["throttled_429"] = endpoint.throttled
+    scheduled_result["median_wait_s"] = {
+        "interactive": statistics.median(waits[INTERACTIVE]),
+        "batch": statistics.median(waits[BATCH]),
+    }
+
+    print(json.dumps({
+        "benchmark": "openai_scheduler",
+        "calls": args.calls,
+        "threads": args.threads,
+        "provider_rps": args.rps,
+        "results": {"unscheduled": unscheduled, "scheduled": scheduled_result},
+    }, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,398 @@
+"""
+Offline benchmark suite for the import, ingredient and meal-plan paths.
+
+Runs the real FastAPI app against in-process fakes for OpenAI and
+Supabase/PostgREST (see fakes.py), so it needs no network or credentials.
+
+    cd backend
+    python benchmarks/run.py --out bench.json
+    python benchmarks/run.py --only smart_meal_plan_1000 --supabase-latency-ms 5
+    python benchmarks/run.py --compare bench.json      # diff against an earlier run
+
+/video-import needs ffmpeg on PATH (synthetic videos are generated with it);
+it is reported as skipped otherwise.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import httpx
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from fakes import FakeOpenAI, FakeSupabase  # noqa: E402
+
+BENCH_USER = "00000000-0000-0000-0000-000000000001"
+
+# ---------- Synthetic data ----------
+
+def seed_ingredients(db: FakeSupabase, n: int) -> None:
+    db.tables["ingredients"] = [
+        {"id": i, "name": f"Ingredient {i}", "norm_name": f"ingredient {i}", "emoji": None}
+        for i in range(1, n + 1)
+    ]
+    # a few real names so imports match existing rows
+    for i, name in enumerate(["cocoa powder", "sugar", "vegetable oil", "walnuts"], start=1):
+        db.tables["ingredients"][i - 1].update(name=name, norm_name=name)
+
+def seed_recipes(db: FakeSupabase, n: int, ingredients_per_recipe: int = 8, n_ingredients: int = 5000) -> None:
+    tags = ["Vegan", "Quick", "Dessert", "Dinner", "Breakfast", "Healthy"]
+    db.tables["recipes"] = [
+        {
+            "id": i,
+            "title": f"Recipe {i}",
+            "caption": None,
+            "image_url": None,
+            "user_id": BENCH_USER,
+            "tags": [tags[i % len(tags)]],
+            "difficulty": ["Easy", "Medium", "Hard"][i % 3],
+            "prep_time": "10 min",
+            "cook_time": "20 min",
+            "created_at": f"2026-01-01T00:{i // 60 % 60:02d}:{i % 60:02d}+00:00",
+        }
+        for i in range(1, n + 1)
+    ]
+    db.tables["recipe_ingredients"] = [
+        {"recipe_id": r, "ingredient_id": 1 + (r * 7 + k * 13) % n_ingredients, "quantity": 1.5, "unit": "cup", "unit_code": "cup"}
+        for r in range(1, n + 1)
+        for k in range(ingredients_per_recipe)
+    ]
+    db.tables["user_added_recipes"] = []
+    db.tables["meal_plans"] = [
+        {"user_id": BENCH_USER, "recipe_id": 1 + i % n, "plan_date": "2025-12-01", "meal": "dinner", "created_at": "2025-12-01"}
+        for i in range(100)
+    ]
+
+def synthetic_transcript(i: int) -> str:
+    """A different ~1 minute narration per video."""
+    lines = [
+        f"Hey everyone, welcome back, today is recipe number {i}.",
+        f"Start with {i % 3 + 1} cups of flour and half a cup of cocoa powder in a big bowl.",
+        "Whisk in the sugar, a pinch of salt and a teaspoon of baking powder.",
+        f"Now pour in {i % 4 + 2} tablespoons of oil and about a cup of oat milk and stir until smooth.",
+        "Fold in the chopped walnuts, spread it into the pan and bake at 350 for 25 minutes.",
+        "Let them cool completely before slicing, and that's it, enjoy.",
+    ]
+    return " ".join(lines * 3)
+
+def synthetic_video(path: Path, seconds: int) -> None:
+    """Colour bars with a tone, 360p, like a downscaled phone recording."""
+    subprocess.run([
+        "ffmpeg", "-y", "-loglevel", "error",
+        "-f", "lavfi", "-i", f"testsrc2=size=640x360:rate=30:duration={seconds}",
+        "-f", "lavfi", "-i", f"sine=frequency=440:duration={seconds}",
+        "-c:v", "libx264", "-preset", "ultrafast", "-c:a", "aac", "-shortest",
+        str(path),
+    ], check=True)
+
+# ---------- Harness ----------
+
+class Bench:
+    def __init__(self, args: argparse.Namespace):
+        self.args = args
+        self.db = FakeSupabase(latency_s=args.supabase_latency_ms / 1000)
+        self.ai = FakeOpenAI(latency_s=args.openai_latency_ms / 1000, tokens_per_s=args.openai_tokens_per_s)
+
+        from app.clients import supabase, openai_client
+        from app.executor import InlineExecutor, set_executor
+
+        supabase.set(self.db)
+        openai_client.set(self.ai)
+        # fakes live in this process, so stages must too
+        set_executor(InlineExecutor())
+
+        from fastapi.testclient import TestClient
+        import app.main as main
+
+        self.main = main
+        self.client = TestClient(main.cookApp)
+
+    def live_server(self) -> str:
+        """Serve the app with uvicorn in a background thread (once) and return its URL."""
+        if getattr(self, "_live_url", None):
+            return self._live_url
+        import socket
+        import threading
+        import uvicorn
+
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            port = sock.getsockname()[1]
+        server = uvicorn.Server(uvicorn.Config(self.main.cookApp, host="127.0.0.1", port=port, log_level="warning"))
+        threading.Thread(target=server.run, daemon=True).start()
+        while not server.started:
+            time.sleep(0.01)
+        self._live_url = f"http://127.0.0.1:{port}"
+        return self._live_url
+
+    def timed(self, fn: Callable[[], None], runs: int, setup: Optional[Callable[[], None]] = None) -> dict:
+        samples: List[float] = []
+        queries: List[int] = []
+        for _ in range(runs):
+            if setup:
+                setup()
+            before = self.db.queries
+            start = time.perf_counter()
+            fn()
+            samples.append(time.perf_counter() - start)
+            queries.append(self.db.queries - before)
+        samples.sort()
+        return {
+            "runs": runs,
+            "median_s": statistics.median(samples),
+            "p95_s": samples[min(len(samples) - 1, int(round(0.95 * (len(samples) - 1))))],
+            "min_s": samples[0],
+            "supabase_queries": statistics.median(queries),
+        }
+
+    # ----- benchmarks -----
+
+    def bench_video_import(self) -> dict:
+        if not shutil.which("ffmpeg"):
+            return {"skipped": "ffmpeg not found"}
+        seed_ingredients(self.db, 10_000)
+        with tempfile.TemporaryDirectory() as td:
+            video = Path(td) / "synthetic.mp4"
+            synthetic_video(video, self.args.video_seconds)
+            data = video.read_bytes()
+
+            drafts: List[dict] = []
+
+            def run():
+                res = self.client.post("/video-import", files={"video": ("synthetic.mp4", data, "video/mp4")})
+                assert res.status_code == 200, res.text
+                drafts.append(res.json())
+
+            result = self.timed(run, self.args.runs)
+        result["video_seconds"] = self.args.video_seconds
+        result["video_bytes"] = len(data)
+        cover = drafts[-1]["cover"]
+        assert cover, "no cover suggested"
+        result["cover_bytes"] = {
+            str(v["width"]): len(self.db.objects[f"recipe-media/{v['path']}"]) for v in cover["variants"]
+        }
+        return result
+
+    def bench_video_import_stream(self) -> dict:
+        """/video-import/stream: time to the status, first field, first ingredient and done events."""
+        if not shutil.which("ffmpeg"):
+            return {"skipped": "ffmpeg not found"}
+        seed_ingredients(self.db, 10_000)
+        marks: Dict[str, List[float]] = {}
+        with tempfile.TemporaryDirectory() as td:
+            video = Path(td) / "synthetic.mp4"
+            synthetic_video(video, self.args.video_seconds)
+            data = video.read_bytes()
+
+            # TestClient buffers whole responses, so stream from a real server
+            base_url = self.live_server()
+            for _ in range(self.args.runs):
+                seen: Dict[str, float] = {}
+                start = time.perf_counter()
+                files = {"video": ("synthetic.mp4", data, "video/mp4")}
+                with httpx.stream("POST", f"{base_url}/video-import/stream", files=files, timeout=600) as res:
+                    assert res.status_code == 200, res.read()
+                    for line in res.iter_lines():
+                        event = json.loads(line)
+                        assert event["event"] != "error", event
+                        key = "structuring" if event.get("stage") == "structuring" else event["event"]
+                        seen.setdefault(key, time.perf_counter() - start)
+                for key in ("structuring", "field", "ingredient", "step", "done"):
+                    marks.setdefault(f"first_{key}_s", []).append(seen[key])
+
+        result = {name: statistics.median(values) for name, values in marks.items()}
+        result["video_seconds"] = self.args.video_seconds
+        return result
+
+    def bench_video_import_burst(self) -> dict:
+        """--burst simultaneous /video-import uploads, without limits and with
+        the default admission-control limits."""
+        if not shutil.which("ffmpeg"):
+            return {"skipped": "ffmpeg not found"}
+        from concurrent.futures import ThreadPoolExecutor
+        import app.pipeline as pipeline
+        from app.admission import controller
+        from app.openai_scheduler import OpenAIScheduler
+
+        seed_ingredients(self.db, 10_000)
+        # measure the container, not the OpenAI budget: 16 imports' estimates
+        # exceed the default TPM and would queue in the scheduler either way
+        default_scheduler = pipeline.scheduler
+        pipeline.scheduler = OpenAIScheduler(limits={}, default_limit=(1e6, 1e9))
+        lane = controller.lanes["video_import"]
+        limits = (lane.concurrency, lane.queue)
+        result: Dict[str, dict] = {}
+        with tempfile.TemporaryDirectory() as td:
+            video = Path(td) / "synthetic.mp4"
+            synthetic_video(video, self.args.video_seconds)
+            data = video.read_bytes()
+            url = f"{self.live_server()}/video-import"
+
+            def upload(_: int) -> tuple:
+                start = time.perf_counter()
+                res = httpx.post(url, files={"video": ("synthetic.mp4", data, "video/mp4")}, timeout=600)
+                return res.status_code, time.perf_counter() - start, res.headers.get("retry-after")
+
+            # admission first, so its Retry-After estimate is learned from its own requests
+            for mode, (concurrency, queue) in {"admission": limits, "unlimited": (self.args.burst, self.args.burst)}.items():
+                lane.concurrency, lane.queue = concurrency, queue
+                with ThreadPoolExecutor(max_workers=self.args.burst) as pool:
+                    outcomes = list(pool.map(upload, range(self.args.burst)))
+                ok = sorted(t for status, t, _ in outcomes if status == 200)
+                rejected = sorted(t for status, t, _ in outcomes if status in (429, 503))
+                result[mode] = {
+                    "ok": len(ok),
+                    "rejected": {str(code): sum(1 for status, _, _ in outcomes if status == code) for code in (429, 503)},
+                    "ok_median_s": statistics.median(ok) if ok else None,
+                    "ok_max_s": ok[-1] if ok else None,
+                    "rejected_median_s": statistics.median(rejected) if rejected else None,
+                    "retry_after_s": sorted({int(r) for status, _, r in outcomes if r}),
+                }
+        lane.concurrency, lane.queue = limits
+        pipeline.scheduler = default_scheduler
+        result["burst"] = self.args.burst
+        result["limits"] = {"concurrency": limits[0], "queue": limits[1]}
+        return result
+
+    def bench_llm_passes(self) -> dict:
+        """The three LLM passes over a stream of different transcripts (no frames).
+
+        Reports per-pass latency and the share of input tokens served from the
+        (fake) prompt cache. The first import only warms the cache and is not counted.
+        """
+        from app import pipeline
+        from app.metrics import deferred_spans
+
+        by_pass: Dict[str, List[tuple]] = {}
+        for i in range(self.args.runs + 1):
+            transcript = synthetic_transcript(i)
+            with deferred_spans() as spans:
+                raw = pipeline._extract_raw_recipe_data(transcript, [])
+                pipeline._merge_missing_ingredients(raw, pipeline._audit_missing_ingredients(raw))
+                pipeline._structure_final_recipe(raw, transcript)
+            if i == 0:
+                continue
+            for name, duration, attrs in spans:
+                by_pass.setdefault(name, []).append((duration, attrs))
+
+        return {
+            name: {
+                "median_s": statistics.median(d for d, _ in calls),
+                "input_tokens": statistics.median(a.get("input_tokens", 0) for _, a in calls),
+                "cached_ratio": sum(a.get("cached_tokens", 0) for _, a in calls) / max(1, sum(a.get("input_tokens", 0) for _, a in calls)),
+            }
+            for name, calls in by_pass.items()
+            if name.startswith("llm_")
+        }
+
+    def bench_resolve_ingredient_ids_100k(self) -> dict:
+        draft = {"ingredients": [
+            {"name": name}
+            for name in ["cocoa powder", "sugar", "vegetable oil", "walnuts"] + [f"new thing {i}" for i in range(16)]
+        ]}
+        seed = lambda: seed_ingredients(self.db, 100_000)  # noqa: E731
+        return self.timed(lambda: self.main._resolve_ingredient_ids(json.loads(json.dumps(draft))), self.args.runs, setup=seed)
+
+    def bench_smart_meal_plan_1000(self) -> dict:
+        seed_recipes(self.db, 1000)
+        self.ai.chat.completions.recipe_ids = list(range(1, 1001))
+        body = {"user_id": BENCH_USER, "week_start": "2026-01-05", "existing_plans": []}
+
+        def run():
+            res = self.client.post("/smart-meal-plan", json=body)
+            assert res.status_code == 200, res.text
+
+        return self.timed(run, self.args.runs)
+
+    def bench_list_recipes_10k(self) -> dict:
+        seed_recipes(self.db, 10_000, ingredients_per_recipe=0)
+
+        def run():
+            res = self.client.get("/recipes")
+            assert res.status_code == 200, res.text
+
+        return self.timed(run, self.args.runs)
+
+BENCHMARKS = {
+    "video_import": Bench.bench_video_import,
+    "video_import_stream": Bench.bench_video_import_stream,
+    "video_import_burst": Bench.bench_video_import_burst,
+    "llm_passes": Bench.bench_llm_passes,
+    "resolve_ingredient_ids_100k": Bench.bench_resolve_ingredient_ids_100k,
+    "smart_meal_plan_1000": Bench.bench_smart_meal_plan_1000,
+    "list_recipes_10k": Bench.bench_list_recipes_10k,
+}
+
+def _git_rev() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except Exception:
+        return None
+
+def compare(old: dict, new: dict) -> None:
+    print(f"{'benchmark':32} {'old (s)':>10} {'new (s)':>10} {'change':>8}")
+    for name, res in new["results"].items():
+        prev = old.get("results", {}).get(name, {})
+        if "median_s" not in res or "median_s" not in prev:
+            continue
+        change = (res["median_s"] - prev["median_s"]) / prev["median_s"] * 100 if prev["median_s"] else 0.0
+        print(f"{name:32} {prev['median_s']:10.4f} {res['median_s']:10.4f} {change:+7.1f}%")
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--only", action="append", choices=sorted(BENCHMARKS), help="run a subset (repeatable)")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--supabase-latency-ms", type=float, default=2.0)
+    parser.add_argument("--openai-latency-ms", type=float, default=50.0)
+    parser.add_argument("--openai-tokens-per-s", type=float, default=0.0, help="pace fake output tokens (0: instant)")
+    parser.add_argument("--video-seconds", type=int, default=30)
+    parser.add_argument("--burst", type=int, default=16, help="simultaneous uploads for video_import_burst")
+    parser.add_argument("--out", type=Path, help="write results JSON here")
+    parser.add_argument("--compare", type=Path, help="earlier results JSON to diff against")
+    args = parser.parse_args()
+
+    os.chdir(BACKEND_DIR)
+    bench = Bench(args)
+
+    results: Dict[str, dict] = {}
+    for name in args.only or BENCHMARKS:
+        results[name] = BENCHMARKS[name](bench)
+        print(f"{name}: {json.dumps(results[name])}", file=sys.stderr)
+
+    report = {
+        "commit": _git_rev(),
+        "timestamp": time.time(),
+        "python": platform.python_version(),
+        "config": {
+            "runs": args.runs,
+            "supabase_latency_ms": args.supabase_latency_ms,
+            "openai_latency_ms": args.openai_latency_ms,
+            "openai_tokens_per_s": args.openai_tokens_per_s,
+            "video_seconds": args.video_seconds,
+        },
+        "results": results,
+    }
+
+    if args.out:
+        args.out.write_text(json.dumps(report, indent=2))
+    else:
+        print(json.dumps(report, indent=2))
+
+    if args.compare:
+        compare(json.loads(args.compare.read_text()), report)
+
+if __name__ == "__main__":
+    main()
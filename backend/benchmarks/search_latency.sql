@@ -0,0 +1,73 @@
+-- Search latency on a seeded local database.
+--
+--   createdb flavur_bench
+--   psql flavur_bench -f benchmarks/search_latency.sql
+--
+-- Seeds 200k recipes into a scratch `recipes` table, then compares the old
+-- ILIKE filter with the indexed search_recipes() path, for a common term (one
+-- recipe in seven) and a rare one (one in a thousand). Compare the
+-- "Execution Time" lines of the EXPLAIN ANALYZE output.
+
+\timing on
+
+-- the Supabase roles the migration grants to
+DO $$ BEGIN CREATE ROLE anon; EXCEPTION WHEN duplicate_object THEN NULL; END $$;
+DO $$ BEGIN CREATE ROLE authenticated; EXCEPTION WHEN duplicate_object THEN NULL; END $$;
+
+CREATE TABLE IF NOT EXISTS recipes (
+  id BIGSERIAL PRIMARY KEY,
+  title TEXT,
+  caption TEXT,
+  image_url TEXT,
+  user_id UUID,
+  tags TEXT[],
+  is_public BOOLEAN NOT NULL DEFAULT FALSE,
+  created_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+TRUNCATE recipes;
+
+INSERT INTO recipes (title, caption, user_id, tags, is_public, created_at)
+SELECT
+  CASE
+    -- a rare dish (0.1% of rows), the selective case
+    WHEN g % 1000 = 1 THEN 'Matcha Tiramisu #' || g
+    ELSE
+      (ARRAY['Vegan', 'Fudgy', 'Easy', 'Spicy', 'Creamy', 'Crispy'])[1 + g % 6] || ' ' ||
+      (ARRAY['Brownies', 'Curry', 'Pancakes', 'Tacos', 'Ramen', 'Salad', 'Lasagna'])[1 + (g / 6) % 7] || ' #' || g
+  END,
+  'A ' || (ARRAY['weeknight', 'party', 'meal prep', 'comfort'])[1 + g % 4] || ' recipe with ' ||
+  (ARRAY['tofu', 'chickpeas', 'lentils', 'mushrooms', 'cocoa'])[1 + g % 5],
+  gen_random_uuid(),
+  ARRAY[(ARRAY['Vegan', 'Quick', 'Dessert', 'Dinner', 'Spicy', 'Healthy'])[1 + g % 6]],
+  g % 5 <> 0,  -- one in five private
+  NOW() - (g || ' minutes')::INTERVAL
+FROM generate_series(1, 200000) AS g;
+
+\i supabase_migrations/recipe_search.sql
+ANALYZE recipes;
+
+-- Common term. Baseline: the old get_personalized_feed filter
+EXPLAIN (ANALYZE, BUFFERS)
+SELECT id FROM recipes r
+WHERE (r.title ILIKE '%brownies%' OR r.caption ILIKE '%brownies%')
+  AND r.tags && ARRAY['Vegan'];
+
+-- Indexed full-text search
+EXPLAIN (ANALYZE, BUFFERS)
+SELECT * FROM search_recipes('brownies', ARRAY['Vegan'], 20, FALSE);
+
+-- Typeahead
+EXPLAIN (ANALYZE, BUFFERS)
+SELECT * FROM search_recipes('fudgy brow', NULL, 10, TRUE);
+
+-- Rare term
+EXPLAIN (ANALYZE, BUFFERS)
+SELECT id FROM recipes r
+WHERE r.title ILIKE '%tiramisu%' OR r.caption ILIKE '%tiramisu%';
+
+EXPLAIN (ANALYZE, BUFFERS)
+SELECT * FROM search_recipes('tiramisu', NULL, 20, FALSE);
+
+EXPLAIN (ANALYZE, BUFFERS)
+SELECT * FROM search_recipes('matcha tira', NULL, 10, TRUE);
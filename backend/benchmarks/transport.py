@@ -0,0 +1,161 @@
+"""
+HTTP transport throughput under parallel load.
+
+    cd backend
+    python benchmarks/transport.py --threads 48 --requests 2000
+
+Starts a local keep-alive HTTPS server and runs the same parallel GET load
+through the clients below. Connections do a real TLS handshake (a throwaway
+self-signed certificate made with the openssl CLI), and the server adds the
+round trips a remote host costs: two per new connection (TCP + TLS 1.3) and
+one per request on top of --query-ms of PostgREST work. Loopback is otherwise
+free, which hides the cost of churn. --no-tls serves plain HTTP.
+
+  * per_request  a fresh client per call (no connection reuse)
+  * default      one httpx.Client with default pool limits, like the old clients
+  * pooled       the shared transport from app/transport.py
+
+Reports requests/second and how many TCP connections the server accepted. The
+server runs in its own process so it does not compete with the client threads
+for the GIL.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import socket
+import ssl
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import httpx
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.transport import build_http_client  # noqa: E402
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+    def __init__(self, address, connections, rtt_s: float, query_s: float, cert: str = None):
+        super().__init__(address, _Handler)
+        self.connections = connections  # multiprocessing.Value shared with the parent
+        self.rtt_s = rtt_s
+        self.query_s = query_s
+        if cert:
+            context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+            context.load_cert_chain(cert)
+            # handshake in the connection's handler thread, not the accept loop
+            self.socket = context.wrap_socket(self.socket, server_side=True, do_handshake_on_connect=False)
+
+    def handle_error(self, request, client_address):
+        pass  # clients closing idle keep-alive sockets is expected
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        # headers and body go out as separate writes; without this Nagle plus
+        # delayed ACKs add ~40ms to every request on a reused connection
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        with self.server.connections.get_lock():
+            self.server.connections.value += 1
+        time.sleep(2 * self.server.rtt_s)
+        if isinstance(self.connection, ssl.SSLSocket):
+            self.connection.do_handshake()
+
+    def do_GET(self):
+        time.sleep(self.server.rtt_s + self.server.query_s)
+        body = b'[{"id": 1}]'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+def _serve(port, connections, rtt_s: float, query_s: float, cert: str = None) -> None:
+    server = _Server(("127.0.0.1", 0), connections, rtt_s, query_s, cert)
+    port.value = server.server_address[1]
+    server.serve_forever()
+
+def _make_cert(directory: str) -> str:
+    path = os.path.join(directory, "localhost.pem")
+    subprocess.run(
+        [
+            "openssl", "req", "-x509", "-newkey", "ec", "-pkeyopt", "ec_paramgen_curve:prime256v1",
+            "-nodes", "-days", "1", "-subj", "/CN=localhost",
+            "-addext", "subjectAltName=DNS:localhost,IP:127.0.0.1",
+            "-keyout", path, "-out", path,
+        ],
+        check=True, capture_output=True,
+    )
+    return path
+
+def _run(connections, url: str, threads: int, requests: int, get) -> dict:
+    connections.value = 0
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(lambda _: get(url), range(requests)))
+    elapsed = time.perf_counter() - start
+    return {"req_per_s": requests / elapsed, "elapsed_s": elapsed, "connections_opened": connections.value}
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--threads", type=int, default=48)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--rtt-ms", type=float, default=20.0)
+    parser.add_argument("--query-ms", type=float, default=5.0)
+    parser.add_argument("--no-tls", action="store_true")
+    args = parser.parse_args()
+
+    tmp = tempfile.TemporaryDirectory()
+    cert = None if args.no_tls else _make_cert(tmp.name)
+    if cert:
+        # httpx trusts SSL_CERT_FILE, so every client below verifies against it
+        os.environ["SSL_CERT_FILE"] = cert
+
+    port = multiprocessing.Value("i", 0)
+    connections = multiprocessing.Value("i", 0)
+    server = multiprocessing.Process(
+        target=_serve, args=(port, connections, args.rtt_ms / 1000, args.query_ms / 1000, cert), daemon=True,
+    )
+    server.start()
+    while not port.value:
+        time.sleep(0.01)
+    url = f"{'https' if cert else 'http'}://localhost:{port.value}/rest/v1/recipes"
+
+    def per_request(u):
+        with httpx.Client() as c:
+            c.get(u).raise_for_status()
+
+    default_client = httpx.Client()
+    pooled_client = build_http_client("bench", 30.0)
+
+    results = {
+        "per_request": _run(connections, url, args.threads, args.requests, per_request),
+        "default": _run(connections, url, args.threads, args.requests, lambda u: default_client.get(u).raise_for_status()),
+        "pooled": _run(connections, url, args.threads, args.requests, lambda u: pooled_client.get(u).raise_for_status()),
+    }
+    server.terminate()
+    tmp.cleanup()
+    print(json.dumps({
+        "benchmark": "transport",
+        "threads": args.threads,
+        "requests": args.requests,
+        "rtt_ms": args.rtt_ms,
+        "tls": bool(cert),
+        "results": results,
+    }, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""
+URL safety checks: blocking per-request lookups vs the cached async checker.
+
+    cd backend
+    python benchmarks/url_check.py --checks 2000 --hosts 20 --concurrency 50
+
+Runs --checks link checks over --hosts distinct hosts, --concurrency at a time,
+against a fake resolver that takes --dns-ms per lookup.
+
+  * legacy   a blocking lookup per check in a worker thread, like the old
+             _is_public_http_url (asyncio.to_thread + gethostbyname)
+  * checker  url_safety.UrlChecker: cached, coalesced, all records checked
+
+Reports check latency and DNS lookups made. Then runs the safety cases with
+FakeResolver (mixed public/private answers, IPv6, rebinding) and fetches from
+a local HTTP server inside pinned_dns(): a pinned name that does not exist in
+DNS is served from its checked address, an unpinned private host is refused.
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import threading
+import time
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from app.url_safety import UrlChecker, is_public_address, pinned_dns  # noqa: E402
+from fakes import FakeResolver  # noqa: E402
+
+PUBLIC_V4 = "93.184.216.34"
+PUBLIC_V6 = "2606:2800:220:1:248:1893:25c8:1946"
+
+async def _run(checks: int, concurrency: int, hosts: int, check) -> dict:
+    latencies = []
+    gate = asyncio.Semaphore(concurrency)
+
+    async def one(i: int) -> None:
+        async with gate:
+            started = time.perf_counter()
+            assert await check(f"https://video{i % hosts}.test/watch?v={i}")
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(checks)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "elapsed_s": elapsed,
+        "median_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+    }
+
+async def _throughput(args: argparse.Namespace) -> dict:
+    dns_s = args.dns_ms / 1000
+    records = {f"video{i}.test": [PUBLIC_V4, PUBLIC_V6] for i in range(args.hosts)}
+    legacy_lookups = 0
+
+    def legacy_lookup(host: str) -> str:
+        nonlocal legacy_lookups
+        legacy_lookups += 1
+        time.sleep(dns_s)
+        return records[host][0]
+
+    async def legacy(url: str) -> bool:
+        host = url.split("/")[2]
+        return is_public_address(await asyncio.to_thread(legacy_lookup, host))
+
+    legacy_result = await _run(args.checks, args.concurrency, args.hosts, legacy)
+    legacy_result["dns_lookups"] = legacy_lookups
+
+    resolver = FakeResolver(records, latency_s=dns_s)
+    checker = UrlChecker(resolver=resolver)
+    checker_result = await _run(args.checks, args.concurrency, args.hosts, checker.check)
+    checker_result["dns_lookups"] = resolver.lookups
+    return {"legacy": legacy_result, "checker": checker_result}
+
+async def _safety_cases() -> dict:
+    resolver = FakeResolver({
+        "public.test": [PUBLIC_V4, PUBLIC_V6],
+        "mixed.test": [PUBLIC_V4, "10.0.0.5"],
+        "v6-loopback.test": [PUBLIC_V6, "::1"],
+        "mapped.test": ["::ffff:127.0.0.1"],
+        "cgnat.test": ["100.64.1.1"],
+        "rebind.test": [[PUBLIC_V4], ["127.0.0.1"]],
+    })
+    checker = UrlChecker(resolver=resolver)
+    cases = {}
+    for url in [
+        "https://public.test/v",
+        "https://mixed.test/v",
+        "https://v6-loopback.test/v",
+        "https://mapped.test/v",
+        "https://cgnat.test/v",
+        "http://169.254.169.254/latest/meta-data/",
+        "ftp://public.test/v",
+        "https://unknown.test/v",
+    ]:
+        checked = await checker.check(url)
+        cases[url] = list(checked.addresses) if checked else "rejected"
+
+    checked = await checker.check("https://rebind.test/v")
+    resolver.records["rebind.test"] = [["127.0.0.1"]]
+    again = await checker.check("https://rebind.test/v")  # cached: same pinned answer
+    cases["https://rebind.test/v"] = {
+        "pinned": list(checked.addresses) if checked else "rejected",
+        "second_check": list(again.addresses) if again else "rejected",
+        "lookups": resolver.lookups,
+    }
+    return cases
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self) -> None:
+        self.send_response(200)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"ok")
+
+    def log_message(self, *args) -> None:
+        pass
+
+def _pinned_fetches() -> dict:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    port = server.server_address[1]
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    opener = urllib.request.build_opener(urllib.request.ProxyHandler({}))
+
+    def fetch(url: str) -> str:
+        try:
+            return opener.open(url, timeout=5).read().decode()
+        except OSError as e:
+            return f"refused: {getattr(e, 'reason', e)}"
+
+    # the local server stands in for the checked public address of video.test
+    with pinned_dns({"video.test": ["127.0.0.1"]}):
+        results = {
+            "pinned video.test": fetch(f"http://video.test:{port}/"),
+            "unpinned localhost": fetch(f"http://localhost:{port}/"),
+            "unpinned 127.0.0.1": fetch(f"http://127.0.0.1:{port}/"),
+        }
+    results["outside pinned_dns, localhost"] = fetch(f"http://localhost:{port}/")
+    server.shutdown()
+    return results
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--checks", type=int, default=2000)
+    parser.add_argument("--hosts", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--dns-ms", type=float, default=30.0)
+    args = parser.parse_args()
+
+    print(json.dumps({
+        "benchmark": "url_check",
+        "checks": args.checks,
+        "hosts": args.hosts,
+        "concurrency": args.concurrency,
+        "dns_ms": args.dns_ms,
+        "results": asyncio.run(_throughput(args)),
+        "safety": asyncio.run(_safety_cases()),
+        "pinned_fetch": _pinned_fetches(),
+    }, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,24 @@
+import os
+
 import modal
 
 app = modal.App("vegcooking-backend")
 
-image = (
+# Containers kept warm ahead of traffic (0 = scale to zero)
+MIN_CONTAINERS = int(os.environ.get("VEGCOOKING_MIN_CONTAINERS", "0"))
+# Requests one API container takes at once, and the level Modal's autoscaler
+# aims for; starting containers below the hard limit keeps admission control
+# (app/admission.py) from having to queue or shed a burst
+API_MAX_INPUTS = int(os.environ.get("VEGCOOKING_API_MAX_INPUTS", "32"))
+API_TARGET_INPUTS = int(os.environ.get("VEGCOOKING_API_TARGET_INPUTS", "12"))
+# API container cap: each one runs its own OpenAI scheduler (meal plans,
+# streamed final passes) on the shared key, so the fleet stays bounded
+API_MAX_CONTAINERS = int(os.environ.get("VEGCOOKING_API_MAX_CONTAINERS", "8"))
+# Media worker scaling: one CPU-heavy import per container, bounded fleet
+MEDIA_MAX_CONTAINERS = int(os.environ.get("VEGCOOKING_MEDIA_MAX_CONTAINERS", "20"))
+
+# Media workers: ffmpeg, deno (for yt-dlp) and the full pipeline
+media_image = (
     modal.Image.debian_slim()
     .apt_install("ffmpeg", "curl", "unzip", "bash", "python3-dev")
     .pip_install_from_requirements("requirements.txt")
@@ -16,8 +32,58 @@ image = (
     .add_local_dir("./app", "/root/app")
 )
 
-@app.function(image=image, secrets=[modal.Secret.from_name("vegcooking-secrets")])
-@modal.asgi_app()
-def fastapi_app():
-    from app.main import cookApp as fastapi
-    return fastapi
\ No newline at end of file
+# API containers: no system packages, heavy stages are dispatched to the media worker
+api_image = (
+    modal.Image.debian_slim()
+    .pip_install_from_requirements("requirements.txt")
+    .pip_install("modal")
+    .env({"IMPORT_EXECUTOR": "modal", "MODAL_APP_NAME": app.name})
+    .add_local_dir("./app", "/root/app")
+)
+
+secrets = [modal.Secret.from_name("vegcooking-secrets")]
+
+# Imported at global scope so the work lands in the memory snapshot.
+with api_image.imports():
+    from app.clients import warm_clients
+    from app.main import cookApp
+
+@app.cls(
+    image=api_image,
+    secrets=secrets,
+    enable_memory_snapshot=True,
+    min_containers=MIN_CONTAINERS,
+    max_containers=API_MAX_CONTAINERS,
+)
+@modal.concurrent(max_inputs=API_MAX_INPUTS, target_inputs=API_TARGET_INPUTS)
+class Api:
+    @modal.enter(snap=True)
+    def warm(self):
+        # Building the clients opens no connections, so the snapshot holds
+        # ready-made clients and a restored container skips constructing them
+        warm_clients()
+
+    # label keeps the URL the function-based endpoint had
+    @modal.asgi_app(label=f"{app.name}-fastapi-app")
+    def fastapi_app(self):
+        return cookApp
+
+@app.function(
+    image=media_image,
+    secrets=secrets,
+    cpu=2.0,
+    memory=2048,
+    timeout=600,
+    max_containers=MEDIA_MAX_CONTAINERS,
+)
+def run_media_stage(stage: str, args: list):
+    from app.pipeline import run_stage_traced
+
+    return run_stage_traced(stage, *args)
+
+# Suggested covers of drafts that were never saved (see app/main.py)
+@app.function(image=api_image, secrets=secrets, schedule=modal.Period(hours=6))
+def sweep_import_covers() -> int:
+    from app.main import sweep_import_covers as sweep
+
+    return sweep()
@@ -0,0 +1,91 @@
+-- Grocery List Sync Function
+-- Rebuilds the auto-generated (ingredient-based) items of a shopping list from
+-- the user's home meal plans for the list's week, in ONE transaction:
+--   * aggregate recipe_ingredients by ingredient_id + unit_code
+--   * bulk UPDATE quantities that changed (checked state is preserved)
+--   * bulk INSERT missing items
+--   * bulk DELETE unchecked auto-items that are no longer planned
+-- Custom items (custom_text) are never touched. Returns the resulting list.
+
+CREATE OR REPLACE FUNCTION sync_shopping_list(
+  p_user_id UUID,
+  p_list_id BIGINT,
+  p_start DATE,
+  p_end DATE
+)
+RETURNS SETOF shopping_list_items
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  IF NOT EXISTS (
+    SELECT 1 FROM shopping_lists sl
+    WHERE sl.id = p_list_id AND sl.user_id = p_user_id
+  ) THEN
+    RAISE EXCEPTION 'Shopping list % not found', p_list_id USING ERRCODE = 'P0002';
+  END IF;
+
+  WITH planned_recipes AS (
+    -- each planned recipe counts once per week, like the app always did
+    SELECT DISTINCT mp.recipe_id
+    FROM meal_plans mp
+    WHERE mp.user_id = p_user_id
+      AND mp.plan_date BETWEEN p_start AND p_end
+      AND mp.location = 'home'
+      AND mp.recipe_id IS NOT NULL
+  ),
+  desired AS (
+    SELECT ri.ingredient_id, ri.unit_code, SUM(COALESCE(ri.quantity, 0)) AS quantity
+    FROM planned_recipes pr
+    JOIN recipe_ingredients ri ON ri.recipe_id = pr.recipe_id
+    JOIN ingredients i ON i.id = ri.ingredient_id
+    GROUP BY ri.ingredient_id, ri.unit_code
+  ),
+  existing AS (
+    SELECT sli.id, sli.ingredient_id, sli.unit_code, sli.quantity
+    FROM shopping_list_items sli
+    WHERE sli.list_id = p_list_id
+      AND sli.ingredient_id IS NOT NULL
+  ),
+  updated AS (
+    UPDATE shopping_list_items sli
+    SET quantity = d.quantity
+    FROM desired d
+    WHERE sli.list_id = p_list_id
+      AND sli.ingredient_id = d.ingredient_id
+      AND sli.unit_code IS NOT DISTINCT FROM d.unit_code
+      AND sli.quantity IS DISTINCT FROM d.quantity
+  ),
+  inserted AS (
+    INSERT INTO shopping_list_items (list_id, ingredient_id, custom_text, quantity, unit_code, checked)
+    SELECT p_list_id, d.ingredient_id, NULL, d.quantity, d.unit_code, FALSE
+    FROM desired d
+    WHERE NOT EXISTS (
+      SELECT 1 FROM existing e
+      WHERE e.ingredient_id = d.ingredient_id
+        AND e.unit_code IS NOT DISTINCT FROM d.unit_code
+    )
+  )
+  DELETE FROM shopping_list_items sli
+  WHERE sli.list_id = p_list_id
+    AND sli.ingredient_id IS NOT NULL
+    AND sli.custom_text IS NULL
+    AND NOT sli.checked
+    AND NOT EXISTS (
+      SELECT 1 FROM desired d
+      WHERE d.ingredient_id = sli.ingredient_id
+        AND d.unit_code IS NOT DISTINCT FROM sli.unit_code
+    );
+
+  RETURN QUERY
+  SELECT sli.*
+  FROM shopping_list_items sli
+  WHERE sli.list_id = p_list_id
+  ORDER BY sli.id;
+END;
+$$;
+
+GRANT EXECUTE ON FUNCTION sync_shopping_list(UUID, BIGINT, DATE, DATE) TO authenticated;
+
+COMMENT ON FUNCTION sync_shopping_list IS
+'Aggregates the week''s home meal plans into a shopping list with set-based insert/update/delete
+in one transaction and returns the resulting items.';
@@ -1,6 +1,7 @@
 -- Personalized Feed Scoring Function
 -- This function calculates a personalization score for each recipe based on user preferences
 -- without using AI, similar to Instagram's algorithm
+-- Requires recipe_search.sql (search_tsv column and its GIN index)
 
 CREATE OR REPLACE FUNCTION get_personalized_feed(
   p_user_id UUID,
@@ -167,8 +168,7 @@ BEGIN
       AND (
         p_search IS NULL 
         OR p_search = '' 
-        OR r.title ILIKE '%' || p_search || '%'
-        OR r.caption ILIKE '%' || p_search || '%'
+        OR r.search_tsv @@ websearch_to_tsquery('english', p_search)
       )
       -- Apply tag filters if provided
       AND (
@@ -196,7 +196,8 @@ BEGIN
   ORDER BY 
     -- Sort by personalization score first, then by recency
     sr.personalization_score DESC,
-    sr.created_at DESC
+    sr.created_at DESC,
+    sr.id DESC
   LIMIT p_limit
   OFFSET p_offset;
 END;
@@ -0,0 +1,27 @@
+-- Personalized Feed Ranking Function
+-- Returns only the ranked ids (plus the sort keys) for a user's feed.
+-- The backend calls this once per feed session, caches the ordered list and
+-- serves later pages from a (score, created_at, id) cursor, so scrolling no
+-- longer re-scores the whole recipe table for every page.
+
+CREATE OR REPLACE FUNCTION get_personalized_feed_ranking(
+  p_user_id UUID,
+  p_limit INT DEFAULT 500
+)
+RETURNS TABLE (
+  id BIGINT,
+  created_at TIMESTAMPTZ,
+  personalization_score FLOAT
+)
+LANGUAGE sql
+STABLE
+AS $$
+  SELECT f.id, f.created_at, f.personalization_score
+  FROM get_personalized_feed(p_user_id, p_limit, 0, NULL, NULL) f;
+$$;
+
+GRANT EXECUTE ON FUNCTION get_personalized_feed_ranking(UUID, INT) TO authenticated;
+
+COMMENT ON FUNCTION get_personalized_feed_ranking IS
+'Ranked recipe ids for a personalized feed session. Same ordering as get_personalized_feed
+(score DESC, created_at DESC, id DESC) without the row payload.';
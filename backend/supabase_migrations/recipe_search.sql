@@ -0,0 +1,93 @@
+-- Recipe Full-Text Search
+-- Replaces ILIKE '%term%' scans with indexed search:
+--   * a weighted tsvector over title (A) and caption (B), backed by a GIN index
+--   * a trigram index on title for typo-tolerant typeahead
+--   * a GIN index on tags so `tags && p_tag_filters` is an index probe
+-- Run this before personalized_feed_function.sql, which filters on search_tsv.
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+ALTER TABLE recipes
+  ADD COLUMN IF NOT EXISTS search_tsv TSVECTOR
+  GENERATED ALWAYS AS (
+    setweight(to_tsvector('english', COALESCE(title, '')), 'A') ||
+    setweight(to_tsvector('english', COALESCE(caption, '')), 'B')
+  ) STORED;
+
+CREATE INDEX IF NOT EXISTS recipes_search_tsv_idx ON recipes USING GIN (search_tsv);
+CREATE INDEX IF NOT EXISTS recipes_title_trgm_idx ON recipes USING GIN (title gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS recipes_tags_idx ON recipes USING GIN (tags);
+
+-- Build a tsquery from free text.
+-- p_prefix = TRUE turns every term into a prefix match ("choc brow" -> choc:* & brow:*)
+-- for typeahead; otherwise the usual web-search syntax applies ("vegan -nuts").
+CREATE OR REPLACE FUNCTION recipe_search_query(p_query TEXT, p_prefix BOOLEAN DEFAULT FALSE)
+RETURNS TSQUERY
+LANGUAGE sql
+IMMUTABLE
+AS $$
+  SELECT CASE
+    WHEN NOT p_prefix THEN websearch_to_tsquery('english', p_query)
+    ELSE (
+      SELECT to_tsquery('english', string_agg(term || ':*', ' & '))
+      FROM unnest(regexp_split_to_array(lower(p_query), '[^[:alnum:]]+')) AS term
+      WHERE term <> ''
+    )
+  END;
+$$;
+
+CREATE OR REPLACE FUNCTION search_recipes(
+  p_query TEXT,
+  p_tag_filters TEXT[] DEFAULT NULL,
+  p_limit INT DEFAULT 20,
+  p_prefix BOOLEAN DEFAULT FALSE
+)
+RETURNS TABLE (
+  id BIGINT,
+  title TEXT,
+  caption TEXT,
+  image_url TEXT,
+  user_id UUID,
+  tags TEXT[],
+  created_at TIMESTAMPTZ,
+  rank REAL
+)
+LANGUAGE sql
+STABLE
+AS $$
+  WITH q AS (
+    SELECT recipe_search_query(p_query, p_prefix) AS tsq
+  )
+  SELECT
+    r.id,
+    r.title,
+    r.caption,
+    r.image_url,
+    r.user_id,
+    r.tags,
+    r.created_at,
+    (ts_rank_cd(r.search_tsv, q.tsq) + similarity(r.title, p_query))::REAL AS rank
+  FROM recipes r, q
+  -- the API calls this with the service role: only public recipes, always
+  WHERE r.is_public
+    AND (
+      r.search_tsv @@ q.tsq
+      -- typo tolerance on titles ("brownei" still finds "Brownies")
+      OR r.title % p_query
+    )
+    AND (
+      p_tag_filters IS NULL
+      OR array_length(p_tag_filters, 1) IS NULL
+      OR r.tags && p_tag_filters
+    )
+  ORDER BY rank DESC, r.created_at DESC, r.id DESC
+  LIMIT p_limit;
+$$;
+
+GRANT EXECUTE ON FUNCTION search_recipes(TEXT, TEXT[], INT, BOOLEAN) TO authenticated;
+-- signed-in use only; also drops the grant earlier versions of this file gave
+REVOKE EXECUTE ON FUNCTION search_recipes(TEXT, TEXT[], INT, BOOLEAN) FROM anon, PUBLIC;
+
+COMMENT ON FUNCTION search_recipes IS
+'Ranked search over public recipes by title/caption (tsvector + trigram), optionally filtered by tags.
+Set p_prefix for typeahead.';
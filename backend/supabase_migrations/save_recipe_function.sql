@@ -0,0 +1,102 @@
+-- Recipe Save Function
+-- Saves a whole recipe (the recipes row, recipe_ingredients and recipe_steps)
+-- in ONE transaction and one round trip, instead of the insert/update,
+-- cover update, delete-children and insert-children calls the apps made:
+--   * p_recipe_id NULL inserts a new recipe owned by p_user_id
+--   * otherwise updates it, only if it belongs to p_user_id; keys missing from
+--     p_recipe keep their current values (jsonb_populate_record on the row)
+--   * replaces ingredients and steps with the given arrays, positions 1..n;
+--     a NULL array leaves that list as it is
+-- Ingredients without an ingredient_id and blank steps are skipped, like the
+-- apps already did. Returns the recipe id.
+
+-- DELETE /recipes/{id} is a single conditional delete on recipes, so the
+-- child rows must go with it: make their recipe_id foreign keys cascade.
+DO $$
+DECLARE
+  fk RECORD;
+BEGIN
+  FOR fk IN
+    SELECT c.conname, c.conrelid::regclass AS tbl
+    FROM pg_constraint c
+    WHERE c.contype = 'f'
+      AND c.confrelid = 'recipes'::regclass
+      AND c.conrelid IN ('recipe_ingredients'::regclass, 'recipe_steps'::regclass)
+      AND c.confdeltype <> 'c'
+  LOOP
+    EXECUTE format('ALTER TABLE %s DROP CONSTRAINT %I', fk.tbl, fk.conname);
+    EXECUTE format(
+      'ALTER TABLE %s ADD CONSTRAINT %I FOREIGN KEY (recipe_id) REFERENCES recipes(id) ON DELETE CASCADE',
+      fk.tbl, fk.conname
+    );
+  END LOOP;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION save_recipe(
+  p_user_id UUID,
+  p_recipe_id BIGINT,
+  p_recipe JSONB,
+  p_ingredients JSONB DEFAULT NULL,
+  p_steps JSONB DEFAULT NULL
+)
+RETURNS BIGINT
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  v_id BIGINT;
+BEGIN
+  IF p_recipe_id IS NULL THEN
+    INSERT INTO recipes (
+      user_id, title, caption, description, servings, is_public, tags,
+      prep_time, cook_time, difficulty, demo_url, image_url
+    )
+    SELECT
+      p_user_id, n.title, n.caption, n.description, n.servings, COALESCE(n.is_public, FALSE),
+      COALESCE(n.tags, '{}'), n.prep_time, n.cook_time, n.difficulty, n.demo_url, n.image_url
+    FROM jsonb_populate_record(NULL::recipes, p_recipe) n
+    RETURNING id INTO v_id;
+  ELSE
+    UPDATE recipes r
+    SET (title, caption, description, servings, is_public, tags,
+         prep_time, cook_time, difficulty, demo_url, image_url) = (
+      SELECT n.title, n.caption, n.description, n.servings, n.is_public, n.tags,
+             n.prep_time, n.cook_time, n.difficulty, n.demo_url, n.image_url
+      FROM jsonb_populate_record(r, p_recipe) n
+    )
+    WHERE r.id = p_recipe_id AND r.user_id = p_user_id
+    RETURNING r.id INTO v_id;
+
+    IF v_id IS NULL THEN
+      RAISE EXCEPTION 'Recipe % not found', p_recipe_id USING ERRCODE = 'P0002';
+    END IF;
+  END IF;
+
+  IF p_ingredients IS NOT NULL THEN
+    DELETE FROM recipe_ingredients WHERE recipe_id = v_id;
+    INSERT INTO recipe_ingredients (recipe_id, ingredient_id, quantity, unit_code, notes, position)
+    SELECT v_id, i.ingredient_id, i.quantity, NULLIF(i.unit, ''), NULLIF(btrim(i.notes), ''),
+           ROW_NUMBER() OVER (ORDER BY t.ord)
+    FROM jsonb_array_elements(p_ingredients) WITH ORDINALITY AS t(elem, ord)
+    CROSS JOIN LATERAL jsonb_to_record(t.elem)
+      AS i(ingredient_id BIGINT, quantity NUMERIC, unit TEXT, notes TEXT)
+    WHERE i.ingredient_id IS NOT NULL;
+  END IF;
+
+  IF p_steps IS NOT NULL THEN
+    DELETE FROM recipe_steps WHERE recipe_id = v_id;
+    INSERT INTO recipe_steps (recipe_id, position, body)
+    SELECT v_id, ROW_NUMBER() OVER (ORDER BY t.ord), btrim(t.elem->>'body')
+    FROM jsonb_array_elements(p_steps) WITH ORDINALITY AS t(elem, ord)
+    WHERE btrim(COALESCE(t.elem->>'body', '')) <> '';
+  END IF;
+
+  RETURN v_id;
+END;
+$$;
+
+GRANT EXECUTE ON FUNCTION save_recipe(UUID, BIGINT, JSONB, JSONB, JSONB) TO authenticated;
+
+COMMENT ON FUNCTION save_recipe IS
+'Inserts or updates a recipe with its ingredients and steps in one transaction and returns its id.
+Updates only apply to the caller''s own recipe (P0002 otherwise).';
@@ -0,0 +1,6 @@
+import sys
+from pathlib import Path
+
+# run from backend/ (python -m pytest tests); the fakes are shared with the benchmarks
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "benchmarks"))
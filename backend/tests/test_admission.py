@@ -0,0 +1,164 @@
+import asyncio
+
+import pytest
+
+from app.admission import (
+    ADMISSION_RETRY_AFTER_MAX_S,
+    MB,
+    AdmissionController,
+    AdmissionMiddleware,
+    AdmissionRejected,
+    Lane,
+)
+
+def _controller(concurrency=1, queue=1, memory=(0, 0.0), memory_budget=1024 * MB, **kwargs):
+    lane = Lane("imports", ("/video-import",), concurrency=concurrency, queue=queue, memory=memory)
+    return AdmissionController([lane], memory_budget=memory_budget, tmp_min_free=0, **kwargs), lane
+
+async def _settle():
+    for _ in range(3):
+        await asyncio.sleep(0)
+
+def test_queues_then_rejects_with_retry_after_from_service_time():
+    async def run():
+        admission, lane = _controller(concurrency=1, queue=1)
+        lane.service_s = 10.0
+
+        first = await admission.acquire(lane, None)
+        waiting = asyncio.ensure_future(admission.acquire(lane, None))
+        await _settle()
+        assert (lane.in_flight, len(lane.waiters)) == (1, 1)
+
+        with pytest.raises(AdmissionRejected) as rejected:
+            await admission.acquire(lane, None)
+        assert rejected.value.status_code == 429
+        # one running and one queued ahead, 10 s each on one slot
+        assert rejected.value.retry_after_s == 20
+
+        admission.release(lane, *first, started=0.0)
+        await waiting
+        assert (lane.in_flight, len(lane.waiters)) == (1, 0)
+
+    asyncio.run(run())
+
+def test_queued_requests_start_oldest_first():
+    async def run():
+        admission, lane = _controller(concurrency=1, queue=4)
+        order = []
+        first = await admission.acquire(lane, None)
+
+        async def queued(name):
+            reservation = await admission.acquire(lane, None)
+            order.append(name)
+            await asyncio.sleep(0.01)
+            admission.release(lane, *reservation, started=0.0)
+
+        tasks = []
+        for name in ("a", "b", "c"):
+            tasks.append(asyncio.ensure_future(queued(name)))
+            await _settle()
+        admission.release(lane, *first, started=0.0)
+        await asyncio.gather(*tasks)
+        assert order == ["a", "b", "c"]
+        assert (lane.in_flight, admission.reserved_memory) == (0, 0)
+
+    asyncio.run(run())
+
+def test_queue_timeout_is_a_503_and_leaves_the_queue():
+    async def run():
+        admission, lane = _controller(concurrency=1, queue=1, queue_timeout_s=0.05)
+        await admission.acquire(lane, None)
+
+        with pytest.raises(AdmissionRejected) as rejected:
+            await admission.acquire(lane, None)
+        assert rejected.value.status_code == 503
+        assert rejected.value.retry_after_s >= 1
+        assert len(lane.waiters) == 0
+
+    asyncio.run(run())
+
+def test_retry_after_is_capped():
+    admission, lane = _controller(concurrency=1, queue=100)
+    lane.service_s = 3600.0
+    lane.in_flight = 1
+    assert admission.load()["lanes"]["imports"]["retry_after_s"] == ADMISSION_RETRY_AFTER_MAX_S
+
+def test_memory_budget_holds_requests_until_reservations_free_up():
+    async def run():
+        # each request reserves 600 MB of a 1 GB budget: one at a time even with two slots
+        admission, lane = _controller(concurrency=2, queue=2, memory=(600 * MB, 0.0))
+        first = await admission.acquire(lane, None)
+        waiting = asyncio.ensure_future(admission.acquire(lane, None))
+        await _settle()
+        assert not waiting.done()
+
+        admission.release(lane, *first, started=0.0)
+        assert await waiting == (0, 600 * MB)
+
+    asyncio.run(run())
+
+def test_request_bigger_than_the_budget_still_runs_alone():
+    async def run():
+        admission, lane = _controller(memory=(4096 * MB, 0.0))
+        assert await admission.acquire(lane, None) == (0, 4096 * MB)
+
+    asyncio.run(run())
+
+def test_low_disk_is_a_503_without_queueing():
+    async def run():
+        lane = Lane("imports", ("/video-import",), concurrency=1, queue=1, tmp=(1 * MB, 0.0))
+        admission = AdmissionController([lane], memory_budget=1024 * MB, tmp_min_free=1 << 62)
+        with pytest.raises(AdmissionRejected) as rejected:
+            await admission.acquire(lane, None)
+        assert rejected.value.status_code == 503
+        assert lane.in_flight == 0
+
+    asyncio.run(run())
+
+# ---------- Middleware ----------
+
+def _call(middleware, method, path):
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "method": method, "path": path, "headers": [(b"content-length", b"10")]}
+    asyncio.run(middleware(scope, receive, send))
+    return sent
+
+def test_middleware_answers_rejections_without_calling_the_app():
+    admission, lane = _controller(concurrency=1, queue=0)
+    lane.in_flight = 1  # the slot is taken
+    lane.service_s = 7.0
+    called = []
+
+    async def app(scope, receive, send):
+        called.append(scope["path"])
+
+    sent = _call(AdmissionMiddleware(app, admission), "POST", "/video-import")
+    assert called == []
+    headers = dict(sent[0]["headers"])
+    assert sent[0]["status"] == 429
+    assert headers[b"retry-after"] == b"7"
+    assert headers[b"connection"] == b"close"
+
+    # other routes and methods pass straight through
+    _call(AdmissionMiddleware(app, admission), "GET", "/video-import")
+    _call(AdmissionMiddleware(app, admission), "POST", "/recipes")
+    assert called == ["/video-import", "/recipes"]
+
+def test_middleware_releases_the_slot_after_the_response():
+    admission, lane = _controller()
+
+    async def app(scope, receive, send):
+        assert lane.in_flight == 1
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+
+    sent = _call(AdmissionMiddleware(app, admission), "POST", "/video-import")
+    assert sent[0]["status"] == 200
+    assert lane.in_flight == 0
@@ -0,0 +1,105 @@
+import json
+import random
+
+import pytest
+
+from app import main
+from app.pipeline import DraftStreamParser
+
+DRAFT = {
+    "title": 'Fudgy "Brownies", {one bowl} [vegan]',
+    "caption": "Rich \\ dense, with a crackly top: ünïcode ✓",
+    "servings": 9,
+    "prep_minutes": None,
+    "nutrition": {"kcal": 310, "tags": ["a", "b}"]},
+    "tags": ["Vegan", "Dessert"],
+    "ingredients": [
+        {"name": "cocoa, dutch-processed", "quantity": 0.5, "unit": "cup", "notes": "sifted {no lumps}"},
+        {"name": "flour", "quantity": 1, "unit": "cup", "notes": None},
+        {"name": 'oat milk "barista"', "quantity": 120, "unit": "ml", "notes": "]"},
+    ],
+    "steps": [
+        {"position": 1, "body": "Heat oven to 180°C, line an 8\" pan."},
+        {"position": 2, "body": "Whisk {wet} and [dry], then fold."},
+    ],
+}
+
+EXPECTED = (
+    [("field", name, DRAFT[name]) for name in ("title", "caption", "servings", "prep_minutes", "nutrition", "tags")]
+    + [("ingredient", i, ing) for i, ing in enumerate(DRAFT["ingredients"])]
+    + [("step", i, step) for i, step in enumerate(DRAFT["steps"])]
+)
+
+def _feed(text, cuts):
+    parser = DraftStreamParser()
+    events = []
+    start = 0
+    for cut in [*cuts, len(text)]:
+        events += parser.feed(text[start:cut])
+        start = cut
+    return events
+
+@pytest.mark.parametrize("indent", [None, 2])
+def test_every_chunk_size_gives_the_same_events(indent):
+    text = json.dumps(DRAFT, indent=indent, ensure_ascii=False)
+    for size in range(1, 40):
+        assert _feed(text, range(size, len(text), size)) == EXPECTED, size
+
+def test_random_chunk_boundaries():
+    text = json.dumps(DRAFT)
+    rng = random.Random(7)
+    for _ in range(200):
+        cuts = sorted(rng.sample(range(1, len(text)), rng.randint(1, 30)))
+        assert _feed(text, cuts) == EXPECTED
+
+def test_events_are_emitted_as_soon_as_each_value_completes():
+    text = json.dumps(DRAFT)
+    parser = DraftStreamParser()
+
+    # a field is complete at the comma that follows it
+    title_end = text.index(', "caption"')
+    assert parser.feed(text[:title_end]) == []
+    assert parser.feed(text[title_end:title_end + 1]) == [("field", "title", DRAFT["title"])]
+
+    # an ingredient is complete at its closing brace, before the next one starts
+    first = json.dumps(DRAFT["ingredients"][0])
+    first_end = text.index(first) + len(first)
+    events = parser.feed(text[title_end + 1:first_end - 1])
+    assert ("ingredient", 0, DRAFT["ingredients"][0]) not in events
+    assert parser.feed(text[first_end - 1:first_end]) == [("ingredient", 0, DRAFT["ingredients"][0])]
+
+    rest = parser.feed(text[first_end:])
+    assert rest == EXPECTED[EXPECTED.index(("ingredient", 0, DRAFT["ingredients"][0])) + 1:]
+
+# ---------- NDJSON events ----------
+
+def test_ndjson_stream_resolves_ingredients_as_they_arrive(monkeypatch):
+    text = json.dumps(DRAFT)
+    resolved = []
+
+    def fake_stream(raw_data, transcript_text):
+        parser = DraftStreamParser()
+        for i in range(0, len(text), 7):
+            yield from parser.feed(text[i:i + 7])
+        yield ("done", json.loads(text))
+
+    def fake_resolve(ingredient_map, name):
+        resolved.append(name)
+        return 100 + len(resolved)
+
+    monkeypatch.setattr(main, "stream_final_recipe", fake_stream)
+    monkeypatch.setattr(main, "load_ingredient_map", dict)
+    monkeypatch.setattr(main, "resolve_or_create_ingredient", fake_resolve)
+
+    body = b"".join(main._ndjson(e) for e in main._structure_events({"raw_data": {}, "transcript": ""}))
+    lines = [json.loads(line) for line in body.decode().splitlines()]
+
+    assert [line["event"] for line in lines] == ["field"] * 6 + ["ingredient"] * 3 + ["step"] * 2 + ["done"]
+    assert [line["name"] for line in lines[:6]] == list(DRAFT)[:6]
+    ingredients = [line for line in lines if line["event"] == "ingredient"]
+    assert [(line["index"], line["value"]["ingredient_id"]) for line in ingredients] == [(0, 101), (1, 102), (2, 103)]
+    assert resolved == [ing["name"] for ing in DRAFT["ingredients"]]
+
+    draft = lines[-1]["draft"]
+    assert [ing["ingredient_id"] for ing in draft["ingredients"]] == [101, 102, 103]
+    assert draft["steps"] == DRAFT["steps"]
@@ -0,0 +1,137 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from app.openai_scheduler import BATCH, INTERACTIVE, OpenAIQueueTimeout, OpenAIScheduler, _Bucket
+
+def _result(total_tokens=None):
+    return SimpleNamespace(usage=None if total_tokens is None else SimpleNamespace(total_tokens=total_tokens))
+
+def _wait_until(predicate, timeout_s=5.0):
+    deadline = time.monotonic() + timeout_s
+    while not predicate():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.005)
+
+# ---------- Buckets ----------
+
+def test_bucket_refills_at_its_rate_up_to_capacity():
+    bucket = _Bucket(per_minute=60, burst_s=10)  # 1/s, 10 deep
+    assert bucket.capacity == 10
+    bucket.spend(10)
+    assert bucket.level == 0
+
+    bucket.refill(bucket.updated + 4)
+    assert bucket.level == pytest.approx(4)
+    bucket.refill(bucket.updated + 100)
+    assert bucket.level == 10
+
+def test_bucket_overdraw_is_bounded_by_one_burst():
+    bucket = _Bucket(per_minute=60, burst_s=10)
+    # a call bigger than the burst only waits for a full bucket...
+    assert bucket.wait_for(1000) == 0
+    bucket.spend(1000)
+    # ...and leaves at most one burst of debt behind
+    assert bucket.level == -10
+    assert bucket.wait_for(10) == pytest.approx(20)
+
+    bucket.spend(-1000)  # budget given back never exceeds capacity
+    assert bucket.level == 10
+
+def test_call_settles_reservation_against_reported_usage():
+    scheduler = OpenAIScheduler(limits={"m": (600, 6000)}, burst_s=10)  # 1000 tokens deep
+
+    scheduler.call("m", lambda: _result(total_tokens=200), tokens=500)
+    assert scheduler._models["m"].tokens.level == pytest.approx(800)
+
+    # usage far above the estimate still leaves at most one burst of debt
+    scheduler.call("m", lambda: _result(total_tokens=50_000), tokens=100)
+    assert scheduler._models["m"].tokens.level == pytest.approx(-1000)
+
+def test_oversized_call_runs_and_the_next_waits_at_most_two_bursts():
+    scheduler = OpenAIScheduler(limits={"m": (600, 600)}, burst_s=0.1)  # 10 tokens/s, 1 deep
+    scheduler.call("m", lambda: _result(total_tokens=20_000), tokens=20_000)
+
+    started = time.monotonic()
+    scheduler.call("m", lambda: _result(total_tokens=1), tokens=1)
+    assert time.monotonic() - started < 0.5
+
+def test_response_headers_clamp_the_budget():
+    scheduler = OpenAIScheduler(limits={"m": (600, 6000)}, burst_s=10)
+
+    def fn():
+        scheduler.observe_headers({"x-ratelimit-remaining-tokens": "10", "x-ratelimit-remaining-requests": "2"})
+        return _result()
+
+    scheduler.call("m", fn)
+    state = scheduler._models["m"]
+    assert state.tokens.level == pytest.approx(10)
+    assert state.requests.level <= 2
+
+# ---------- Queueing ----------
+
+def test_interactive_calls_go_first_and_fifo_within_a_priority():
+    scheduler = OpenAIScheduler(limits={"m": (60_000, 10**9)}, burst_s=10)
+    scheduler._state("m")
+    scheduler._pause("m", 0.3)  # hold the queue while it fills
+    order = []
+    threads = []
+
+    def queue(name, priority):
+        queued = len(scheduler._models["m"].queue)
+        thread = threading.Thread(target=scheduler.call, args=("m", lambda: order.append(name)), kwargs={"priority": priority})
+        thread.start()
+        threads.append(thread)
+        _wait_until(lambda: len(scheduler._models["m"].queue) == queued + 1)
+
+    queue("batch-1", BATCH)
+    queue("batch-2", BATCH)
+    queue("interactive", INTERACTIVE)
+    assert scheduler.queue_depth()["m"] == {"interactive": 1, "batch": 2, "in_flight": 0}
+
+    for thread in threads:
+        thread.join(5)
+    assert order == ["interactive", "batch-1", "batch-2"]
+
+def test_429_pauses_for_retry_after_then_retries():
+    scheduler = OpenAIScheduler(limits={"m": (600, 6000)})
+    attempts = []
+
+    def fn():
+        attempts.append(time.monotonic())
+        if len(attempts) == 1:
+            error = Exception("rate limited")
+            error.status_code = 429
+            error.response = SimpleNamespace(headers={"retry-after-ms": "200"})
+            raise error
+        return _result(total_tokens=10)
+
+    scheduler.call("m", fn, tokens=10)
+    assert len(attempts) == 2
+    assert attempts[1] - attempts[0] >= 0.2
+
+def test_non_retryable_errors_are_raised_at_once():
+    scheduler = OpenAIScheduler(limits={"m": (600, 6000)})
+    attempts = []
+
+    def fn():
+        attempts.append(1)
+        error = Exception("bad request")
+        error.status_code = 400
+        raise error
+
+    with pytest.raises(Exception, match="bad request"):
+        scheduler.call("m", fn, tokens=10)
+    assert len(attempts) == 1
+    assert scheduler._models["m"].in_flight == 0
+
+def test_queue_timeout_leaves_the_queue():
+    scheduler = OpenAIScheduler(limits={"m": (600, 6000)})
+    scheduler._state("m")
+    scheduler._pause("m", 10)
+
+    with pytest.raises(OpenAIQueueTimeout):
+        scheduler.call("m", _result, queue_timeout_s=0.05)
+    assert scheduler.queue_depth()["m"] == {"interactive": 0, "batch": 0, "in_flight": 0}
@@ -0,0 +1,133 @@
+import asyncio
+import socket
+import threading
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app.url_safety import UrlChecker, is_public_address, pinned_dns
+from fakes import FakeResolver
+
+PUBLIC_V4 = "93.184.216.34"
+PUBLIC_V6 = "2606:2800:220:1:248:1893:25c8:1946"
+
+@pytest.mark.parametrize("address, public", [
+    (PUBLIC_V4, True),
+    (PUBLIC_V6, True),
+    ("10.0.0.5", False),
+    ("127.0.0.1", False),
+    ("169.254.169.254", False),
+    ("100.64.1.1", False),
+    ("::1", False),
+    ("::ffff:127.0.0.1", False),
+    ("224.0.0.1", False),
+    ("not an address", False),
+])
+def test_is_public_address(address, public):
+    assert is_public_address(address) is public
+
+def _check(checker, url):
+    return asyncio.run(checker.check(url))
+
+def test_check_accepts_only_hosts_whose_every_address_is_public():
+    checker = UrlChecker(resolver=FakeResolver({
+        "public.test": [PUBLIC_V4, PUBLIC_V6],
+        "mixed.test": [PUBLIC_V4, "10.0.0.5"],
+        "v6-loopback.test": [PUBLIC_V6, "::1"],
+        "mapped.test": ["::ffff:127.0.0.1"],
+    }))
+    checked = _check(checker, "https://Public.test./watch?v=1")
+    assert checked.host == "public.test"
+    assert checked.addresses == (PUBLIC_V4, PUBLIC_V6)
+
+    for url in [
+        "https://mixed.test/v",
+        "https://v6-loopback.test/v",
+        "https://mapped.test/v",
+        "https://unknown.test/v",
+        "http://169.254.169.254/latest/meta-data/",
+        "ftp://public.test/v",
+        "https://public.test:bad/v",
+    ]:
+        assert _check(checker, url) is None, url
+
+def test_checks_are_cached_and_concurrent_lookups_shared():
+    resolver = FakeResolver({"video.test": [PUBLIC_V4]}, latency_s=0.01)
+    checker = UrlChecker(resolver=resolver)
+
+    async def run():
+        return await asyncio.gather(*(checker.check(f"https://video.test/{i}") for i in range(20)))
+
+    assert all(asyncio.run(run()))
+    _check(checker, "https://video.test/again")
+    assert resolver.lookups == 1
+
+def test_rebinding_after_the_check_does_not_change_the_pinned_answer():
+    resolver = FakeResolver({"rebind.test": [[PUBLIC_V4], ["127.0.0.1"]]})
+    checker = UrlChecker(resolver=resolver)
+    first = _check(checker, "https://rebind.test/v")
+    again = _check(checker, "https://rebind.test/v")
+    assert first.addresses == again.addresses == (PUBLIC_V4,)
+    assert resolver.lookups == 1
+
+# ---------- Pinned resolution ----------
+
+def test_pinned_host_resolves_to_its_checked_addresses_only():
+    with pinned_dns({"Video.Test": [PUBLIC_V4]}):
+        infos = socket.getaddrinfo("video.test", 443, type=socket.SOCK_STREAM)
+    assert {info[4][0] for info in infos} == {PUBLIC_V4}
+
+def test_unpinned_private_hosts_are_refused_inside_pinned_dns_only():
+    with pinned_dns({"video.test": [PUBLIC_V4]}):
+        for host in ("localhost", "127.0.0.1", "::1"):
+            with pytest.raises(socket.gaierror):
+                socket.getaddrinfo(host, 80)
+    # other code (and other threads) resolve as usual
+    assert socket.getaddrinfo("127.0.0.1", 80)
+
+def test_pins_apply_to_the_thread_that_set_them():
+    results = []
+    with pinned_dns({"video.test": [PUBLIC_V4]}):
+        thread = threading.Thread(target=lambda: results.append(socket.getaddrinfo("127.0.0.1", 80)))
+        thread.start()
+        thread.join()
+    assert results and results[0][0][4][0] == "127.0.0.1"
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.startswith("/redirect"):
+            target = self.path.split("to=", 1)[1]
+            self.send_response(302)
+            self.send_header("Location", target)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"ok")
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield httpd.server_address[1]
+    httpd.shutdown()
+
+def _fetch(url):
+    opener = urllib.request.build_opener(urllib.request.ProxyHandler({}))
+    return opener.open(url, timeout=5).read()
+
+def test_fetch_reaches_the_pinned_address_but_not_a_redirect_to_a_private_host(server):
+    # the local server stands in for the checked public address of video.test
+    with pinned_dns({"video.test": ["127.0.0.1"]}):
+        assert _fetch(f"http://video.test:{server}/") == b"ok"
+        for target in (f"http://localhost:{server}/secret", f"http://127.0.0.1:{server}/secret"):
+            with pytest.raises(urllib.error.URLError) as refused:
+                _fetch(f"http://video.test:{server}/redirect?to={target}")
+            assert isinstance(refused.value.reason, socket.gaierror)
@@ -26,7 +26,7 @@ import {
 } from "react-native";
 import { resolveImageUrl } from "../../src/lib/images";
 import { resolveIngredientEmoji } from "../../src/lib/ingredientEmoji";
-import { supabase } from "../../src/lib/supabase";
+import { authHeaders, supabase } from "../../src/lib/supabase";
 
 
 
@@ -60,7 +60,10 @@ import { supabase } from "../../src/lib/supabase";
  *   - recipe_steps (recipe_id, position, body)
  *   - ingredients (id, name, created_by)
  * - storage bucket: recipe-media
- * - optional backend endpoints:
+ * - backend endpoints:
+ *   - POST {API_BASE}/recipes/save (recipe + ingredients + steps, one transaction;
+ *     both recipe endpoints take the session token as Authorization: Bearer)
+ *   - DELETE {API_BASE}/recipes/{id}
  *   - POST {API_BASE}/video-import (FormData: video)
  *   - POST {API_BASE}/video-import-url ({ url })
  */
@@ -1320,6 +1323,12 @@ export default function CreateScreen() {
       setDifficulty((draft.difficulty ?? "") as Difficulty);
       setTags(Array.isArray(draft.tags) ? draft.tags : []);
 
+      // suggested cover: already uploaded, so it is saved by path
+      if (draft.cover?.image_url) {
+        setCoverUri(null);
+        setCoverPath(draft.cover.image_url);
+      }
+
       const draftSteps = Array.isArray(draft.steps) ? draft.steps : [];
       setSteps(
         draftSteps.length
@@ -1979,109 +1988,63 @@ export default function CreateScreen() {
         return;
       }
 
+      if (!API_BASE) {
+        show("Missing EXPO_PUBLIC_API_BASE_URL", "err");
+        return;
+      }
+
       const recipeId = editing ? Number(recipeIdParam) : null;
 
-      // 1) upsert recipe core
-      let finalRecipeId: number;
+      // 1) recipe row + ingredients + steps in one transaction (POST /recipes/save).
+      // An unchanged cover goes along; a new one needs the id for its path.
+      const res = await fetch(`${API_BASE}/recipes/save`, {
+        method: "POST",
+        headers: { "Content-Type": "application/json", ...(await authHeaders()) },
+        body: JSON.stringify({
+          recipe_id: editing && recipeId && Number.isFinite(recipeId) ? recipeId : null,
+          title: title.trim(),
+          caption: caption.trim() || null,
+          description: description.trim() || null,
+          servings: servings.trim() ? Number(servings.trim()) : null,
+          is_public: isPublic,
+          tags,
+          prep_time: prepTime.trim() || null,
+          cook_time: cookTime.trim() || null,
+          difficulty: difficulty || null,
+          demo_url: demoUrl.trim() || null,
+          ...(coverUri ? {} : { image_url: coverPath ?? null }),
+          ingredients: lines
+            .filter((l) => l.ingredient && l.ingredient.id && l.ingredient.id > 0)
+            .map((l) => ({
+              name: l.ingredient!.name,
+              ingredient_id: l.ingredient!.id,
+              quantity: parseQuantityToNumber(l.quantity) ?? null,
+              unit: l.unit_code || null,
+              notes: l.notes.trim() || null,
+            })),
+          steps: steps
+            .map((s, idx) => ({ position: idx + 1, body: s.body.trim() }))
+            .filter((s) => s.body.length > 0),
+        }),
+      });
 
-      if (editing && recipeId && Number.isFinite(recipeId)) {
-        const { error } = await supabase
-          .from("recipes")
-          .update({
-            title: title.trim(),
-            caption: caption.trim() || null,
-            description: description.trim() || null,
-            servings: servings.trim() ? Number(servings.trim()) : null,
-            is_public: isPublic,
-            tags,
-            prep_time: prepTime.trim() || null,
-            cook_time: cookTime.trim() || null,
-            difficulty: difficulty || null,
-            demo_url: demoUrl.trim() || null,
-          })
-          .eq("id", recipeId);
-
-        if (error) throw error;
-
-        finalRecipeId = recipeId;
-
-        // delete old steps + ingredients
-        const { error: delStepsErr } = await supabase
-          .from("recipe_steps")
-          .delete()
-          .eq("recipe_id", finalRecipeId);
+      if (!res.ok) {
+        const txt = await res.text();
+        throw new Error(txt || "Save failed");
+      }
 
-        if (delStepsErr) throw delStepsErr;
+      const { id: finalRecipeId } = (await res.json()) as { id: number };
 
-        const { error: delIngErr } = await supabase
-          .from("recipe_ingredients")
-          .delete()
-          .eq("recipe_id", finalRecipeId);
+      // 2) new cover: upload under the recipe id, then point image_url at it
+      if (coverUri) {
+        const uploadedPath = await uploadCoverIfNeeded(uid, finalRecipeId);
 
-        if (delIngErr) throw delIngErr;
-      } else {
-        const { data: rec, error } = await supabase
+        const { error: coverUpdateErr } = await supabase
           .from("recipes")
-          .insert({
-            user_id: uid,
-            title: title.trim(),
-            caption: caption.trim() || null,
-            description: description.trim() || null,
-            servings: servings.trim() ? Number(servings.trim()) : null,
-            is_public: isPublic,
-            tags,
-            prep_time: prepTime.trim() || null,
-            cook_time: cookTime.trim() || null,
-            difficulty: difficulty || null,
-            demo_url: demoUrl.trim() || null,
-          })
-          .select("id")
-          .single();
+          .update({ image_url: uploadedPath })
+          .eq("id", finalRecipeId);
 
-        if (error) throw error;
-        finalRecipeId = rec!.id;
-      }
-
-      // 2) cover upload (if chosen) and update image_url
-      const coverPath = await uploadCoverIfNeeded(uid, finalRecipeId);
-
-      // If user removed cover: coverPath may be null
-      const { error: coverUpdateErr } = await supabase
-        .from("recipes")
-        .update({ image_url: coverPath })
-        .eq("id", finalRecipeId);
-
-      if (coverUpdateErr) throw coverUpdateErr;
-
-      // 3) ingredients insert
-      const ingRows = lines
-        .filter((l) => l.ingredient && l.ingredient.id && l.ingredient.id > 0)
-        .map((l, idx) => ({
-          recipe_id: finalRecipeId,
-          ingredient_id: l.ingredient!.id,
-          quantity: parseQuantityToNumber(l.quantity) ?? null,
-          unit_code: l.unit_code || null,
-          notes: l.notes.trim() || null,
-          position: idx + 1,
-        }));
-
-      if (ingRows.length) {
-        const { error } = await supabase.from("recipe_ingredients").insert(ingRows);
-        if (error) throw error;
-      }
-
-      // 4) steps insert
-      const stepRows = steps
-        .map((s, idx) => ({
-          recipe_id: finalRecipeId,
-          position: idx + 1,
-          body: s.body.trim(),
-        }))
-        .filter((s) => s.body.length > 0);
-
-      if (stepRows.length) {
-        const { error } = await supabase.from("recipe_steps").insert(stepRows);
-        if (error) throw error;
+        if (coverUpdateErr) throw coverUpdateErr;
       }
 
       dirtyRef.current = false;
@@ -2098,7 +2061,9 @@ export default function CreateScreen() {
       setSaving(false);
     }
   }, [
+    API_BASE,
     caption,
+    coverUri,
     demoUrl,
     description,
     difficulty,
@@ -2134,24 +2099,19 @@ export default function CreateScreen() {
           try {
             setSaving(true);
 
-            // delete steps + ingredients first (safety)
-            const { error: stErr } = await supabase
-              .from("recipe_steps")
-              .delete()
-              .eq("recipe_id", idNum);
-            if (stErr) throw stErr;
-
-            const { error: ingErr } = await supabase
-              .from("recipe_ingredients")
-              .delete()
-              .eq("recipe_id", idNum);
-            if (ingErr) throw ingErr;
-
-            const { error: recErr } = await supabase
-              .from("recipes")
-              .delete()
-              .eq("id", idNum);
-            if (recErr) throw recErr;
+            const { data: u } = await supabase.auth.getUser();
+            const uid = u.user?.id;
+            if (!uid) throw new Error("Sign in first");
+
+            // one conditional delete on the backend (owner check included)
+            const res = await fetch(`${API_BASE}/recipes/${idNum}`, {
+              method: "DELETE",
+              headers: await authHeaders(),
+            });
+            if (!res.ok) {
+              const txt = await res.text();
+              throw new Error(txt || "Delete failed");
+            }
 
             dirtyRef.current = false;
             show("Deleted recipe", "ok");
@@ -2164,7 +2124,7 @@ export default function CreateScreen() {
         },
       },
     ]);
-  }, [editing, recipeIdParam, show]);
+  }, [API_BASE, editing, recipeIdParam, show]);
 
   /* -------------------------- Top banner stats -------------------------- */
 
@@ -17,6 +17,7 @@ import {
   ActivityIndicator,
   ScrollView,
   Dimensions,
+  PixelRatio,
   StatusBar,
   TextInput,
   RefreshControl,
@@ -28,8 +29,8 @@ import {
 import { LinearGradient } from "expo-linear-gradient";
 import { Ionicons } from "@expo/vector-icons";
 import { router } from "expo-router";
-import { supabase } from "../../src/lib/supabase";
-import { resolveImageUrl } from "../../src/lib/images";
+import { authHeaders, supabase } from "../../src/lib/supabase";
+import { resolveImageUrl, resolveThumbnailUrl } from "../../src/lib/images";
 import { SafeAreaView, useSafeAreaInsets } from "react-native-safe-area-context";
 import { useLocalSearchParams } from "expo-router";
 import { likesStore } from "../../src/lib/likesStore";
@@ -55,6 +56,7 @@ const CHIP_BG = "rgba(255,255,255,0.18)";
 const CHIP_BG_ACTIVE = "#FFFFFF";
 
 const { width } = Dimensions.get("window");
+const API_BASE = process.env.EXPO_PUBLIC_API_BASE_URL ?? "";
 
 /* ───────────────────────────────── Types ───────────────────────────────── */
 
@@ -397,6 +399,8 @@ export default function FeedScreen() {
 
   // Infinite scroll cursor (created_at + id for stable ordering)
   const [cursor, setCursor] = useState<{ created_at: string; id: number } | null>(null);
+  // Opaque cursor for the personalized feed (ranked once per session on the backend)
+  const [feedCursor, setFeedCursor] = useState<string | null>(null);
   const [hasMore, setHasMore] = useState(true);
   const [loadingMore, setLoadingMore] = useState(false);
 
@@ -551,6 +555,7 @@ export default function FeedScreen() {
       setIsFetching(true);
       setHasMore(true);
       setCursor(null);
+      setFeedCursor(null);
     }
 
     try {
@@ -565,9 +570,26 @@ export default function FeedScreen() {
 
       let data: any[] | null = null;
       let error: any = null;
-
-      if (usePersonalizedFeed) {
-        // Call personalized feed RPC function
+      let nextFeedCursor: string | null = null;
+
+      if (usePersonalizedFeed && API_BASE) {
+        // Personalized feed: ranked once on the backend for the signed-in
+        // user (from the session token), paged by opaque cursor
+        const qs = new URLSearchParams({ limit: String(PAGE_SIZE) });
+        if (!reset && feedCursor) qs.set("cursor", feedCursor);
+        try {
+          const res = await fetch(`${API_BASE}/feed/personalized?${qs.toString()}`, {
+            headers: await authHeaders(),
+          });
+          if (!res.ok) throw new Error(await res.text());
+          const page = await res.json();
+          data = page.items;
+          nextFeedCursor = page.next_cursor ?? null;
+        } catch (e) {
+          error = e;
+        }
+      } else if (usePersonalizedFeed) {
+        // Fallback: personalized feed RPC with offset paging
         const offset = reset ? 0 : recipes.length;
         const result = await supabase.rpc('get_personalized_feed', {
           p_user_id: currentUserId,
@@ -629,7 +651,12 @@ export default function FeedScreen() {
       }
 
       // hasMore
-      setHasMore(list.length === PAGE_SIZE);
+      if (usePersonalizedFeed && API_BASE) {
+        setFeedCursor(nextFeedCursor);
+        setHasMore(nextFeedCursor !== null);
+      } else {
+        setHasMore(list.length === PAGE_SIZE);
+      }
 
       if (reset) {
         setRecipes(list);
@@ -904,7 +931,7 @@ export default function FeedScreen() {
             {item.image_url && !failedImages.has(item.id) ? (
               <Pressable onPress={() => onCardImagePress(item, likeCount)} style={{ position: "relative" }}>
                 <Image 
-                  source={{ uri: resolveImageUrl("recipe-media", item.image_url) }} 
+                  source={{ uri: resolveThumbnailUrl("recipe-media", item.image_url, width * PixelRatio.get()) }} 
                   style={{ width: "100%", height: 252 }} 
                   resizeMode="cover"
                   onError={() => {
@@ -20,11 +20,12 @@ import {
     TouchableWithoutFeedback,
 } from "react-native";
 import { addDays, fmtISODate, niceDate, startOfWeek } from "../../src/lib/date";
-import { supabase } from "../../src/lib/supabase";
+import { authHeaders, supabase } from "../../src/lib/supabase";
 import { toast } from "../../src/lib/toast";
 import { Button, Card, H1, Muted, Screen } from "../../src/ui/components";
 import { theme } from "../../src/ui/theme";
 
+const API_BASE = process.env.EXPO_PUBLIC_API_BASE_URL ?? "";
 
 type SortMode = "aisle" | "az" | "recent" | "recipe";
 
@@ -187,10 +188,10 @@ export default function GroceryScreen() {
       await loadUnits();
 
       // 3) Sync items from meal plans (auto-ingredients), then load items
-      await syncFromMealPlans(uid, listRow.id, weekStartIso, weekEndIso);
+      const loaded = await syncFromMealPlans(uid, listRow.id, weekStartIso, weekEndIso);
 
-      // 4) Load final items
-      await loadListItems(listRow.id);
+      // 4) Load final items (the server sync already returns them)
+      if (!loaded) await loadListItems(listRow.id);
     } catch (e: any) {
       console.error(e);
       toast(e?.message ?? "Failed to load grocery list");
@@ -286,9 +287,31 @@ export default function GroceryScreen() {
     setItems(rows as any);
   }
 
-  async function syncFromMealPlans(uid: string, listId: number, start: string, end: string) {
+  async function syncOnServer(listId: number, start: string, end: string) {
+    // One round trip: the backend aggregates + diffs in a single transaction
+    const res = await fetch(`${API_BASE}/grocery/sync`, {
+      method: "POST",
+      headers: { "Content-Type": "application/json", ...(await authHeaders()) },
+      body: JSON.stringify({ list_id: listId, week_start: start, week_end: end }),
+    });
+    if (!res.ok) throw new Error((await res.text()) || "Grocery sync failed");
+
+    const { items: rows, ingredients } = await res.json();
+    const map: Record<number, IngredientRow> = {};
+    (ingredients ?? []).forEach((x: any) => (map[x.id] = x));
+    setIngredientsById(map);
+    setItems(rows ?? []);
+  }
+
+  // Returns true when the list items were already loaded as part of the sync.
+  async function syncFromMealPlans(uid: string, listId: number, start: string, end: string): Promise<boolean> {
     setSyncing(true);
     try {
+      if (API_BASE) {
+        await syncOnServer(listId, start, end);
+        return true;
+      }
+
       // 1) Pull this week’s planned home recipes
       const { data: plans, error: pErr } = await supabase
         .from("meal_plans")
@@ -304,7 +327,7 @@ export default function GroceryScreen() {
       if (!recipeIds.length) {
         // If nothing planned, remove auto-items (ingredient-based) that are not checked.
         await pruneAutoItemsNotInSet(listId, new Set<string>());
-        return;
+        return false;
       }
 
       // 2) Fetch recipe ingredients joined with ingredient rows
@@ -407,7 +430,7 @@ export default function GroceryScreen() {
 
       // 6) Prune auto-items that are no longer needed (ingredient-based only).
       await pruneAutoItemsNotInSet(listId, desiredKeys);
-
+      return false;
     } finally {
       setSyncing(false);
     }
@@ -734,8 +757,8 @@ export default function GroceryScreen() {
               label={syncing ? "Syncing…" : "Sync from Meal Plan"}
               onPress={async () => {
                 if (!userId || !list) return;
-                await syncFromMealPlans(userId, list.id, weekStartIso, weekEndIso);
-                await loadListItems(list.id);
+                const loaded = await syncFromMealPlans(userId, list.id, weekStartIso, weekEndIso);
+                if (!loaded) await loadListItems(list.id);
                 toast("Grocery list updated!");
               }}
               disabled={syncing}
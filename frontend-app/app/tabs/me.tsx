@@ -5,7 +5,9 @@ import { router } from "expo-router";
 import {
   ActivityIndicator,
   Alert,
+  Dimensions,
   Image,
+  PixelRatio,
   Platform,
   Pressable,
   RefreshControl,
@@ -15,7 +17,7 @@ import {
   View,
 } from "react-native";
 import { fmtISODate, startOfWeek } from "../../src/lib/date";
-import { resolveImageUrl, uploadImage } from "../../src/lib/images";
+import { resolveImageUrl, resolveThumbnailUrl, uploadImage } from "../../src/lib/images";
 import { supabase } from "../../src/lib/supabase";
 import { toast } from "../../src/lib/toast";
 import { Button, Card, H3, Muted, Screen } from "../../src/ui/components";
@@ -721,7 +723,10 @@ function RecipeCard(props: {
   onDelete: () => void;
   onRemove: () => void;
 }) {
-  const image = props.recipe.image_url ? resolveImageUrl("recipe-media", props.recipe.image_url) : undefined;
+  // half-width grid card
+  const image = props.recipe.image_url
+    ? resolveThumbnailUrl("recipe-media", props.recipe.image_url, (Dimensions.get("window").width / 2) * PixelRatio.get())
+    : undefined;
 
   return (
     <View style={{ width: "48%" }}>
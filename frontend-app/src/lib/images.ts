@@ -20,6 +20,25 @@ export function resolveImageUrl(
   return publicUrl;
 }
 
+// Widths the backend encodes imported covers at (.../cover_w{width}.webp)
+const COVER_WIDTHS = [240, 480, 960];
+const COVER_VARIANT = /_w\d+\.webp$/;
+
+/**
+ * Like resolveImageUrl, but for imported covers picks the smallest variant at
+ * least `width` physical pixels wide. Other images resolve unchanged.
+ */
+export function resolveThumbnailUrl(
+  bucket: "profile-avatars" | "recipe-media",
+  value: string | null,
+  width: number
+): string | undefined {
+  if (!value || !COVER_VARIANT.test(value)) return resolveImageUrl(bucket, value);
+
+  const target = COVER_WIDTHS.find((w) => w >= width) ?? COVER_WIDTHS[COVER_WIDTHS.length - 1];
+  return resolveImageUrl(bucket, value.replace(COVER_VARIANT, `_w${target}.webp`));
+}
+
 /**
  * Test if an image URL is accessible
  */
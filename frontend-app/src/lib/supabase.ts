@@ -11,3 +11,10 @@ if (!supabaseUrl || !supabaseAnonKey) {
 // NOTE: We are keeping this simple first.
 // Later we can add SecureStore for auth persistence if needed.
 export const supabase = createClient(supabaseUrl, supabaseAnonKey);
+
+// Authorization header for backend endpoints that act as the signed-in user.
+export async function authHeaders(): Promise<Record<string, string>> {
+  const { data } = await supabase.auth.getSession();
+  const token = data.session?.access_token;
+  return token ? { Authorization: `Bearer ${token}` } : {};
+}